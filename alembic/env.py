@@ -5,7 +5,7 @@ from sqlalchemy import engine_from_config, pool
 from alembic import context
 from src.config import settings
 from src.commons.model_base import Base
-from src.commons.models import Road, RoadCondition, Car, TrafficMeasurement, RoadCapacity
+from src.commons.models import Road, RoadCondition, Car, TrafficMeasurement, RoadCapacity, RoadTrafficSnapshot
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,35 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+
+from src.commons.schemas import ProfileInfo
+from src.config import settings
+from src.services.profiling import profile_store
+
+
+async def require_admin(x_admin_token: str = Header(default="")) -> None:
+    """Allow only callers presenting the admin secret in ``X-Admin-Token``."""
+    if not secrets.compare_digest(x_admin_token.encode(), settings.ADMIN_SECRET_KEY.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+router = APIRouter(prefix="/profiles", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("", response_model=list[ProfileInfo])
+async def list_profiles() -> list[ProfileInfo]:
+    """List stored profiles, newest first."""
+    return profile_store.list()
+
+
+@router.get("/{name}")
+async def download_profile(name: str) -> FileResponse:
+    """
+    Download a stored profile.
+    ``.pstats`` files open with ``snakeviz`` or ``python -m pstats``, ``.html`` files in a browser.
+    """
+    path = profile_store.get(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=path.name)
@@ -0,0 +1,396 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, ClassVar, cast
+
+from fastapi import HTTPException
+from loguru import logger
+from sqladmin import Admin, ModelView
+from sqladmin.authentication import AuthenticationBackend
+from sqladmin.pagination import Pagination
+from sqlalchemy import Select, asc, desc, func, inspect, or_, select, text, tuple_
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import InstrumentedAttribute, selectinload
+from sqlalchemy.sql import ClauseElement
+from starlette.applications import Starlette
+from starlette.datastructures import URL
+from starlette.requests import Request
+
+from src.analytics.cruds import like_escape, plate_number_search
+from src.analytics.routing import road_network
+from src.analytics.spatial import road_locator
+from src.commons.models import Car, Road, RoadCondition
+from src.config import settings
+from src.services.db import DatabaseConfig, replica_router
+
+if TYPE_CHECKING:
+    from sqladmin._types import OperationColumnFilter, SimpleColumnFilter
+
+_listing: ContextVar[bool] = ContextVar("admin_listing", default=False)
+
+# Query parameters carrying the seek position of the next and of the previous list page.
+AFTER_PARAM = "after"
+BEFORE_PARAM = "before"
+CURSOR_SEPARATOR = "~"
+ESTIMATED_COUNT = text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)")
+
+
+@contextmanager
+def _listing_reads() -> Iterator[None]:
+    """Route the queries run inside the block to the replica, when there is one."""
+    token = _listing.set(True)
+    try:
+        yield
+    finally:
+        _listing.reset(token)
+
+
+class AdminAuth(AuthenticationBackend):
+    """Authentication backend for admin panel."""
+
+    async def login(self, request: Request) -> bool:
+        form = await request.form()
+        username = form.get("username")
+        password = form.get("password")
+
+        # In production, use proper authentication
+        # TODO: change logic to validate username and password with user from user service
+        valid = username == "admin" and password == "admin"  # noqa: S105
+        if valid:
+            request.session.update({"token": "..."})
+        return valid
+
+    async def logout(self, request: Request) -> bool:
+        request.session.clear()
+        return True
+
+    async def authenticate(self, request: Request) -> bool:
+        return bool(request.session.get("token", False))
+
+
+class ReplicaListView(ModelView):
+    """
+    Model view whose list pages and exports are read from the replica.
+
+    Details, edit and delete keep using the primary, so a change is never made
+    against a lagging copy of the row.
+    """
+
+    replica_session_maker: ClassVar[async_sessionmaker[AsyncSession] | None] = None
+
+    async def get_model_objects(self, request: Request, limit: int | None = 0) -> list[Any]:
+        with _listing_reads():
+            return await super().get_model_objects(request, limit)
+
+    async def list(self, request: Request) -> Pagination:
+        with _listing_reads():
+            return await super().list(request)
+
+    async def _run_query(self, stmt: ClauseElement) -> Any:
+        if not (_listing.get() and self.replica_session_maker is not None and replica_router.use_replica):
+            return await super()._run_query(stmt)
+        try:
+            async with self.replica_session_maker(expire_on_commit=False) as session:
+                result = await session.execute(stmt)
+                return result.scalars().unique().all()
+        except (OperationalError, InterfaceError, OSError) as exc:
+            logger.warning(f"Replica unavailable, listing from the primary: {exc!s}")
+            replica_router.mark_unavailable()
+            return await super()._run_query(stmt)
+
+
+@dataclass(slots=True, frozen=True)
+class _SeekOrder:
+    """Columns a list is ordered by, the last one unique, and the position of a row in that order."""
+
+    columns: list[InstrumentedAttribute]
+    descending: bool
+
+    def cursor(self, row: Any) -> str:
+        values = (getattr(row, column.key) for column in self.columns)
+        return CURSOR_SEPARATOR.join(
+            value.isoformat() if isinstance(value, datetime) else str(value) for value in values
+        )
+
+    def parse(self, cursor: str) -> list[Any]:
+        parts = cursor.split(CURSOR_SEPARATOR)
+        if len(parts) != len(self.columns):
+            raise HTTPException(status_code=400, detail="Invalid page cursor")
+        try:
+            return [
+                datetime.fromisoformat(part) if column.type.python_type is datetime else column.type.python_type(part)
+                for column, part in zip(self.columns, parts, strict=True)
+            ]
+        except (TypeError, ValueError, NotImplementedError) as exc:
+            raise HTTPException(status_code=400, detail="Invalid page cursor") from exc
+
+
+@dataclass
+class SeekPagination(Pagination):
+    """Pagination whose links to the adjacent pages seek past the rows shown."""
+
+    first_cursor: str | None = None
+    last_cursor: str | None = None
+
+    def add_pagination_urls(self, base_url: URL) -> None:
+        base_url = base_url.remove_query_params([AFTER_PARAM, BEFORE_PARAM])
+        super().add_pagination_urls(base_url)
+        for control in self.page_controls:
+            if control.number == self.page + 1 and self.last_cursor is not None:
+                control.url = str(base_url.include_query_params(page=control.number, after=self.last_cursor))
+            # The first page is always read from the top, so it shows rows added in the meantime.
+            elif control.number == self.page - 1 > 1 and self.first_cursor is not None:
+                control.url = str(base_url.include_query_params(page=control.number, before=self.first_cursor))
+
+
+class ScalableListView(ReplicaListView):
+    """
+    Model view whose list pages stay fast on tables with millions of rows.
+
+    Without search or filters, the total shown is the planner's estimate from
+    ``pg_class.reltuples`` once it reaches ``ADMIN_ESTIMATED_COUNT_THRESHOLD``, instead of
+    a ``COUNT(*)`` over the whole table. Lists in the default sort order are ordered by that
+    column and the primary key, and the links to the next and previous pages seek past the
+    rows shown (keyset paging), so an index on those columns answers any page in the same
+    time. Jumping to a page by its number still skips rows with OFFSET.
+    """
+
+    @property
+    def _is_postgres(self) -> bool:
+        return self.session_maker.kw["bind"].dialect.name == "postgresql"
+
+    async def count(self, request: Request, stmt: Select | None = None) -> int:
+        if stmt is None and self._is_postgres:
+            table = inspect(self.model).local_table.fullname
+            estimate = (await self._run_query(ESTIMATED_COUNT.bindparams(table=table)))[0]
+            # -1 until the table is first analyzed.
+            if estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return int(estimate)
+        return await super().count(request, stmt)
+
+    async def list(self, request: Request) -> Pagination:
+        page = self.validate_page_number(request.query_params.get("page"), 1)
+        page_size = self.validate_page_number(request.query_params.get("pageSize"), 0)
+        page_size = min(page_size or self.page_size, max(self.page_size_options))
+        search = request.query_params.get("search")
+
+        stmt = self.list_query(request)
+        for relation in self._list_relations:
+            stmt = stmt.options(selectinload(relation))
+        stmt, filtered = await self._filter_query(stmt, request)
+        if search:
+            stmt = self.search_query(stmt=stmt, term=search)
+
+        with _listing_reads():
+            if filtered or search:
+                count = await self.count(request, select(func.count()).select_from(stmt.subquery()))
+            else:
+                count = await self.count(request)
+            seek = self._seek_order(request)
+            if seek is None:
+                stmt = self.sort_query(stmt, request).limit(page_size).offset((page - 1) * page_size)
+                return Pagination(rows=await self._run_query(stmt), page=page, page_size=page_size, count=count)
+            return await self._seek_page(request, stmt, seek, page, page_size, count)
+
+    async def _filter_query(self, stmt: Select, request: Request) -> tuple[Select, bool]:
+        """Apply the list filters set in the query parameters the way sqladmin does, and tell if any was."""
+        filtered = False
+        for filter_ in self.get_filters():
+            value = request.query_params.get(filter_.parameter_name)
+            if not value:
+                continue
+            if getattr(filter_, "has_operator", False):
+                operation = request.query_params.get(f"{filter_.parameter_name}_op")
+                if operation:
+                    operation_filter = cast("OperationColumnFilter", filter_)
+                    stmt = await operation_filter.get_filtered_query(stmt, operation, value, self.model)
+                    filtered = True
+            else:
+                stmt = await cast("SimpleColumnFilter", filter_).get_filtered_query(stmt, value, self.model)
+                filtered = True
+        return stmt, filtered
+
+    def _seek_order(self, request: Request) -> _SeekOrder | None:
+        """The seek key of the requested order, None when the list is sorted by another column."""
+        default = self._get_default_sort()
+        if len(default) != 1:
+            return None
+        name, descending = self._get_prop_name(default[0][0]), default[0][1]
+        sort_by = request.query_params.get("sortBy")
+        if sort_by:
+            if sort_by != name:
+                return None
+            descending = request.query_params.get("sort", "asc") == "desc"
+        columns = [getattr(self.model, name)]
+        columns += [getattr(self.model, pk.key) for pk in self.pk_columns if pk.key != name]
+        return _SeekOrder(columns, descending)
+
+    async def _seek_page(
+        self, request: Request, stmt: Select, seek: _SeekOrder, page: int, page_size: int, count: int
+    ) -> SeekPagination:
+        after = request.query_params.get(AFTER_PARAM)
+        before = request.query_params.get(BEFORE_PARAM)
+        key = tuple_(*seek.columns)
+        backwards = bool(before) and not after
+        if after:
+            cursor = tuple_(*seek.parse(after))
+            stmt = stmt.where(key < cursor if seek.descending else key > cursor)
+        elif before:
+            cursor = tuple_(*seek.parse(before))
+            stmt = stmt.where(key > cursor if seek.descending else key < cursor)
+        else:
+            stmt = stmt.offset((page - 1) * page_size)
+        order = asc if seek.descending == backwards else desc
+        # One row more than the page tells whether there is a page beyond it.
+        rows = list(await self._run_query(stmt.order_by(*map(order, seek.columns)).limit(page_size + 1)))
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        # Keep the total consistent with what was read, an estimate may be a bit off.
+        if backwards:
+            rows.reverse()
+            if not more:
+                page = 1
+            count = max(count, page * page_size + 1)
+        else:
+            shown = (page - 1) * page_size + len(rows)
+            count = max(count, shown + 1) if more else shown
+        return SeekPagination(
+            rows=rows,
+            page=page,
+            page_size=page_size,
+            count=count,
+            first_cursor=seek.cursor(rows[0]) if rows else None,
+            last_cursor=seek.cursor(rows[-1]) if rows else None,
+        )
+
+
+class CarAdmin(ScalableListView, model=Car):
+    """Admin interface for Car model."""
+
+    name = "Car"
+    name_plural = "Cars"
+    icon = "fa-solid fa-car"
+
+    column_list = [Car.id, Car.plate_number, Car.model, Car.average_speed, Car.created_at]
+    # Searched by plate number only, see search_query.
+    column_searchable_list = [Car.plate_number]
+    column_sortable_list = [Car.average_speed, Car.created_at]
+    column_default_sort = ("created_at", True)
+
+    can_create = False  # Cars are created only through sensors
+    can_edit = True
+    can_delete = True
+    can_view_details = True
+
+    def search_query(self, stmt: Select, term: str) -> Select:
+        """Cars whose plate number starts with the term, or contains it when it is long enough."""
+        return stmt.where(plate_number_search(term.strip()))
+
+    def on_model_change(self, data: dict, model: Car, is_created: bool) -> None:
+        """Log changes to car records."""
+        model.updated_at = datetime.now()
+        action = "Created" if is_created else "Updated"
+        logger.info(f"{action} car: {model.plate_number}")
+
+
+class RoadAdmin(ScalableListView, model=Road):
+    """Admin interface for Road model."""
+
+    name = "Road"
+    name_plural = "Roads"
+    icon = "fa-solid fa-road"
+
+    column_list = [Road.id, Road.name, Road.start, Road.end, Road.length, Road.city]
+    column_searchable_list = [Road.name, Road.city]
+    column_sortable_list = [Road.name, Road.city, Road.length]
+
+    can_create = True
+    can_edit = True
+    can_delete = True
+    can_view_details = True
+
+    def search_query(self, stmt: Select, term: str) -> Select:
+        """Roads whose name contains the term in any case (trigram index), or in a city of that name."""
+        term = term.strip()
+        return stmt.where(or_(Road.name.ilike(f"%{like_escape(term)}%", escape="/"), Road.city == term))
+
+    async def on_model_change(self, data: dict, model: Road, is_created: bool, request: Request) -> None:
+        """Log changes to road records."""
+        model.updated_at = datetime.now()
+        action = "Created" if is_created else "Updated"
+        logger.info(f"{action} road: {model.name}")
+        await super().on_model_change(data, model, is_created, request)
+
+    async def after_model_change(self, data: dict, model: Road, is_created: bool, request: Request) -> None:
+        """Rebuild the road graph and spatial index of this process with the committed road."""
+        road_network.invalidate()
+        road_locator.invalidate()
+        await super().after_model_change(data, model, is_created, request)
+
+    async def after_model_delete(self, model: Road, request: Request) -> None:
+        """Rebuild the road graph and spatial index of this process without the deleted road."""
+        road_network.invalidate()
+        road_locator.invalidate()
+        await super().after_model_delete(model, request)
+
+
+class RoadConditionAdmin(ScalableListView, model=RoadCondition):
+    """Admin interface for RoadCondition model."""
+
+    name = "Road Condition"
+    name_plural = "Road Conditions"
+    icon = "fa-solid fa-traffic-light"
+
+    column_list = [
+        RoadCondition.id,
+        RoadCondition.name,
+        RoadCondition.road_id,
+        RoadCondition.weather_status,
+        RoadCondition.jam_status,
+        RoadCondition.created_at,
+    ]
+    column_searchable_list = [RoadCondition.name]
+    column_sortable_list = [RoadCondition.created_at]
+    column_default_sort = ("created_at", True)
+
+    can_create = True
+    can_edit = True
+    can_delete = True
+    can_view_details = True
+
+    async def on_model_change(self, data: dict, model: RoadCondition, is_created: bool, request: Request) -> None:
+        """Log changes to road condition records."""
+        model.updated_at = datetime.now()
+        action = "Created" if is_created else "Updated"
+        logger.info(f"{action} road condition: {model.name}")
+        await super().on_model_change(data, model, is_created, request)
+
+
+def create_admin(base_url: str = "/admin") -> Starlette:
+    """
+    Setup admin interface and return its ASGI app, to be mounted at ``base_url``
+    (see ``src.admin.mount_admin``).
+    """
+    engine = DatabaseConfig(settings.db_url_postgresql).engine
+    if settings.PG_REPLICA_URL:
+        ReplicaListView.replica_session_maker = DatabaseConfig(settings.PG_REPLICA_URL).async_session_maker
+
+    authentication_backend = AdminAuth(secret_key=settings.ADMIN_SECRET_KEY)
+    # sqladmin mounts its app on the given one, which is only a holder here.
+    admin = Admin(
+        Starlette(),
+        engine,
+        authentication_backend=authentication_backend,
+        title="Traffic Analytics Admin",
+        base_url=base_url,
+    )
+
+    # Register admin views
+    admin.add_view(CarAdmin)
+    admin.add_view(RoadAdmin)
+    admin.add_view(RoadConditionAdmin)
+    return admin.admin
@@ -0,0 +1,115 @@
+import math
+from datetime import datetime
+from typing import Literal
+from uuid import UUID
+
+import numpy as np
+
+from src.commons.project_utils import grow_rows
+from src.commons.schemas import TrafficAnomaly
+from src.config import settings
+
+type AnomalyKind = Literal["SPEED_DROP", "DENSITY_SPIKE"]
+
+# Column order of the per-road state arrays, with the direction that counts as an incident.
+METRICS: tuple[tuple[AnomalyKind, int], ...] = (("SPEED_DROP", -1), ("DENSITY_SPIKE", 1))
+
+# Lower bound of the baseline deviation as a fraction of the mean, so a perfectly
+# steady road does not alert on the first tiny wobble.
+MIN_DEVIATION_FRACTION = 0.05
+
+
+class AnomalyDetector:
+    """
+    Online detector of sudden speed drops and density spikes per road.
+
+    Keeps an exponentially weighted mean and variance of speed and density for
+    every road in fixed-size arrays, so an update is O(1) with constant memory
+    per road. A measurement is anomalous when its z-score against the baseline
+    passes ``threshold`` in the incident direction. Values are clipped to the
+    threshold band before being folded into the baseline, so an ongoing incident
+    does not immediately become the new normal.
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.05,
+        threshold: float = 3.5,
+        warm_up: int = 20,
+        cooldown_seconds: float = 300,
+        capacity: int = 1024,
+    ) -> None:
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warm_up = warm_up
+        self.cooldown_seconds = cooldown_seconds
+        self._rows: dict[UUID, int] = {}
+        self._mean = np.zeros((capacity, 2), dtype=np.float64)
+        self._variance = np.zeros((capacity, 2), dtype=np.float64)
+        self._last_alert = np.zeros((capacity, 2), dtype=np.float64)  # epoch seconds
+        self._observations = np.zeros(capacity, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _row(self, road_id: UUID) -> int:
+        row = self._rows.get(road_id)
+        if row is not None:
+            return row
+        row = len(self._rows)
+        if row == len(self._mean):
+            self._mean = grow_rows(self._mean)
+            self._variance = grow_rows(self._variance)
+            self._last_alert = grow_rows(self._last_alert)
+            self._observations = grow_rows(self._observations)
+        self._rows[road_id] = row
+        return row
+
+    def update(self, road_id: UUID, timestamp: datetime, speed: float, density: float) -> list[TrafficAnomaly]:
+        """
+        Score a measurement against the road's baseline and fold it in.
+
+        Returns:
+            Anomalies raised by this measurement, usually none
+        """
+        row = self._row(road_id)
+        observations = int(self._observations[row])
+        self._observations[row] += 1
+        if observations == 0:
+            self._mean[row] = (speed, density)
+            return []
+
+        epoch = timestamp.timestamp()
+        anomalies = []
+        for column, (value, (kind, direction)) in enumerate(zip((speed, density), METRICS, strict=True)):
+            mean = float(self._mean[row, column])
+            deviation = max(math.sqrt(self._variance[row, column]), MIN_DEVIATION_FRACTION * abs(mean), 1e-6)
+            z_score = (value - mean) / deviation
+
+            if (
+                observations >= self.warm_up
+                and z_score * direction >= self.threshold
+                and epoch - self._last_alert[row, column] >= self.cooldown_seconds
+            ):
+                self._last_alert[row, column] = epoch
+                anomalies.append(
+                    TrafficAnomaly(
+                        road_id=road_id,
+                        kind=kind,
+                        value=value,
+                        baseline=mean,
+                        z_score=z_score,
+                        detected_at=timestamp,
+                    )
+                )
+
+            clipped = min(max(value, mean - self.threshold * deviation), mean + self.threshold * deviation)
+            diff = clipped - mean
+            increment = self.alpha * diff
+            self._mean[row, column] = mean + increment
+            self._variance[row, column] = (1 - self.alpha) * (self._variance[row, column] + diff * increment)
+
+        return anomalies
+
+
+traffic_anomaly_detector = AnomalyDetector(threshold=settings.ANOMALY_Z_THRESHOLD)
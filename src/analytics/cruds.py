@@ -1,10 +1,26 @@
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
+from typing import Any
 from uuid import UUID
 
+import numpy as np
 from fastapi import HTTPException, status
-from sqlalchemy import select
-
-from src.commons.models import Car, Road, RoadCapacity, RoadCondition, TrafficMeasurement
+from sqlalchemy import ColumnElement, Row, bindparam, delete, func, insert, or_, select, tuple_, update
+
+from src.commons.enums import JobStatus, OdLevel
+from src.commons.models import (
+    Car,
+    CarSighting,
+    CarTrajectoryChunk,
+    OdCount,
+    OdJob,
+    Road,
+    RoadCapacity,
+    RoadCondition,
+    RoadSpeedSketch,
+    RoadTrafficSnapshot,
+    TrafficMeasurement,
+)
 from src.commons.schemas import (
     CarCreate,
     GetCar,
@@ -16,10 +32,82 @@ from src.commons.schemas import (
     RoadCapacityCreate,
     RoadConditionCreate,
     RoadCreate,
+    TrafficAnalysis,
     TrafficMeasurementCreate,
 )
 from src.services.db import CrudEntity, PgUnitOfWork
 
+# Hot path statements are built once and executed with bound parameters, which
+# skips statement construction and cache key generation on every event.
+CAR_BY_PLATE = select(Car).where(Car.plate_number == bindparam("plate_number"))
+CAPACITY_BY_ROAD = select(RoadCapacity).where(RoadCapacity.road_id == bindparam("road_id"))
+RECENT_MEASUREMENT_ROWS = (
+    select(
+        TrafficMeasurement.timestamp,
+        TrafficMeasurement.average_speed,
+        TrafficMeasurement.flow_rate,
+        TrafficMeasurement.density,
+    )
+    .where(TrafficMeasurement.road_id == bindparam("road_id"), TrafficMeasurement.timestamp >= bindparam("since"))
+    .order_by(TrafficMeasurement.timestamp.desc())
+)
+
+
+# Shortest search term matched anywhere in a plate number, through the trigram index.
+# Shorter terms only match the start of plate numbers.
+MIN_TRIGRAM_TERM = 3
+CAR_MATCH_COLUMNS = (Car.id, Car.plate_number, Car.model, Car.road_id, Car.average_speed)
+# Sketch rows per upsert, well below the bound parameter limits of Postgres and SQLite.
+SKETCH_UPSERT_BATCH = 1000
+
+
+def like_escape(term: str) -> str:
+    """Escape the LIKE wildcards of a search term, for patterns with ``escape="/"``."""
+    return term.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+
+def plate_number_prefix(term: str) -> ColumnElement[bool]:
+    """Plate numbers starting with the term, as typed or in upper case (prefix index)."""
+    # The whole pattern is one bound value, so a generic plan can use the index too.
+    prefixes = dict.fromkeys((term, term.upper()))
+    return or_(*(Car.plate_number.like(f"{like_escape(prefix)}%", escape="/") for prefix in prefixes))
+
+
+def plate_number_contains(term: str) -> ColumnElement[bool]:
+    """Plate numbers containing the term in any case (trigram index)."""
+    return Car.plate_number.ilike(f"%{like_escape(term)}%", escape="/")
+
+
+def plate_number_search(term: str) -> ColumnElement[bool]:
+    """Plate numbers starting with the term, or containing it when it is long enough."""
+    if len(term) < MIN_TRIGRAM_TERM:
+        return plate_number_prefix(term)
+    return or_(plate_number_prefix(term), plate_number_contains(term))
+
+
+@dataclass(slots=True, frozen=True)
+class MeasurementWindow:
+    """Columns of the traffic measurements in a window as arrays, newest first."""
+
+    timestamp: np.ndarray  # epoch seconds
+    average_speed: np.ndarray
+    flow_rate: np.ndarray
+    density: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @classmethod
+    def from_rows(cls, rows: list[Row]) -> "MeasurementWindow":
+        """Build the window from ``(timestamp, average_speed, flow_rate, density)`` rows."""
+        count = len(rows)
+        return cls(
+            timestamp=np.fromiter((row[0].timestamp() for row in rows), dtype=np.float64, count=count),
+            average_speed=np.fromiter((row[1] for row in rows), dtype=np.float64, count=count),
+            flow_rate=np.fromiter((row[2] for row in rows), dtype=np.int64, count=count),
+            density=np.fromiter((row[3] for row in rows), dtype=np.float64, count=count),
+        )
+
 
 class CarCrud(CrudEntity[Car]):
     """
@@ -54,14 +142,54 @@ class CarCrud(CrudEntity[Car]):
         """
         return await self.get_many(conditions)
 
+    async def get_car_by_plate(self, plate_number: str) -> list[Car]:
+        """
+        Get cars by plate number with the prepared hot path statement.
+        """
+        return await self.get_by_query(CAR_BY_PLATE, {"plate_number": plate_number})
+
+    async def search_by_plate(self, term: str, limit: int) -> list[Row]:
+        """
+        Find cars by part of their plate number, prefix matches first.
+
+        Both lookups are bounded by ``limit``: prefix matches are read in plate order from the
+        prefix index, and only when they do not fill the limit are plates containing the term
+        read from the trigram index.
+
+        Returns:
+            ``(id, plate_number, model, road_id, average_speed)`` rows
+        """
+        rows = await self.get_rows(
+            select(*CAR_MATCH_COLUMNS).where(plate_number_prefix(term)).order_by(Car.plate_number).limit(limit)
+        )
+        if len(rows) < limit and len(term) >= MIN_TRIGRAM_TERM:
+            query = select(*CAR_MATCH_COLUMNS).where(plate_number_contains(term))
+            if rows:
+                query = query.where(Car.id.not_in([row.id for row in rows]))
+            rows += await self.get_rows(query.order_by(Car.plate_number).limit(limit - len(rows)))
+        return rows
+
     async def get_car_by_time_range(self, conditions: GetCarByTimeRange) -> list[Car]:
         """
-        Get a car by time range.
+        Get the cars of a time range, on a road when ``road_id`` is given.
         """
         time_to_select = datetime.now(UTC) - timedelta(minutes=conditions.range_time)
         query = select(Car).where(Car.created_at >= time_to_select)
+        if conditions.road_id is not None:
+            query = query.where(Car.road_id == conditions.road_id)
         return await self.get_by_query(query)
 
+    async def get_speeds_by_time_range(self, conditions: GetCarByTimeRange) -> np.ndarray:
+        """
+        Get the average speeds of the cars in a time range, on a road when ``road_id`` is given.
+        """
+        time_to_select = datetime.now(UTC) - timedelta(minutes=conditions.range_time)
+        query = select(Car.average_speed).where(Car.created_at >= time_to_select)
+        if conditions.road_id is not None:
+            query = query.where(Car.road_id == conditions.road_id)
+        rows = await self.get_rows(query)
+        return np.fromiter((row[0] for row in rows), dtype=np.float64, count=len(rows))
+
     async def delete_car(self, conditions: GetCar) -> None:
         """
         Delete a car.
@@ -89,6 +217,19 @@ class RoadConditionCrud(CrudEntity[RoadCondition]):
         """
         return await self.get_many(conditions)
 
+    async def get_latest_road_condition(self, road_id: UUID) -> RoadCondition | None:
+        """
+        Get the most recent road condition of a road.
+        """
+        query = (
+            select(RoadCondition)
+            .where(RoadCondition.road_id == road_id)
+            .order_by(RoadCondition.created_at.desc())
+            .limit(1)
+        )
+        conditions = await self.get_by_query(query)
+        return conditions[0] if conditions else None
+
     async def delete_road_condition(self, conditions: GetRoadCondition) -> None:
         """
         Delete a road condition.
@@ -128,6 +269,54 @@ class RoadCrud(CrudEntity[Road]):
         """
         await self.delete_entity(conditions)
 
+    async def get_road_infos(self) -> list[Row]:
+        """
+        Get ``(id, name, city, street, length)`` rows of every road, the metadata of the road cache.
+        """
+        return await self.get_rows(select(Road.id, Road.name, Road.city, Road.street, Road.length))
+
+    async def get_road_locations(self) -> list[Row]:
+        """
+        Get ``(id, latitude, longitude)`` rows of the roads that have coordinates.
+        """
+        query = select(Road.id, Road.latitude, Road.longitude).where(
+            Road.latitude.is_not(None), Road.longitude.is_not(None)
+        )
+        return await self.get_rows(query)
+
+    async def get_roads_version(self) -> tuple:
+        """
+        Get ``(count, latest created_at, latest updated_at)`` of the roads, which changes
+        whenever a road is added, deleted or edited.
+        """
+        (row,) = await self.get_rows(select(func.count(), func.max(Road.created_at), func.max(Road.updated_at)))
+        return tuple(row)
+
+    async def get_road_zones(self) -> list[Row]:
+        """
+        Get ``(id, street, city)`` rows of every road, the zones of the origin-destination matrix.
+        """
+        return await self.get_rows(select(Road.id, Road.street, Road.city))
+
+    async def get_road_edges(self) -> list[Row]:
+        """
+        Get every road as ``(id, start, end, length, speed_limit, current_speed)`` rows for the road network.
+        Speed limit and current speed are None without capacity data or a snapshot.
+        """
+        query = (
+            select(
+                Road.id,
+                Road.start,
+                Road.end,
+                Road.length,
+                RoadCapacity.speed_limit,
+                RoadTrafficSnapshot.current_speed,
+            )
+            .outerjoin(RoadCapacity, RoadCapacity.road_id == Road.id)
+            .outerjoin(RoadTrafficSnapshot, RoadTrafficSnapshot.road_id == Road.id)
+        )
+        return await self.get_rows(query)
+
 
 class TrafficMeasurementCrud(CrudEntity[TrafficMeasurement]):
     """CRUD operations for TrafficMeasurement model."""
@@ -139,15 +328,31 @@ class TrafficMeasurementCrud(CrudEntity[TrafficMeasurement]):
         """Create a traffic measurement."""
         return await self.create_entity(measurement)
 
-    async def get_recent_measurements(self, road_id: UUID, minutes: int = 5) -> list[TrafficMeasurement]:
-        """Get recent measurements for a road."""
-        time_to_select = datetime.now(UTC) - timedelta(minutes=minutes)
+    async def get_recent_measurement_window(self, road_id: UUID, minutes: int = 5) -> MeasurementWindow:
+        """Get the columns of recent measurements for a road as arrays, newest first."""
+        since = datetime.now(UTC) - timedelta(minutes=minutes)
+        rows = await self.get_rows(RECENT_MEASUREMENT_ROWS, {"road_id": road_id, "since": since})
+        return MeasurementWindow.from_rows(rows)
+
+    async def get_measurements_after(self, after: tuple[datetime, UUID], until: datetime, limit: int) -> list[Row]:
+        """
+        Get ``(id, road_id, timestamp, average_speed, density)`` rows of the measurements after
+        the ``(timestamp, id)`` key ``after`` and before ``until``, in key order.
+        """
         query = (
-            select(TrafficMeasurement)
-            .where(TrafficMeasurement.road_id == road_id, TrafficMeasurement.timestamp >= time_to_select)
-            .order_by(TrafficMeasurement.timestamp.desc())
+            select(
+                TrafficMeasurement.id,
+                TrafficMeasurement.road_id,
+                TrafficMeasurement.timestamp,
+                TrafficMeasurement.average_speed,
+                TrafficMeasurement.density,
+            )
+            .where(tuple_(TrafficMeasurement.timestamp, TrafficMeasurement.id) > tuple_(*after))
+            .where(TrafficMeasurement.timestamp < until)
+            .order_by(TrafficMeasurement.timestamp, TrafficMeasurement.id)
+            .limit(limit)
         )
-        return await self.get_by_query(query)
+        return await self.get_rows(query)
 
     async def delete_traffic_measurement(self, road_id: UUID) -> None:
         """Delete all traffic measurements for a road."""
@@ -164,9 +369,14 @@ class RoadCapacityCrud(CrudEntity[RoadCapacity]):
         """Create road capacity information."""
         return await self.create_entity(capacity)
 
+    async def get_capacity_by_road(self, road_id: UUID) -> RoadCapacity | None:
+        """Get road capacity information with the prepared hot path statement, if any."""
+        capacities = await self.get_by_query(CAPACITY_BY_ROAD, {"road_id": road_id})
+        return capacities[0] if capacities else None
+
     async def get_road_capacity(self, road_id: UUID) -> RoadCapacity:
         """Get road capacity information."""
-        result = await self.one_or_none(GetRoadCapacity(road_id=road_id))
+        result = await self.get_capacity_by_road(road_id)
         if not result:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail=f"Road capacity information not found for road {road_id}"
@@ -176,3 +386,217 @@ class RoadCapacityCrud(CrudEntity[RoadCapacity]):
     async def delete_road_capacity(self, road_id: UUID) -> None:
         """Delete road capacity information."""
         await self.delete_entity(GetRoadCapacity(road_id=road_id))
+
+
+class RoadTrafficSnapshotCrud(CrudEntity[RoadTrafficSnapshot]):
+    """CRUD operations for RoadTrafficSnapshot model."""
+
+    def __init__(self, uow: PgUnitOfWork):
+        super().__init__(model=RoadTrafficSnapshot, uow=uow)
+
+    async def get_snapshot(self, road_id: UUID) -> RoadTrafficSnapshot | None:
+        """Get the snapshot of a road by primary key."""
+        snapshots = await self.get_by_query(select(RoadTrafficSnapshot).where(RoadTrafficSnapshot.road_id == road_id))
+        return snapshots[0] if snapshots else None
+
+    async def get_snapshots(self, road_ids: list[UUID]) -> list[RoadTrafficSnapshot]:
+        """Get the snapshots of several roads with one query."""
+        return await self.get_by_query(select(RoadTrafficSnapshot).where(RoadTrafficSnapshot.road_id.in_(road_ids)))
+
+    async def get_states_since(self, since: datetime | None) -> list[Row]:
+        """
+        Get ``(road_id, current_speed, congestion_level, state, updated_at)`` rows of the snapshots
+        updated after ``since``, or of all snapshots when it is None.
+        """
+        query = select(
+            RoadTrafficSnapshot.road_id,
+            RoadTrafficSnapshot.current_speed,
+            RoadTrafficSnapshot.congestion_level,
+            RoadTrafficSnapshot.state,
+            RoadTrafficSnapshot.updated_at,
+        )
+        if since is not None:
+            query = query.where(RoadTrafficSnapshot.updated_at > since)
+        return await self.get_rows(query)
+
+    async def upsert_snapshot(self, road_id: UUID, analysis: TrafficAnalysis) -> None:
+        """Insert or replace the snapshot of a road."""
+        body = analysis.model_dump()
+        body["road_id"] = road_id
+        body["updated_at"] = analysis.updated_at or datetime.now(UTC)
+        await self.upsert_entity(body, index_elements=["road_id"])
+
+
+class RoadSpeedSketchCrud(CrudEntity[RoadSpeedSketch]):
+    """CRUD operations for the speed sketches published by the ingestion processes."""
+
+    def __init__(self, uow: PgUnitOfWork):
+        super().__init__(model=RoadSpeedSketch, uow=uow)
+
+    async def upsert_sketches(self, worker_id: UUID, changes: dict[UUID, dict[int, dict[str, Any]]]) -> None:
+        """Insert or replace the bucket sketches of a worker, given per road and bucket."""
+        updated_at = datetime.now(UTC)
+        rows = [
+            {"road_id": road_id, "bucket": bucket, "worker_id": worker_id, "sketch": sketch, "updated_at": updated_at}
+            for road_id, buckets in changes.items()
+            for bucket, sketch in buckets.items()
+        ]
+        for start in range(0, len(rows), SKETCH_UPSERT_BATCH):
+            await self.upsert_entities(
+                rows[start : start + SKETCH_UPSERT_BATCH], index_elements=["road_id", "bucket", "worker_id"]
+            )
+
+    async def get_sketches(self, road_id: UUID, buckets: range, exclude_worker: UUID | None = None) -> list[Row]:
+        """Get ``(bucket, sketch)`` rows of a road in ``buckets`` from every worker but ``exclude_worker``."""
+        query = select(RoadSpeedSketch.bucket, RoadSpeedSketch.sketch).where(
+            RoadSpeedSketch.road_id == road_id,
+            RoadSpeedSketch.bucket >= buckets.start,
+            RoadSpeedSketch.bucket < buckets.stop,
+        )
+        if exclude_worker is not None:
+            query = query.where(RoadSpeedSketch.worker_id != exclude_worker)
+        return await self.get_rows(query)
+
+    async def delete_sketches_before(self, bucket: int) -> None:
+        """Delete the sketches of every worker older than ``bucket``."""
+        await self.uow.execute(delete(RoadSpeedSketch).where(RoadSpeedSketch.bucket < bucket))
+
+
+class CarSightingCrud(CrudEntity[CarSighting]):
+    """CRUD operations for the append-only CarSighting log."""
+
+    def __init__(self, uow: PgUnitOfWork):
+        super().__init__(model=CarSighting, uow=uow)
+
+    def add_sighting(self, plate_number: str, road_id: UUID, speed: float, timestamp: datetime | None = None) -> None:
+        """Append a sighting, it is inserted with the next flush or commit of the unit of work."""
+        self.uow.add(
+            CarSighting(
+                plate_number=plate_number,
+                road_id=road_id,
+                timestamp=timestamp or datetime.now(UTC),
+                speed=speed,
+            )
+        )
+
+    async def get_sightings(self, plate_number: str, since: datetime, until: datetime) -> list[Row]:
+        """Get ``(road_id, timestamp, speed)`` rows of a car in a time range."""
+        query = select(CarSighting.road_id, CarSighting.timestamp, CarSighting.speed).where(
+            CarSighting.plate_number == plate_number,
+            CarSighting.timestamp >= since,
+            CarSighting.timestamp <= until,
+        )
+        return await self.get_rows(query)
+
+    async def get_sightings_before(self, before: datetime, limit: int) -> list[Row]:
+        """
+        Get the oldest ``(id, plate_number, road_id, timestamp, speed)`` rows seen before ``before``,
+        in insertion order.
+        """
+        query = (
+            select(
+                CarSighting.id, CarSighting.plate_number, CarSighting.road_id, CarSighting.timestamp, CarSighting.speed
+            )
+            .where(CarSighting.timestamp < before)
+            .order_by(CarSighting.id)
+            .limit(limit)
+        )
+        return await self.get_rows(query)
+
+    async def delete_sightings(self, ids: list[int]) -> None:
+        """
+        Delete sightings by id after they were compacted. Ids rather than a time range,
+        so rows committed late by a concurrent transaction are never dropped unread.
+        """
+        await self.uow.execute(delete(CarSighting).where(CarSighting.id.in_(ids)))
+
+
+class CarTrajectoryChunkCrud(CrudEntity[CarTrajectoryChunk]):
+    """CRUD operations for CarTrajectoryChunk model."""
+
+    def __init__(self, uow: PgUnitOfWork):
+        super().__init__(model=CarTrajectoryChunk, uow=uow)
+
+    async def get_chunks(self, plate_number: str, since: datetime, until: datetime) -> list[CarTrajectoryChunk]:
+        """Get the chunks of a car overlapping a time range, oldest first."""
+        query = (
+            select(CarTrajectoryChunk)
+            .where(
+                CarTrajectoryChunk.plate_number == plate_number,
+                CarTrajectoryChunk.ended_at >= since,
+                CarTrajectoryChunk.started_at <= until,
+            )
+            .order_by(CarTrajectoryChunk.started_at)
+        )
+        return await self.get_by_query(query)
+
+    async def get_open_chunks(self, plate_numbers: list[str], max_points: int) -> dict[str, CarTrajectoryChunk]:
+        """Get the latest chunk of each car, when it still has room for fewer than ``max_points`` sightings."""
+        query = (
+            select(CarTrajectoryChunk)
+            .where(CarTrajectoryChunk.plate_number.in_(plate_numbers), CarTrajectoryChunk.points < max_points)
+            .order_by(CarTrajectoryChunk.started_at)
+        )
+        return {chunk.plate_number: chunk for chunk in await self.get_by_query(query)}
+
+
+class OdJobCrud(CrudEntity[OdJob]):
+    """CRUD operations for OdJob model."""
+
+    def __init__(self, uow: PgUnitOfWork):
+        super().__init__(model=OdJob, uow=uow)
+
+    async def create_job(self, level: OdLevel, since: datetime, until: datetime) -> OdJob:
+        """Record a job run that starts now."""
+        return await self.create_entity(
+            {"level": level.value, "since": since, "until": until, "status": JobStatus.RUNNING.value}
+        )
+
+    async def finish_job(self, job_id: UUID, status: JobStatus, trips: int = 0, pairs: int = 0) -> None:
+        """Record the outcome of a job run."""
+        now = datetime.now(UTC)
+        await self.uow.execute(
+            update(OdJob)
+            .where(OdJob.id == job_id)
+            .values(status=status.value, trips=trips, pairs=pairs, finished_at=now, updated_at=now)
+        )
+
+    async def get_job(self, job_id: UUID) -> OdJob | None:
+        """Get a job run by ID."""
+        jobs = await self.get_by_query(select(OdJob).where(OdJob.id == job_id))
+        return jobs[0] if jobs else None
+
+    async def get_jobs(self, limit: int) -> list[OdJob]:
+        """Get the latest job runs, newest first."""
+        return await self.get_by_query(select(OdJob).order_by(OdJob.created_at.desc()).limit(limit))
+
+
+class OdCountCrud(CrudEntity[OdCount]):
+    """CRUD operations for OdCount model."""
+
+    def __init__(self, uow: PgUnitOfWork):
+        super().__init__(model=OdCount, uow=uow)
+
+    async def add_counts(self, job_id: UUID, origins: list[str], destinations: list[str], trips: list[int]) -> None:
+        """Insert the counts of a job with one executemany."""
+        await self.uow.execute(
+            insert(OdCount),
+            [
+                {"job_id": job_id, "origin": origin, "destination": destination, "trips": count}
+                for origin, destination, count in zip(origins, destinations, trips, strict=True)
+            ],
+        )
+
+    async def get_top_counts(
+        self, job_id: UUID, limit: int, origin: str | None = None, destination: str | None = None
+    ) -> list[Row]:
+        """
+        Get ``(origin, destination, trips)`` rows of a job with the most trips first,
+        from or to one zone when given.
+        """
+        query = select(OdCount.origin, OdCount.destination, OdCount.trips).where(OdCount.job_id == job_id)
+        if origin is not None:
+            query = query.where(OdCount.origin == origin)
+        if destination is not None:
+            query = query.where(OdCount.destination == destination)
+        return await self.get_rows(query.order_by(OdCount.trips.desc()).limit(limit))
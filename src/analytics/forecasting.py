@@ -0,0 +1,165 @@
+from datetime import UTC, datetime, timedelta
+from uuid import UUID
+
+import numpy as np
+
+from src.commons.project_utils import grow_rows
+from src.commons.schemas import ForecastPoint, TrafficForecast
+from src.config import settings
+
+FORECAST_HORIZONS = (5, 15, 30)  # minutes
+# Minimum spacing of trend updates, bursts of measurements only move the level.
+TREND_MIN_MINUTES = 1.0
+
+# Column order of the per-road state arrays.
+SPEED, DENSITY = 0, 1
+
+
+class TrafficForecaster:
+    """
+    Incremental additive Holt-Winters forecaster for speed and density per road.
+
+    Each road owns one row in preallocated ``float32`` arrays: level, damped trend
+    (per minute) and a time-of-day seasonal profile with one bucket per
+    ``slot_minutes``. Memory per road is fixed (about 0.8 KB with 15-minute
+    slots), so tens of thousands of roads fit in a few dozen megabytes.
+    Measurements may arrive at irregular intervals, the trend is estimated from
+    the level change since the last trend update at least ``TREND_MIN_MINUTES`` ago.
+    """
+
+    def __init__(
+        self,
+        slot_minutes: int = 15,
+        alpha: float = 0.3,
+        beta: float = 0.05,
+        gamma: float = 0.1,
+        phi: float = 0.98,
+        capacity: int = 1024,
+    ) -> None:
+        self.slot_seconds = slot_minutes * 60
+        self.slots = 24 * 60 // slot_minutes
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.phi = phi
+        self._rows: dict[UUID, int] = {}
+        self._level = np.zeros((capacity, 2), dtype=np.float32)
+        self._trend = np.zeros((capacity, 2), dtype=np.float32)
+        self._anchor_level = np.zeros((capacity, 2), dtype=np.float32)
+        self._anchor_at = np.zeros(capacity, dtype=np.float64)  # epoch seconds
+        self._season = np.zeros((capacity, 2, self.slots), dtype=np.float32)
+        self._updated_at = np.zeros(capacity, dtype=np.float64)  # epoch seconds
+        self._observations = np.zeros(capacity, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, road_id: object) -> bool:
+        return road_id in self._rows
+
+    def _row(self, road_id: UUID) -> int:
+        row = self._rows.get(road_id)
+        if row is not None:
+            return row
+        row = len(self._rows)
+        if row == len(self._level):
+            self._grow()
+        self._rows[road_id] = row
+        return row
+
+    def _grow(self) -> None:
+        self._level = grow_rows(self._level)
+        self._trend = grow_rows(self._trend)
+        self._anchor_level = grow_rows(self._anchor_level)
+        self._anchor_at = grow_rows(self._anchor_at)
+        self._season = grow_rows(self._season)
+        self._updated_at = grow_rows(self._updated_at)
+        self._observations = grow_rows(self._observations)
+
+    def _slot(self, epoch: float | np.ndarray) -> np.ndarray:
+        return (np.asarray(epoch) // self.slot_seconds).astype(np.int64) % self.slots
+
+    def _damped(self, minutes: float | np.ndarray) -> np.ndarray:
+        """Sum of ``phi**i`` for ``i`` in ``1..minutes``, the damped trend multiplier."""
+        return self.phi * (1 - np.power(self.phi, minutes)) / (1 - self.phi)
+
+    def update(self, road_id: UUID, timestamp: datetime, speed: float, density: float) -> None:
+        """Fold one measurement into the road's model in constant time."""
+        row = self._row(road_id)
+        epoch = timestamp.timestamp()
+        slot = int(self._slot(epoch))
+        observed = np.array((speed, density), dtype=np.float32)
+
+        if self._observations[row] == 0:
+            self._level[row] = observed
+            self._trend[row] = 0
+            self._anchor_level[row] = observed
+            self._anchor_at[row] = epoch
+        else:
+            # Late measurements are folded in without moving the clock back.
+            minutes = max(epoch - self._updated_at[row], 0.0) / 60
+            trend = self._trend[row]
+            season = self._season[row, :, slot]
+
+            expected = self._level[row] + trend * self._damped(minutes)
+            self._level[row] = self.alpha * (observed - season) + (1 - self.alpha) * expected
+
+            anchor_minutes = (epoch - self._anchor_at[row]) / 60
+            if anchor_minutes >= TREND_MIN_MINUTES:
+                slope = (self._level[row] - self._anchor_level[row]) / anchor_minutes
+                self._trend[row] = self.beta * slope + (1 - self.beta) * trend * np.power(self.phi, anchor_minutes)
+                self._anchor_level[row] = self._level[row]
+                self._anchor_at[row] = epoch
+
+            self._season[row, :, slot] = self.gamma * (observed - self._level[row]) + (1 - self.gamma) * season
+
+        self._updated_at[row] = max(self._updated_at[row], epoch)
+        self._observations[row] += 1
+
+    def forecast(
+        self,
+        road_id: UUID,
+        horizons: tuple[int, ...] = FORECAST_HORIZONS,
+        now: datetime | None = None,
+    ) -> TrafficForecast | None:
+        """
+        Predict speed and density ``horizons`` minutes ahead of ``now``.
+
+        Returns:
+            Forecast for the road, or None if no measurement has been seen for it yet
+        """
+        row = self._rows.get(road_id)
+        if row is None:
+            return None
+
+        now = now or datetime.now(UTC)
+        offsets = np.asarray(horizons, dtype=np.float64) * 60
+        targets = now.timestamp() + offsets
+        minutes_ahead = np.maximum(targets - self._updated_at[row], 0) / 60
+
+        # Shape (2, len(horizons)): one row per metric.
+        values = (
+            self._level[row][:, None]
+            + self._trend[row][:, None] * self._damped(minutes_ahead)[None, :]
+            + self._season[row][:, self._slot(targets)]
+        )
+        values = np.maximum(values, 0)
+
+        return TrafficForecast(
+            road_id=road_id,
+            generated_at=now,
+            last_measurement_at=datetime.fromtimestamp(self._updated_at[row], UTC),
+            observations=int(self._observations[row]),
+            points=[
+                ForecastPoint(
+                    horizon_minutes=horizon,
+                    timestamp=now + timedelta(minutes=horizon),
+                    speed=float(values[SPEED, index]),
+                    density=float(values[DENSITY, index]),
+                )
+                for index, horizon in enumerate(horizons)
+            ],
+        )
+
+
+traffic_forecaster = TrafficForecaster(slot_minutes=settings.FORECAST_SLOT_MINUTES)
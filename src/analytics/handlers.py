@@ -1,9 +1,12 @@
+import asyncio
 from datetime import UTC, datetime, timedelta
 
 from loguru import logger
 
-from src.commons.schemas import TrafficAnalysis
+from src.commons.schemas import TrafficAnalysis, TrafficAnomaly, TrafficState
 from src.commons.state import State
+from src.config import settings
+from src.services.notify import ChangeFeed
 
 
 class TrafficStateManager:
@@ -15,6 +18,7 @@ class TrafficStateManager:
         self.last_state_change: datetime | None = None
         self.current_state: State = State("LOW")
         self.cooldown_minutes: int = 10
+        self.congestion_level: float = 0
         self._response_data: TrafficAnalysis | None = None
 
     def can_change_state(self) -> bool:
@@ -64,6 +68,69 @@ class TrafficStateManager:
     def response_data(self, payload: TrafficAnalysis) -> None:
         """Set the response data."""
         self._response_data = payload
+        self.congestion_level = payload.congestion_level
+
+    def to_message(self) -> TrafficState:
+        """Build the state message sent to other workers and WebSocket clients."""
+        return TrafficState(
+            state=self.current_state.value,
+            congestion_level=self.congestion_level,
+            last_change=self.last_state_change,
+            cooldown_until=self.last_state_change + timedelta(minutes=self.cooldown_minutes)
+            if self.last_state_change
+            else None,
+        )
+
+    def apply(self, message: TrafficState) -> None:
+        """Take over a state change made by another worker, its cooldown was already checked there."""
+        self.current_state = State(message.state)  # pyright: ignore[reportArgumentType]
+        self.last_state_change = message.last_change
+        self.congestion_level = message.congestion_level
+
+
+class EventHub[T]:
+    """
+    Fan-out of events to WebSocket subscribers.
+
+    Every subscriber owns a bounded queue. Publishing never blocks: a subscriber
+    that falls behind loses its oldest events.
+    """
+
+    def __init__(self, maxsize: int = 100) -> None:
+        self.maxsize = maxsize
+        self._subscribers: set[asyncio.Queue[T]] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue[T]:
+        """Register a subscriber and return its queue."""
+        queue: asyncio.Queue[T] = asyncio.Queue(self.maxsize)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue[T]) -> None:
+        """Remove a subscriber."""
+        self._subscribers.discard(queue)
+
+    def publish(self, event: T) -> None:
+        """Deliver ``event`` to every subscriber."""
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
 
 
 traffic_state_manager = TrafficStateManager()
+anomaly_hub: EventHub[TrafficAnomaly] = EventHub()
+congestion_hub: EventHub[TrafficState] = EventHub()
+
+
+def _on_state_change(message: TrafficState) -> None:
+    traffic_state_manager.apply(message)
+    congestion_hub.publish(message)
+
+
+traffic_state_feed = ChangeFeed(settings.CHANGE_FEED_CHANNEL, TrafficState, _on_state_change)
+# Anomalies are detected where the measurements are ingested and streamed by every API worker.
+anomaly_feed = ChangeFeed(settings.ANOMALY_FEED_CHANNEL, TrafficAnomaly, anomaly_hub.publish)
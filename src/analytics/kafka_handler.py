@@ -1,22 +1,74 @@
+import asyncio
+import contextlib
+
 from faststream import FastStream
 from faststream.kafka import KafkaBroker
 from loguru import logger
 
-from src.analytics.services import CarService, RoadConditionService, RoadService
+from src.analytics.handlers import anomaly_feed, traffic_state_feed
+from src.analytics.services import (
+    CarService,
+    RoadConditionService,
+    RoadService,
+    start_speed_sketch_flush,
+    start_trajectory_compaction,
+)
+from src.analytics.shared_aggregates import shared_aggregates
 from src.commons.enums import Topics
 from src.commons.schemas import CarCreate, RoadConditionCreate, RoadCreate
-from src.config import settings
+from src.config import log_sampler, settings, setup_logging
+from src.services.cache import cache_backend
+from src.services.db import dispose_engines
 from src.services.kafka import serializer
+from src.services.metrics import kafka_handler_seconds, timed
+from src.services.profiling import profiled
 
 broker = KafkaBroker(
     settings.KAFKA_BOOTSTRAP_SERVERS,
     key_serializer=serializer,
     value_serializer=serializer,
 )
+# Ingestion worker: faststream run src.analytics.kafka_handler:app
+# Every process joins the GROUP_ID consumer group, so the tier scales up to the partition count.
 app = FastStream(broker)
+_tasks: list[asyncio.Task] = []
+
+
+@app.on_startup
+async def start_worker() -> None:
+    """
+    Set up logging, publish on the change feeds, in shared memory and the speed sketches,
+    and compact car sightings before consuming.
+    """
+    setup_logging()
+    publishing = shared_aggregates.start_publishing() if settings.SHARED_AGGREGATES_ENABLED else None
+    await traffic_state_feed.start(settings.db_url_postgresql)
+    await anomaly_feed.start(settings.db_url_postgresql)
+    for task in (publishing, start_speed_sketch_flush(), start_trajectory_compaction()):
+        if task is not None:
+            _tasks.append(task)
+
+
+@app.after_shutdown
+async def stop_worker() -> None:
+    """Stop the tasks, release the shared memory and close the change feeds, the cache backend and the engines."""
+    while _tasks:
+        task = _tasks.pop()
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    shared_aggregates.close()
+    await anomaly_feed.stop()
+    await traffic_state_feed.stop()
+    if cache_backend is not None:
+        await cache_backend.close()
+    await dispose_engines()
+    await logger.complete()
 
 
-@broker.subscriber(Topics.CAR.value)
+@broker.subscriber(Topics.CAR.value, group_id=settings.GROUP_ID)
+@timed(kafka_handler_seconds.labels(Topics.CAR.value))
+@profiled(Topics.CAR.value)
 async def process_car_data(msg: CarCreate):
     """
     Process car data from traffic sensors.
@@ -24,22 +76,29 @@ async def process_car_data(msg: CarCreate):
     """
     car_service = CarService()
     await car_service.process_sensor_data(msg)
-    logger.info(f"Processed car data from sensor: {msg.plate_number}")
+    if log_sampler.should_log(Topics.CAR.value):
+        logger.info("Processed car data from sensor: {}", msg.plate_number)
 
 
-@broker.subscriber(Topics.ROAD_CONDITION.value)
+@broker.subscriber(Topics.ROAD_CONDITION.value, group_id=settings.GROUP_ID)
+@timed(kafka_handler_seconds.labels(Topics.ROAD_CONDITION.value))
+@profiled(Topics.ROAD_CONDITION.value)
 async def create_road_condition(msg: RoadConditionCreate):
     """
     Subscriber for creating a road condition.
     """
     await RoadConditionService().create_road_condition(payload=msg)
-    logger.info(f"Road condition created: {msg}")
+    if log_sampler.should_log(Topics.ROAD_CONDITION.value):
+        logger.info("Road condition created: {}", msg)
 
 
-@broker.subscriber(Topics.ROAD.value)
+@broker.subscriber(Topics.ROAD.value, group_id=settings.GROUP_ID)
+@timed(kafka_handler_seconds.labels(Topics.ROAD.value))
+@profiled(Topics.ROAD.value)
 async def create_road(msg: RoadCreate):
     """
     Subscriber for creating a road.
     """
     await RoadService().create_road(payload=msg)
-    logger.info(f"Road created: {msg}")
+    if log_sampler.should_log(Topics.ROAD.value):
+        logger.info("Road created: {}", msg)
@@ -0,0 +1,319 @@
+"""
+Origin-destination matrix batch job.
+
+Counts the trips between zones (roads, streets or cities) in a time range, from the
+car trajectories. The range is cut into time slices that run in a process pool. Each
+slice streams its chunks and sightings with a server-side cursor, a car at a time, from
+one snapshot on Postgres, and accumulates the trip counts sparsely, so memory stays
+bounded by the number of distinct zone pairs and not by the number of sightings. The
+counts are written to ``od_count``.
+
+A trip is counted by the slice it starts in. Slices read ``OD_TRIP_GAP_MINUTES`` before
+their start, to tell real trip starts from cars that were already driving, and up to
+``OD_MAX_TRIP_HOURS`` after their end, to find where the trips end. Longer trips end at
+their last sighting within that time.
+
+Usage:
+    python -m src.analytics.od_matrix --since 2025-03-01 --until 2025-03-08 --level street
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from uuid import UUID
+
+import numpy as np
+from loguru import logger
+from sqlalchemy import ColumnElement, Row, func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.orm import InstrumentedAttribute
+
+from src.analytics.cruds import OdCountCrud, OdJobCrud, RoadCrud
+from src.analytics.trajectories import Trajectory, decode, to_epoch_ms, to_road_keys
+from src.commons.enums import JobStatus, OdLevel
+from src.commons.models import CarSighting, CarTrajectoryChunk
+from src.config import settings, setup_logging
+from src.services.db import PgUnitOfWork, engine_options
+
+# Rows per insert of the results.
+WRITE_BATCH_SIZE = 10_000
+
+
+class PairCounter:
+    """
+    Sparse trip counts per ``(origin, destination)`` zone pair, keyed ``origin * zones + destination``.
+    New pairs are buffered and merged into the sorted unique keys once ``buffer_size`` pile up.
+    """
+
+    def __init__(self, zones: int, buffer_size: int = 1_000_000) -> None:
+        self.zones = zones
+        self.buffer_size = buffer_size
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self._pending: list[np.ndarray] = []
+        self._pending_size = 0
+
+    def add(self, origins: np.ndarray, destinations: np.ndarray) -> None:
+        """Count one trip per origin and destination."""
+        self._pending.append(origins.astype(np.int64) * self.zones + destinations)
+        self._pending_size += len(origins)
+        if self._pending_size >= self.buffer_size:
+            self._flush()
+
+    def merge(self, keys: np.ndarray, counts: np.ndarray) -> None:
+        """Add the counts of another counter over the same zones."""
+        self._flush()
+        self._combine(keys, counts)
+
+    def result(self) -> tuple[np.ndarray, np.ndarray]:
+        """Unique pair keys and their trip counts."""
+        self._flush()
+        return self.keys, self.counts
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        keys, counts = np.unique(np.concatenate(self._pending), return_counts=True)
+        self._pending.clear()
+        self._pending_size = 0
+        self._combine(keys, counts)
+
+    def _combine(self, keys: np.ndarray, counts: np.ndarray) -> None:
+        keys = np.concatenate((self.keys, keys))
+        counts = np.concatenate((self.counts, counts))
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=counts, minlength=len(self.keys)).astype(np.int64)
+
+
+@dataclass(slots=True, frozen=True)
+class SliceTask:
+    """Time slice of the job, sent to a worker process."""
+
+    url: str
+    start: datetime
+    end: datetime
+    road_keys: np.ndarray  # sorted ROAD_KEY of every road
+    road_zones: np.ndarray  # zone index per road of road_keys
+    zones: int
+    gap_ms: int
+    max_trip: timedelta
+    batch_size: int
+
+
+def time_slices(since: datetime, until: datetime, length: timedelta) -> Iterator[tuple[datetime, datetime]]:
+    """Cut ``[since, until)`` into consecutive slices of at most ``length``."""
+    start = since
+    while start < until:
+        end = min(start + length, until)
+        yield start, end
+        start = end
+
+
+def count_slice(task: SliceTask) -> tuple[np.ndarray, np.ndarray]:
+    """Process pool entry point, count the trips starting in a time slice."""
+    return asyncio.run(count_slice_async(task))
+
+
+async def count_slice_async(task: SliceTask) -> tuple[np.ndarray, np.ndarray]:
+    """Count the trips starting in a time slice, streaming one car at a time."""
+    window_start = task.start - timedelta(milliseconds=task.gap_ms)
+    window_end = task.end + task.max_trip
+    start_ms, end_ms = to_epoch_ms(task.start), to_epoch_ms(task.end)
+    counter = PairCounter(task.zones)
+
+    engine = create_async_engine(task.url, **engine_options(task.url))
+    try:
+        async with engine.connect() as chunk_conn, engine.connect() as sighting_conn:
+            dialect = engine.dialect.name
+            if dialect == "postgresql":
+                await _share_snapshot(chunk_conn, sighting_conn)
+            chunk_rows = await chunk_conn.stream(
+                select(CarTrajectoryChunk)
+                .where(CarTrajectoryChunk.ended_at >= window_start, CarTrajectoryChunk.started_at <= window_end)
+                .order_by(_plate_order(CarTrajectoryChunk.plate_number, dialect), CarTrajectoryChunk.started_at)
+                .execution_options(yield_per=task.batch_size)
+            )
+            sighting_rows = await sighting_conn.stream(
+                select(CarSighting.plate_number, CarSighting.road_id, CarSighting.timestamp, CarSighting.speed)
+                .where(CarSighting.timestamp >= window_start, CarSighting.timestamp <= window_end)
+                .order_by(_plate_order(CarSighting.plate_number, dialect))
+                .execution_options(yield_per=task.batch_size)
+            )
+            async for chunks, sightings in _merge_by_plate(_by_plate(chunk_rows), _by_plate(sighting_rows)):
+                parts = [decode(chunk) for chunk in chunks]  # pyright: ignore[reportArgumentType]
+                parts.append(Trajectory.from_rows(row[1:] for row in sightings))
+                trajectory = Trajectory.concat(parts).between(window_start, window_end)
+                starts, ends = trajectory.trip_bounds(task.gap_ms)
+                in_slice = (trajectory.timestamp[starts] >= start_ms) & (trajectory.timestamp[starts] < end_ms)
+                if not in_slice.any():
+                    continue
+                zones = _lookup_zones(task, trajectory.road_keys)
+                origins = zones[trajectory.road[starts[in_slice]]]
+                destinations = zones[trajectory.road[ends[in_slice]]]
+                # Trips from or to roads deleted since are left out.
+                known = (origins >= 0) & (destinations >= 0)
+                counter.add(origins[known], destinations[known])
+    finally:
+        await engine.dispose()
+    return counter.result()
+
+
+async def _share_snapshot(source: AsyncConnection, target: AsyncConnection) -> None:
+    """
+    Start REPEATABLE READ transactions on both connections with the same snapshot, so sightings
+    compacted into chunks while the slice streams are read exactly once.
+    """
+    source = await source.execution_options(isolation_level="REPEATABLE READ")
+    snapshot = (await source.execute(select(func.pg_export_snapshot()))).scalar_one()
+    target = await target.execution_options(isolation_level="REPEATABLE READ")
+    # SET takes no bind parameters, the ID comes from the server.
+    await target.execute(text(f"SET TRANSACTION SNAPSHOT '{snapshot}'"))
+
+
+def _lookup_zones(task: SliceTask, road_keys: np.ndarray) -> np.ndarray:
+    """Zone index per road key, -1 for roads that no longer exist."""
+    if not len(task.road_keys):
+        # Chunks keep road IDs without a foreign key, so they can outlive every road.
+        return np.full(len(road_keys), -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(task.road_keys, road_keys), len(task.road_keys) - 1)
+    found = task.road_keys[positions] == road_keys
+    return np.where(found, task.road_zones[positions], -1)
+
+
+def _plate_order(column: InstrumentedAttribute[str], dialect: str) -> ColumnElement[str]:
+    """Sort plates by code point on every database, to merge the two streams in Python."""
+    return column.collate("C") if dialect == "postgresql" else column.expression
+
+
+async def _by_plate(result: AsyncIterator[Row]) -> AsyncIterator[tuple[str, list[Row]]]:
+    """Group streamed rows sorted by plate into one list per plate."""
+    plate: str | None = None
+    group: list[Row] = []
+    async for row in result:
+        if row.plate_number != plate:
+            if group:
+                yield plate, group  # pyright: ignore[reportReturnType]
+            plate, group = row.plate_number, []
+        group.append(row)
+    if group:
+        yield plate, group  # pyright: ignore[reportReturnType]
+
+
+async def _merge_by_plate(
+    chunks: AsyncIterator[tuple[str, list[Row]]],
+    sightings: AsyncIterator[tuple[str, list[Row]]],
+) -> AsyncIterator[tuple[list[Row], list[Row]]]:
+    """Join the chunks and the sightings of each plate, both streams sorted by plate."""
+    chunk = await anext(chunks, None)
+    sighting = await anext(sightings, None)
+    while chunk is not None or sighting is not None:
+        if sighting is None or (chunk is not None and chunk[0] < sighting[0]):
+            yield chunk[1], []  # pyright: ignore[reportOptionalSubscript]
+            chunk = await anext(chunks, None)
+        elif chunk is None or sighting[0] < chunk[0]:
+            yield [], sighting[1]
+            sighting = await anext(sightings, None)
+        else:
+            yield chunk[1], sighting[1]
+            chunk = await anext(chunks, None)
+            sighting = await anext(sightings, None)
+
+
+def _zones(rows: list[Row], level: OdLevel) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """Sorted keys of every road with their zone index, and the zone names."""
+    names: dict[str, int] = {}
+    road_zones = []
+    for road_id, street, city in rows:
+        name = {OdLevel.ROAD: str(road_id), OdLevel.STREET: f"{city}/{street}", OdLevel.CITY: city}[level]
+        road_zones.append(names.setdefault(name, len(names)))
+    road_keys = to_road_keys(row[0] for row in rows)
+    order = np.argsort(road_keys)
+    return road_keys[order], np.array(road_zones, dtype=np.int64)[order], list(names)
+
+
+async def compute_od_matrix(
+    since: datetime,
+    until: datetime,
+    level: OdLevel = OdLevel.ROAD,
+    workers: int | None = None,
+) -> UUID:
+    """
+    Run the job over ``[since, until)`` and store the counts, with ``workers`` processes
+    (``OD_WORKERS`` by default, 0 runs the slices one after another in this process).
+
+    Returns:
+        ID of the OdJob row of the run
+    """
+    uow = PgUnitOfWork()
+    async with uow:
+        job = await OdJobCrud(uow).create_job(level, since, until)
+        job_id = job.id
+        road_keys, road_zones, names = _zones(await RoadCrud(uow).get_road_zones(), level)
+
+    try:
+        tasks = [
+            SliceTask(
+                url=settings.db_url_postgresql,
+                start=start,
+                end=end,
+                road_keys=road_keys,
+                road_zones=road_zones,
+                zones=len(names),
+                gap_ms=round(settings.OD_TRIP_GAP_MINUTES * 60_000),
+                max_trip=timedelta(hours=settings.OD_MAX_TRIP_HOURS),
+                batch_size=settings.OD_STREAM_BATCH_SIZE,
+            )
+            for start, end in time_slices(since, until, timedelta(hours=settings.OD_SLICE_HOURS))
+        ]
+        counter = PairCounter(len(names))
+        workers = settings.OD_WORKERS if workers is None else workers
+        if workers > 0:
+            loop = asyncio.get_running_loop()
+            # Spawned workers start clean instead of inheriting the event loop and connections.
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                for done in asyncio.as_completed([loop.run_in_executor(pool, count_slice, task) for task in tasks]):
+                    counter.merge(*await done)
+        else:
+            for task in tasks:
+                counter.merge(*await count_slice_async(task))
+        keys, counts = counter.result()
+
+        async with uow:
+            crud = OdCountCrud(uow)
+            for offset in range(0, len(keys), WRITE_BATCH_SIZE):
+                batch_keys = keys[offset : offset + WRITE_BATCH_SIZE]
+                await crud.add_counts(
+                    job_id,
+                    [names[origin] for origin in (batch_keys // len(names)).tolist()],
+                    [names[destination] for destination in (batch_keys % len(names)).tolist()],
+                    counts[offset : offset + WRITE_BATCH_SIZE].tolist(),
+                )
+            await OdJobCrud(uow).finish_job(job_id, JobStatus.DONE, trips=int(counts.sum()), pairs=len(keys))
+    except BaseException:
+        async with uow:
+            await OdJobCrud(uow).finish_job(job_id, JobStatus.FAILED)
+        raise
+
+    logger.info("OD job {} counted {} trips between {} zone pairs", job_id, int(counts.sum()), len(keys))
+    return job_id
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", type=datetime.fromisoformat, required=True, help="Start of the range (UTC)")
+    parser.add_argument("--until", type=datetime.fromisoformat, required=True, help="End of the range (UTC)")
+    parser.add_argument("--level", type=OdLevel, default=OdLevel.ROAD, choices=list(OdLevel), help="Zones")
+    parser.add_argument("--workers", type=int, default=settings.OD_WORKERS, help="Worker processes, 0 for none")
+    args = parser.parse_args()
+
+    setup_logging()
+    since, until = (moment.replace(tzinfo=moment.tzinfo or UTC) for moment in (args.since, args.until))
+    asyncio.run(compute_od_matrix(since, until, args.level, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,273 @@
 import asyncio
 import contextlib
-from datetime import timedelta
-from typing import NoReturn
+from datetime import UTC, datetime, timedelta
+from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
 from loguru import logger
 
-from src.analytics.handlers import traffic_state_manager
-from src.analytics.services import TrafficAnalysisService
-from src.commons.schemas import TrafficAnalysis, TrafficState
+from src.analytics.forecasting import FORECAST_HORIZONS, traffic_forecaster
+from src.analytics.handlers import anomaly_hub, congestion_hub, traffic_state_manager
+from src.analytics.services import (
+    CarService,
+    OdMatrixService,
+    RoadService,
+    TrafficAnalysisService,
+    TrajectoryService,
+)
+from src.analytics.shared_aggregates import shared_aggregates
+from src.commons.schemas import (
+    BboxCongestion,
+    CarMatch,
+    CarTrajectory,
+    LiveAggregate,
+    OdJobInfo,
+    OdMatrix,
+    RoadDistance,
+    Route,
+    SpeedPercentiles,
+    TrafficAnalysis,
+    TrafficAnomaly,
+    TrafficForecast,
+    TrafficState,
+)
+from src.config import settings
+from src.services.metrics import websocket_clients
 
 router = APIRouter(prefix="/traffic", tags=["traffic"])
 
+congestion_clients = websocket_clients.labels("/traffic/ws/congestion")
+anomaly_clients = websocket_clients.labels("/traffic/ws/anomalies")
+
+MAX_TRAJECTORY_RANGE = timedelta(days=7)
+
+
+@router.get("/analysis", response_model=dict[UUID, TrafficAnalysis])
+async def get_traffic_analyses(
+    road_ids: Annotated[list[UUID], Query(min_length=1, max_length=100, description="Road segment IDs")],
+) -> dict[UUID, TrafficAnalysis]:
+    """
+    Get the current traffic analyses of several road segments in one request.
+    Answered from the cache with a single multi-get, misses with a single query.
+
+    Args:
+        road_ids: Road segment IDs
+
+    Returns:
+        Traffic analysis per road, roads without a snapshot yet are left out
+    """
+    return await TrafficAnalysisService(read_only=True).get_traffic_snapshots(list(dict.fromkeys(road_ids)))
+
+
+@router.get("/live", response_model=dict[UUID, LiveAggregate])
+async def get_live_aggregates(
+    road_ids: Annotated[list[UUID], Query(min_length=1, max_length=100, description="Road segment IDs")],
+) -> dict[UUID, LiveAggregate]:
+    """
+    Get the running totals of several road segments, as published by the ingestion processes.
+    Read from shared memory on this host, no database access.
+
+    Args:
+        road_ids: Road segment IDs
+
+    Returns:
+        Totals per road, roads without measurements yet are left out
+    """
+    if not settings.SHARED_AGGREGATES_ENABLED:
+        raise HTTPException(status_code=503, detail="Shared aggregates are disabled")
+    return shared_aggregates.read(dict.fromkeys(road_ids))
+
+
+@router.get("/bbox", response_model=BboxCongestion, response_model_exclude_none=True)
+async def get_bbox_congestion(
+    south: Annotated[float, Query(ge=-90, le=90)],
+    west: Annotated[float, Query(ge=-180, le=180)],
+    north: Annotated[float, Query(ge=-90, le=90)],
+    east: Annotated[float, Query(ge=-180, le=180)],
+    zoom: Annotated[int, Query(ge=0, le=22, description="Map zoom level")],
+) -> BboxCongestion:
+    """
+    Get the congestion of every road in a map viewport.
+    Roads come back as parallel columns when zoomed in, and merged into clusters when zoomed out.
+
+    Args:
+        south: Southern latitude of the box
+        west: Western longitude of the box
+        north: Northern latitude of the box
+        east: Eastern longitude of the box
+        zoom: Map zoom level
+
+    Returns:
+        Road or cluster columns of the viewport
+    """
+    if south > north or west > east:
+        raise HTTPException(status_code=422, detail="The box must have south <= north and west <= east")
+    return await TrafficAnalysisService(read_only=True).congestion_in_bbox(south, west, north, east, zoom)
+
+
+@router.get("/roads/nearby", response_model=list[RoadDistance])
+async def get_roads_nearby(
+    latitude: Annotated[float, Query(ge=-90, le=90)],
+    longitude: Annotated[float, Query(ge=-180, le=180)],
+    radius_km: Annotated[float, Query(gt=0, le=50, description="Search radius in km")] = 1,
+) -> list[RoadDistance]:
+    """
+    Get the roads within a radius of a GPS point, nearest first.
+    Served from the in-memory spatial grid index of the road reference points.
+
+    Args:
+        latitude: Latitude of the point
+        longitude: Longitude of the point
+        radius_km: Search radius
+
+    Returns:
+        Roads with their distance
+    """
+    return await RoadService(read_only=True).roads_within(latitude, longitude, radius_km)
+
+
+@router.get("/roads/nearest", response_model=RoadDistance)
+async def get_nearest_road(
+    latitude: Annotated[float, Query(ge=-90, le=90)],
+    longitude: Annotated[float, Query(ge=-180, le=180)],
+    max_km: Annotated[float, Query(gt=0, le=50, description="Maximum distance in km")] = 5,
+) -> RoadDistance:
+    """
+    Get the road nearest to a GPS point.
+
+    Args:
+        latitude: Latitude of the point
+        longitude: Longitude of the point
+        max_km: Maximum distance to search
+
+    Returns:
+        The nearest road with its distance
+    """
+    nearest = await RoadService(read_only=True).nearest_road(latitude, longitude, max_km)
+    if nearest is None:
+        raise HTTPException(status_code=404, detail=f"No road within {max_km} km")
+    return nearest
+
+
+@router.get("/route", response_model=Route)
+async def get_route(
+    origin: Annotated[str, Query(min_length=1, description="Start point name of a road")],
+    destination: Annotated[str, Query(min_length=1, description="End point name of a road")],
+) -> Route:
+    """
+    Get the fastest route between two points of the road network and its ETA.
+    Served from the in-memory road graph, paths are cached until their travel times change.
+
+    Args:
+        origin: Start point
+        destination: End point
+
+    Returns:
+        Roads to drive with the route length and travel time
+    """
+    route = await TrafficAnalysisService(read_only=True).route(origin, destination)
+    if route is None:
+        raise HTTPException(status_code=404, detail=f"No route from {origin} to {destination}")
+    return route
+
+
+@router.get("/cars/search", response_model=list[CarMatch])
+async def search_cars(
+    q: Annotated[str, Query(min_length=1, max_length=255, description="Part of a plate number")],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+) -> list[CarMatch]:
+    """
+    Find cars by part of their plate number. Plates starting with the query come first,
+    queries of 3 characters and more also match anywhere in the plate, ignoring case.
+
+    Args:
+        q: Part of a plate number
+        limit: Maximum number of cars
+
+    Returns:
+        Matching cars ordered by plate number, prefix matches first
+    """
+    term = q.strip()
+    if not term:
+        raise HTTPException(status_code=422, detail="q must not be blank")
+    return await CarService(read_only=True).search_cars(term, limit)
+
+
+@router.get("/cars/{plate_number}/trajectory", response_model=CarTrajectory)
+async def get_car_trajectory(
+    plate_number: str,
+    since: Annotated[datetime | None, Query(description="Start of the range, 24 hours before until by default")] = None,
+    until: Annotated[datetime | None, Query(description="End of the range, now by default")] = None,
+) -> CarTrajectory:
+    """
+    Get where and how fast a car was seen in a time range of up to 7 days.
+    Read from the car's compacted trajectory chunks and the recent sighting log.
+
+    Args:
+        plate_number: Car plate number
+        since: Start of the range
+        until: End of the range
+
+    Returns:
+        Timestamps, roads and speeds of the sightings, oldest first
+    """
+    # Times without an offset are UTC.
+    until = until.replace(tzinfo=until.tzinfo or UTC) if until else datetime.now(UTC)
+    since = since.replace(tzinfo=since.tzinfo or UTC) if since else until - timedelta(hours=24)
+    if since > until:
+        raise HTTPException(status_code=422, detail="since must not be after until")
+    if until - since > MAX_TRAJECTORY_RANGE:
+        raise HTTPException(status_code=422, detail="The time range must not exceed 7 days")
+    return await TrajectoryService(read_only=True).car_trajectory(plate_number, since, until)
+
+
+@router.get("/od-matrix", response_model=list[OdJobInfo])
+async def get_od_jobs(
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+) -> list[OdJobInfo]:
+    """
+    Get the latest runs of the origin-destination matrix job, newest first.
+    Jobs are started with ``python -m src.analytics.od_matrix``.
+
+    Args:
+        limit: Number of runs
+
+    Returns:
+        Job runs with their range, zone level and status
+    """
+    return await OdMatrixService(read_only=True).get_jobs(limit)
+
+
+@router.get("/od-matrix/{job_id}", response_model=OdMatrix)
+async def get_od_matrix(
+    job_id: UUID,
+    limit: Annotated[int, Query(ge=1, le=10_000, description="Number of zone pairs")] = 100,
+    origin: Annotated[str | None, Query(description="Only trips from this zone")] = None,
+    destination: Annotated[str | None, Query(description="Only trips to this zone")] = None,
+) -> OdMatrix:
+    """
+    Get the origin-destination pairs with the most trips counted by a job run.
+
+    Args:
+        job_id: Job run ID
+        limit: Number of zone pairs
+        origin: Only trips from this zone (road ID, ``city/street`` or city, by the job level)
+        destination: Only trips to this zone
+
+    Returns:
+        The job run and its trip counts as parallel columns
+    """
+    try:
+        return await OdMatrixService(read_only=True).get_matrix(job_id, limit, origin, destination)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+
 
 @router.get("/{road_id}/analysis", response_model=TrafficAnalysis)
 async def get_traffic_analysis(road_id: UUID) -> TrafficAnalysis:
     """
-    Get current traffic analysis for a road segment.
+    Get current traffic analysis for a road segment, precomputed on ingestion.
 
     Args:
         road_id: Road segment ID
@@ -26,7 +276,7 @@ async def get_traffic_analysis(road_id: UUID) -> TrafficAnalysis:
         Current traffic analysis
     """
     try:
-        return await TrafficAnalysisService().analyze_traffic(road_id)
+        return await TrafficAnalysisService(read_only=True).get_traffic_snapshot(road_id)
     except ValueError as e:
         logger.error(f"Error analyzing traffic for road {road_id}: {e}")
         raise HTTPException(status_code=404, detail=str(e)) from e
@@ -35,66 +285,133 @@ async def get_traffic_analysis(road_id: UUID) -> TrafficAnalysis:
         raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
+@router.get("/{road_id}/speed-percentiles", response_model=SpeedPercentiles)
+async def get_speed_percentiles(
+    road_id: UUID,
+    minutes: Annotated[int, Query(ge=1, le=24 * 60, description="Window in minutes")] = 60,
+) -> SpeedPercentiles:
+    """
+    Get p15/p50/p85 speeds of a road segment, with p85 compared to the speed limit.
+    Answered from per-road quantile sketches instead of scanning car rows.
+
+    Args:
+        road_id: Road segment ID
+        minutes: Window to summarize
+
+    Returns:
+        Speed percentiles for the window
+    """
+    return await TrafficAnalysisService(read_only=True).speed_percentiles(road_id, minutes)
+
+
+@router.get("/{road_id}/forecast", response_model=TrafficForecast)
+async def get_traffic_forecast(
+    road_id: UUID,
+    horizons: Annotated[list[int] | None, Query(description="Forecast horizons in minutes")] = None,
+) -> TrafficForecast:
+    """
+    Get short-term speed and density predictions for a road segment.
+    Served from the in-memory per-road models, no database access.
+
+    Args:
+        road_id: Road segment ID
+        horizons: Minutes ahead to predict (default 5, 15 and 30)
+
+    Returns:
+        Predicted speed and density per horizon
+    """
+    requested = tuple(horizons) if horizons else FORECAST_HORIZONS
+    if any(not 0 < horizon <= 24 * 60 for horizon in requested):
+        raise HTTPException(status_code=422, detail="Horizons must be between 1 and 1440 minutes")
+
+    forecast = traffic_forecaster.forecast(road_id, requested)
+    if forecast is None:
+        raise HTTPException(status_code=404, detail=f"No measurements for road {road_id} yet")
+    return forecast
+
+
 @router.websocket("/ws/congestion")
-async def websocket_traffic_monitor(websocket: WebSocket) -> NoReturn:
+async def websocket_traffic_monitor(websocket: WebSocket) -> None:
     """
     WebSocket endpoint for real-time traffic congestion monitoring.
 
-    Sends state updates based on congestion level with 10-minute cooldown.
-    Continuously monitors traffic state and sends updates to connected clients.
+    Sends the current state on connect, then every state change as it happens.
+    State changes made by any worker arrive through the Postgres change feed,
+    so all clients see the same state whichever worker they are connected to.
 
     Args:
         websocket: The WebSocket connection instance.
-
-    Raises:
-        WebSocketDisconnect: When client disconnects.
     """
     await websocket.accept()
     logger.info("WebSocket connection established")
+    queue = congestion_hub.subscribe()
+    congestion_clients.inc()
 
     try:
-        while True:
-            state = traffic_state_manager.get_state
-            time_since_change = traffic_state_manager.get_time_since_last_change()
-
-            cooldown_remaining: float = (
-                traffic_state_manager.cooldown_minutes - (time_since_change.total_seconds() / 60)
-                if time_since_change
-                else 0
-            )
-
-            sleep_time: float = max(0, 60 * 10 - cooldown_remaining)
-            cooldown_until = (
-                traffic_state_manager.last_state_change + timedelta(minutes=traffic_state_manager.cooldown_minutes)
-                if traffic_state_manager.last_state_change
-                else None
-            )
-
-            if state != "UNSTAGED":
-                response = TrafficState(
-                    state=state.value,
-                    congestion_level=traffic_state_manager.response_data.congestion_level
-                    if traffic_state_manager.response_data
-                    else 0,
-                    last_change=traffic_state_manager.last_state_change,
-                    cooldown_until=cooldown_until,
-                )
-                await websocket.send_json(response.model_dump_json(), mode="text")
-
-            await asyncio.sleep(sleep_time)
-
-    except WebSocketDisconnect:
+        if traffic_state_manager.get_state != "UNSTAGED":
+            await _send_state(websocket, traffic_state_manager.to_message())
+
+        async with asyncio.TaskGroup() as group:
+            group.create_task(_forward_states(websocket, queue))
+            group.create_task(_wait_disconnect(websocket))
+
+    except* WebSocketDisconnect:
         logger.info("WebSocket connection closed")
-        with contextlib.suppress(Exception):
-            await websocket.close()
 
-    except (ConnectionError, TimeoutError) as exc:
-        logger.error(f"Connection error in WebSocket: {exc!s}")
+    except* (ConnectionError, TimeoutError) as group:
+        logger.error(f"Connection error in WebSocket: {group.exceptions[0]!s}")
         with contextlib.suppress(Exception):
             await websocket.close()
 
-    except Exception as exc:
-        logger.critical(f"Unexpected error in WebSocket connection: {exc!s}")
-        with contextlib.suppress(Exception):
-            await websocket.close()
-        raise
+    finally:
+        congestion_hub.unsubscribe(queue)
+        congestion_clients.dec()
+
+
+async def _send_state(websocket: WebSocket, message: TrafficState) -> None:
+    await websocket.send_json(message.model_dump_json(), mode="text")
+
+
+async def _forward_states(websocket: WebSocket, queue: asyncio.Queue[TrafficState]) -> None:
+    while True:
+        message = await queue.get()
+        if message.state != "UNSTAGED":
+            await _send_state(websocket, message)
+
+
+async def _forward_anomalies(websocket: WebSocket, queue: asyncio.Queue[TrafficAnomaly], road_id: UUID | None) -> None:
+    while True:
+        anomaly = await queue.get()
+        if road_id is None or anomaly.road_id == road_id:
+            await websocket.send_text(anomaly.model_dump_json())
+
+
+async def _wait_disconnect(websocket: WebSocket) -> None:
+    while True:
+        await websocket.receive_text()
+
+
+@router.websocket("/ws/anomalies")
+async def websocket_anomalies(websocket: WebSocket, road_id: UUID | None = None) -> None:
+    """
+    WebSocket endpoint streaming detected speed drops and density spikes.
+
+    Args:
+        websocket: The WebSocket connection instance.
+        road_id: Only stream anomalies of this road when given.
+    """
+    await websocket.accept()
+    queue = anomaly_hub.subscribe()
+    anomaly_clients.inc()
+
+    try:
+        # The reader task notices the disconnect even while no anomaly is being sent.
+        async with asyncio.TaskGroup() as group:
+            group.create_task(_forward_anomalies(websocket, queue, road_id))
+            group.create_task(_wait_disconnect(websocket))
+    except* WebSocketDisconnect:
+        logger.info("Anomaly WebSocket connection closed")
+
+    finally:
+        anomaly_hub.unsubscribe(queue)
+        anomaly_clients.dec()
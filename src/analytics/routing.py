@@ -0,0 +1,264 @@
+import asyncio
+import heapq
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from uuid import UUID
+
+import numpy as np
+
+from src.commons.project_utils import SECONDS_IN_HOUR
+from src.commons.schemas import Route
+from src.config import settings
+from src.services.metrics import cache_requests_total
+
+# Speeds below this are treated as this, so a stopped road stays passable at a high cost.
+MIN_SPEED_KMH = 5.0
+
+
+@dataclass(slots=True, frozen=True)
+class RoadEdge:
+    """A road as an edge of the network, both directions are drivable."""
+
+    road_id: UUID
+    start: str
+    end: str
+    length: float  # km
+    free_speed: float  # km/h, used while there is no live speed
+    speed: float | None = None  # km/h, latest analyzed speed
+
+
+class RoadGraph:
+    """
+    Road network in compressed sparse row (CSR) form, weighted by live travel time.
+
+    Nodes are the ``start``/``end`` names of the roads and every road is an arc in
+    both directions. The arcs leaving node ``n`` are ``indptr[n]:indptr[n + 1]`` of
+    ``indices`` (target node) and ``arc_road`` (road index). Travel times live in one
+    array indexed by road, so a speed update is O(1) and never touches the topology.
+
+    Shortest paths are cached per origin and destination. A cached path is dropped
+    once the travel time of one of its roads grows by more than ``threshold``. Any
+    road getting faster by more than ``threshold`` clears the whole cache, since it
+    may shorten paths that do not use it yet. ETAs are always summed from the
+    current travel times, also for cached paths.
+    """
+
+    def __init__(self, roads: Iterable[RoadEdge], threshold: float = 0.2, cache_size: int = 10_000) -> None:
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.nodes: dict[str, int] = {}
+        self.road_ids: list[UUID] = []
+        self._road_index: dict[UUID, int] = {}
+        starts: list[int] = []
+        ends: list[int] = []
+        lengths: list[float] = []
+        free_speeds: list[float] = []
+        speeds: list[float] = []
+        for road in roads:
+            self._road_index[road.road_id] = len(self.road_ids)
+            self.road_ids.append(road.road_id)
+            starts.append(self.nodes.setdefault(road.start, len(self.nodes)))
+            ends.append(self.nodes.setdefault(road.end, len(self.nodes)))
+            lengths.append(road.length)
+            free_speeds.append(road.free_speed)
+            speeds.append(road.speed or road.free_speed)
+
+        road_count = len(self.road_ids)
+        sources = np.array(starts + ends, dtype=np.int32)
+        order = np.argsort(sources, kind="stable")
+        self.indptr = np.zeros(len(self.nodes) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(sources, minlength=len(self.nodes)), out=self.indptr[1:])
+        self.indices = np.array(ends + starts, dtype=np.int32)[order]
+        self.arc_road = np.tile(np.arange(road_count, dtype=np.int32), 2)[order]
+        self.arc_source = sources[order]
+
+        self.lengths = np.array(lengths, dtype=np.float64)
+        self.free_speeds = np.array(free_speeds, dtype=np.float64)
+        self.weights = self._travel_seconds(self.lengths, np.array(speeds, dtype=np.float64))
+        # Travel times the cached paths were computed with, per road.
+        self._baseline = self.weights.copy()
+
+        # Plain lists for the Dijkstra loop, indexing them is much cheaper than numpy scalars.
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+        self._arc_road = self.arc_road.tolist()
+        self._arc_source = self.arc_source.tolist()
+        self._weights = self.weights.tolist()
+
+        self._paths: OrderedDict[tuple[int, int], tuple[int, ...]] = OrderedDict()
+        self._paths_by_road: dict[int, set[tuple[int, int]]] = {}
+        self._hits = cache_requests_total.labels("route", "l1", "hit")
+        self._misses = cache_requests_total.labels("route", "l1", "miss")
+
+    def __len__(self) -> int:
+        return len(self.road_ids)
+
+    @staticmethod
+    def _travel_seconds(length: np.ndarray | float, speed: np.ndarray | float) -> np.ndarray:
+        return length / np.maximum(speed, MIN_SPEED_KMH) * SECONDS_IN_HOUR
+
+    def update_speed(self, road_id: UUID, speed: float) -> bool:
+        """
+        Set the live speed of a road, a speed of 0 (no traffic) means free flow.
+
+        Returns:
+            Whether the change passed the threshold and cached paths were dropped
+        """
+        index = self._road_index.get(road_id)
+        if index is None:
+            return False
+
+        if speed <= 0:
+            speed = float(self.free_speeds[index])
+        weight = float(self._travel_seconds(self.lengths[index], speed))
+        self.weights[index] = weight
+        self._weights[index] = weight
+
+        baseline = float(self._baseline[index])
+        change = (weight - baseline) / baseline if baseline > 0 else 0.0
+        if abs(change) <= self.threshold:
+            return False
+
+        self._baseline[index] = weight
+        if change < 0:
+            self._paths.clear()
+            self._paths_by_road.clear()
+        else:
+            for key in self._paths_by_road.pop(index, set()):
+                self._forget(key)
+        return True
+
+    def route(self, origin: str, destination: str) -> Route | None:
+        """
+        Fastest route between two nodes.
+
+        Returns:
+            The route with its current ETA, or None if a node is unknown or unreachable
+        """
+        source, target = self.nodes.get(origin), self.nodes.get(destination)
+        if source is None or target is None:
+            return None
+
+        key = (source, target)
+        roads = self._paths.get(key)
+        cached = roads is not None
+        if roads is not None:
+            self._paths.move_to_end(key)
+            self._hits.inc()
+        else:
+            self._misses.inc()
+            roads = self._shortest_path(source, target)
+            if roads is None:
+                return None
+            self._remember(key, roads)
+
+        index = np.array(roads, dtype=np.int64)
+        return Route(
+            origin=origin,
+            destination=destination,
+            road_ids=[self.road_ids[road] for road in roads],
+            length=float(self.lengths[index].sum()),
+            travel_time_seconds=float(self.weights[index].sum()),
+            cached=cached,
+        )
+
+    def _shortest_path(self, source: int, target: int) -> tuple[int, ...] | None:
+        """Dijkstra from ``source``, stopped as soon as ``target`` is settled."""
+        indptr, indices, arc_road, weights = self._indptr, self._indices, self._arc_road, self._weights
+        distances = {source: 0.0}
+        previous_arc: dict[int, int] = {}
+        heap = [(0.0, source)]
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if distance > distances[node]:
+                continue
+            for arc in range(indptr[node], indptr[node + 1]):
+                candidate = distance + weights[arc_road[arc]]
+                neighbour = indices[arc]
+                if candidate < distances.get(neighbour, math.inf):
+                    distances[neighbour] = candidate
+                    previous_arc[neighbour] = arc
+                    heapq.heappush(heap, (candidate, neighbour))
+        else:
+            return None
+
+        roads: list[int] = []
+        node = target
+        while node != source:
+            arc = previous_arc[node]
+            roads.append(arc_road[arc])
+            node = self._arc_source[arc]
+        return tuple(reversed(roads))
+
+    def _remember(self, key: tuple[int, int], roads: tuple[int, ...]) -> None:
+        self._paths[key] = roads
+        for road in roads:
+            self._paths_by_road.setdefault(road, set()).add(key)
+        while len(self._paths) > self.cache_size:
+            oldest = next(iter(self._paths))
+            self._forget(oldest)
+
+    def _forget(self, key: tuple[int, int]) -> None:
+        roads = self._paths.pop(key, ())
+        for road in roads:
+            keys = self._paths_by_road.get(road)
+            if keys is not None:
+                keys.discard(key)
+
+
+class RoadNetwork:
+    """
+    Process-wide road graph, built from the database on first use.
+
+    The graph is rebuilt when roads are added or removed, and at the latest after
+    ``max_age`` seconds, which also picks up the speeds analyzed by other workers.
+    Between rebuilds, ingestion in this process updates the live speeds directly.
+    """
+
+    def __init__(self, max_age: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_age = max_age
+        self.graph: RoadGraph | None = None
+        self._clock = clock
+        self._built_at = -math.inf
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def fresh(self) -> bool:
+        """Whether the current graph can be served without a rebuild."""
+        return self.graph is not None and self._clock() - self._built_at < self.max_age
+
+    def invalidate(self) -> None:
+        """Rebuild the graph on its next use, after the roads changed."""
+        self._built_at = -math.inf
+        self._generation += 1
+
+    def update_speed(self, road_id: UUID, speed: float) -> None:
+        """Forward a newly analyzed speed to the graph, if it is built."""
+        if self.graph is not None:
+            self.graph.update_speed(road_id, speed)
+
+    async def get(self, load: Callable[[], Awaitable[list[RoadEdge]]]) -> RoadGraph:
+        """Get the graph, rebuilding it with the edges from ``load`` when it is not fresh."""
+        if self.fresh:
+            return self.graph  # pyright: ignore[reportReturnType]
+        async with self._lock:
+            if not self.fresh:
+                started, generation = self._clock(), self._generation
+                self.graph = RoadGraph(
+                    await load(),
+                    threshold=settings.ROUTING_INVALIDATION_THRESHOLD,
+                    cache_size=settings.ROUTING_CACHE_SIZE,
+                )
+                # Roads changed while loading, the next request builds the graph again.
+                if generation == self._generation:
+                    self._built_at = started
+        return self.graph  # pyright: ignore[reportReturnType]
+
+
+road_network = RoadNetwork(settings.ROUTING_GRAPH_MAX_AGE_SECONDS)
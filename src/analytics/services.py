@@ -1,39 +1,94 @@
-from datetime import UTC, datetime
+import asyncio
+import time
+from datetime import UTC, datetime, timedelta
 from uuid import UUID
 
+import numpy as np
 from loguru import logger
+from numpy.typing import ArrayLike
+from sqlalchemy import Row, func, select
 
+from src.analytics.anomaly import traffic_anomaly_detector
 from src.analytics.cruds import (
     CarCrud,
+    CarSightingCrud,
+    CarTrajectoryChunkCrud,
+    MeasurementWindow,
+    OdCountCrud,
+    OdJobCrud,
     RoadCapacityCrud,
     RoadConditionCrud,
     RoadCrud,
+    RoadSpeedSketchCrud,
+    RoadTrafficSnapshotCrud,
     TrafficMeasurementCrud,
 )
+from src.analytics.forecasting import traffic_forecaster
+from src.analytics.handlers import anomaly_feed
+from src.analytics.routing import RoadEdge, RoadGraph, road_network
+from src.analytics.shared_aggregates import shared_aggregates
+from src.analytics.sketches import speed_sketches
+from src.analytics.spatial import GridIndex, RoadLocation, road_locator
+from src.analytics.trajectories import CHUNK_MAX_POINTS, COMPACTION_LOCK_ID, Trajectory, decode, encode, from_epoch_ms
+from src.analytics.trend import SlopeFit, fit_slope_arrays, trend_tracker
 from src.commons.decorators import monitor_traffic_congestion
-from src.commons.models import Car, Road, RoadCondition
-from src.commons.project_protocols import HasAverageSpeed
+from src.commons.enums import Jam, Weather
+from src.commons.models import Car, CarTrajectoryChunk, Road, RoadCapacity, RoadCondition, RoadTrafficSnapshot
 from src.commons.schemas import (
+    BboxCongestion,
     CarCreate,
+    CarMatch,
+    CarTrajectory,
     GetCar,
     GetCarByTimeRange,
     GetRoad,
     GetRoadCondition,
+    OdJobInfo,
+    OdMatrix,
     RoadConditionCreate,
     RoadCreate,
+    RoadDistance,
+    RoadInfo,
+    Route,
+    SpeedPercentiles,
     TrafficAnalysis,
+    TrafficAnomaly,
     TrafficMeasurementCreate,
 )
 from src.commons.state import State
+from src.config import settings
+from src.services.cache import Cache, cache_backend
 from src.services.db import PgUnitOfWork
+from src.services.metrics import analyze_traffic_seconds, timed, traffic_anomalies_total
+
+# Measurements read per query while following them, see TrafficAnalysisService.follow_measurements.
+FOLLOW_BATCH_SIZE = 10_000
+
+road_cache = Cache(
+    "road",
+    RoadInfo,
+    cache_backend,
+    ttl=settings.CACHE_ROAD_TTL_SECONDS,
+    local_ttl=settings.CACHE_ROAD_TTL_SECONDS,
+    local_maxsize=settings.CACHE_LOCAL_MAXSIZE,
+)
+analysis_cache = Cache(
+    "analysis",
+    TrafficAnalysis,
+    cache_backend,
+    ttl=settings.CACHE_ANALYSIS_TTL_SECONDS,
+    local_ttl=settings.CACHE_ANALYSIS_LOCAL_TTL_SECONDS,
+    local_maxsize=settings.CACHE_LOCAL_MAXSIZE,
+)
 
 
 class CarService:
     """Service for processing and managing car data from sensors."""
 
-    def __init__(self) -> None:
-        self.uow: PgUnitOfWork = PgUnitOfWork()
+    def __init__(self, read_only: bool = False) -> None:
+        self.uow: PgUnitOfWork = PgUnitOfWork(read_only=read_only)
         self.crud: CarCrud = CarCrud(uow=self.uow)
+        self.sighting_crud: CarSightingCrud = CarSightingCrud(uow=self.uow)
         self.traffic_analyzer = TrafficAnalysisService()
         self.window_size = 5  # minutes
 
@@ -46,14 +101,23 @@ class CarService:
         Returns:
             Updated car record
         """
+        if payload.road_id is None:
+            payload.road_id = await self.match_road(payload.latitude, payload.longitude)  # pyright: ignore[reportArgumentType]
+
+        # Sketch the raw sensor speed, the stored one is smoothed below.
+        speed_sketches.add(payload.road_id, payload.average_speed)
+
         async with self.uow:
+            # Log the raw sighting for the trajectory history, flushed with the car below.
+            self.sighting_crud.add_sighting(payload.plate_number, payload.road_id, payload.average_speed)
+
             # Try to find existing car record
-            cars = await self.crud.get_car(GetCar(plate_number=payload.plate_number))
+            cars = await self.crud.get_car_by_plate(payload.plate_number)
 
             if cars:
                 # Calculate new average speed
                 existing_car = cars[0]
-                new_speed = _average_speed(cars, self.window_size)  # pyright: ignore[reportArgumentType]
+                new_speed = _average_speed([car.average_speed for car in cars], self.window_size)
                 payload.average_speed = new_speed
 
                 # Update car data
@@ -61,7 +125,7 @@ class CarService:
                     GetCar(id=existing_car.id),
                     payload,
                 )
-                logger.info(f"Updated car data: {updated_car}")
+                logger.debug("Updated car data: {}", updated_car)
 
                 # Update traffic measurements if car has road_id
                 if updated_car.road_id:
@@ -74,7 +138,7 @@ class CarService:
             new_car = await self.crud.create_car(
                 payload,
             )
-            logger.info(f"Created new car record: {new_car}")
+            logger.debug("Created new car record: {}", new_car)
 
             # Update traffic measurements if new car has road_id
             if new_car.road_id:
@@ -83,6 +147,18 @@ class CarService:
 
             return new_car
 
+    async def match_road(self, latitude: float, longitude: float) -> UUID:
+        """
+        Map sensor coordinates to the nearest road with the spatial index.
+
+        Raises:
+            ValueError: No road within ``SENSOR_MATCH_RADIUS_KM``
+        """
+        nearest = await RoadService(read_only=True).nearest_road(latitude, longitude, settings.SENSOR_MATCH_RADIUS_KM)
+        if nearest is None:
+            raise ValueError(f"No road within {settings.SENSOR_MATCH_RADIUS_KM} km of ({latitude}, {longitude})")
+        return nearest.road_id
+
     async def get_cars_by_road(self, road_id: UUID) -> list[Car]:
         """Get all cars currently on a specific road."""
         async with self.uow:
@@ -103,14 +179,19 @@ class CarService:
         async with self.uow:
             return await self.crud.get_car(conditions)
 
+    async def search_cars(self, term: str, limit: int) -> list[CarMatch]:
+        """Find cars by part of their plate number, prefix matches first."""
+        async with self.uow:
+            return [CarMatch.model_validate(row) for row in await self.crud.search_by_plate(term, limit)]
+
 
 class RoadConditionService:
     """
     Service for creating, deleting, and getting road conditions.
     """
 
-    def __init__(self) -> None:
-        self.uow: PgUnitOfWork = PgUnitOfWork()
+    def __init__(self, read_only: bool = False) -> None:
+        self.uow: PgUnitOfWork = PgUnitOfWork(read_only=read_only)
         self.crud: RoadConditionCrud = RoadConditionCrud(uow=self.uow)
 
     async def create_road_condition(self, payload: RoadConditionCreate) -> RoadCondition:
@@ -140,8 +221,8 @@ class RoadService:
     Service for creating, deleting, and getting roads.
     """
 
-    def __init__(self) -> None:
-        self.uow: PgUnitOfWork = PgUnitOfWork()
+    def __init__(self, read_only: bool = False) -> None:
+        self.uow: PgUnitOfWork = PgUnitOfWork(read_only=read_only)
         self.crud: RoadCrud = RoadCrud(uow=self.uow)
 
     async def create_road(self, payload: RoadCreate) -> Road:
@@ -149,7 +230,10 @@ class RoadService:
         Create a road.
         """
         async with self.uow:
-            return await self.crud.create_road(payload)
+            road = await self.crud.create_road(payload)
+        road_network.invalidate()
+        road_locator.invalidate()
+        return road
 
     async def delete_road(self, conditions: GetRoad) -> None:
         """
@@ -157,6 +241,10 @@ class RoadService:
         """
         async with self.uow:
             await self.crud.delete_road(conditions)
+        road_network.invalidate()
+        road_locator.invalidate()
+        if conditions.id is not None:
+            await road_cache.delete(str(conditions.id))
 
     async def get_road(self, conditions: GetRoad) -> list[Road]:
         """
@@ -165,18 +253,67 @@ class RoadService:
         async with self.uow:
             return await self.crud.get_road(conditions)
 
+    async def warm_road_cache(self) -> int:
+        """
+        Load the metadata of every road into the road cache with one query.
+
+        Returns:
+            Number of roads cached
+        """
+        async with self.uow:
+            rows = await self.crud.get_road_infos()
+        await road_cache.set_many({str(row.id): RoadInfo.model_validate(row) for row in rows})
+        return len(rows)
+
+    async def spatial_index(self) -> GridIndex:
+        """
+        Get the spatial index of the roads, loading it on first use and again once the roads changed.
+        """
+        return await road_locator.get(self._load_locations, self._load_roads_version)
+
+    async def roads_within(self, latitude: float, longitude: float, radius_km: float) -> list[RoadDistance]:
+        """
+        Get the roads within ``radius_km`` of a point, nearest first, from the spatial index.
+        """
+        return (await self.spatial_index()).within(latitude, longitude, radius_km)
+
+    async def nearest_road(self, latitude: float, longitude: float, max_km: float) -> RoadDistance | None:
+        """
+        Get the road nearest to a point, if one is within ``max_km``, from the spatial index.
+        """
+        return (await self.spatial_index()).nearest(latitude, longitude, max_km)
+
+    async def _load_locations(self) -> list[RoadLocation]:
+        """Load the reference points of the roads for the spatial index."""
+        async with self.uow:
+            rows = await self.crud.get_road_locations()
+        return [RoadLocation(road_id, latitude, longitude) for road_id, latitude, longitude in rows]
+
+    async def _load_roads_version(self) -> tuple:
+        """Load the version of the road table for the spatial index."""
+        async with self.uow:
+            return await self.crud.get_roads_version()
+
 
 class TrafficAnalysisService:
     """Service for analyzing traffic conditions."""
 
-    def __init__(self) -> None:
-        self.uow: PgUnitOfWork = PgUnitOfWork()
+    def __init__(self, read_only: bool = False) -> None:
+        """
+        Args:
+            read_only: Serve dashboard reads from the replica, see ``PgUnitOfWork``
+        """
+        self.uow: PgUnitOfWork = PgUnitOfWork(read_only=read_only)
         self.car_crud = CarCrud(uow=self.uow)
         self.traffic_crud = TrafficMeasurementCrud(uow=self.uow)
         self.capacity_crud = RoadCapacityCrud(uow=self.uow)
         self.road_crud = RoadCrud(uow=self.uow)
+        self.condition_crud = RoadConditionCrud(uow=self.uow)
+        self.snapshot_crud = RoadTrafficSnapshotCrud(uow=self.uow)
+        self.sketch_crud = RoadSpeedSketchCrud(uow=self.uow)
         self.window_size = 5  # minutes
 
+    @timed(analyze_traffic_seconds)
     @monitor_traffic_congestion
     async def analyze_traffic(self, road_id: UUID) -> TrafficAnalysis:
         """
@@ -193,14 +330,14 @@ class TrafficAnalysisService:
             capacity = await self.capacity_crud.get_road_capacity(road_id)
 
             # Get recent measurements
-            measurements = await self.traffic_crud.get_recent_measurements(road_id=road_id, minutes=self.window_size)
+            measurements = await self.traffic_crud.get_recent_measurement_window(road_id, self.window_size)
 
             if not measurements:
-                # Get cars on the road to determine initial state
-                cars = await self.car_crud.get_car_by_time_range(
+                # Get speeds of the cars on the road to determine initial state
+                speeds = await self.car_crud.get_speeds_by_time_range(
                     GetCarByTimeRange(range_time=self.window_size, road_id=road_id)
                 )
-                if not cars:
+                if not len(speeds):
                     return TrafficAnalysis(
                         current_speed=0,
                         flow_rate=0,
@@ -211,9 +348,9 @@ class TrafficAnalysisService:
                     )
 
                 # Calculate initial state from current cars
-                avg_speed = _average_speed(cars, self.window_size)  # pyright: ignore[reportArgumentType]
-                flow_rate = len(cars) * 3600  # cars per hour
-                density = len(cars) / capacity.lanes  # cars per lane
+                avg_speed = _average_speed(speeds, self.window_size)
+                flow_rate = len(speeds) * 3600  # cars per hour
+                density = len(speeds) / capacity.lanes  # cars per lane
                 congestion_level = density / capacity.max_capacity
 
                 return TrafficAnalysis(
@@ -225,19 +362,238 @@ class TrafficAnalysisService:
                     trend="STABLE",
                 )
 
-            # Calculate metrics from measurements
-            latest = measurements[0]
-            trend = self._determine_trend(measurements)
-
-            congestion_level = latest.density / capacity.max_capacity
-            return TrafficAnalysis(
-                current_speed=_average_speed(measurements, self.window_size),  # pyright: ignore[reportArgumentType]
-                flow_rate=latest.flow_rate,
-                density=latest.density,
-                congestion_level=congestion_level,
-                state=self._determine_state(congestion_level),
-                trend=trend,
+            return self._analysis_from_measurements(road_id, capacity, measurements)
+
+    @monitor_traffic_congestion
+    async def get_traffic_snapshot(self, road_id: UUID) -> TrafficAnalysis:
+        """
+        Get the precomputed traffic analysis of a road.
+
+        Served from the analysis cache, then from the snapshot upserted by the ingestion
+        path with a primary key lookup. Roads without a snapshot yet are analyzed on the
+        fly, without storing the result.
+
+        Args:
+            road_id: Road segment ID
+
+        Returns:
+            Traffic analysis with the time it was computed
+        """
+        cached = await analysis_cache.get(str(road_id))
+        if cached is not None:
+            return cached
+
+        async with self.uow:
+            snapshot = await self.snapshot_crud.get_snapshot(road_id)
+
+        if snapshot is None:
+            analysis = await self.analyze_traffic(road_id)
+            analysis.updated_at = datetime.now(UTC)
+            return analysis
+
+        analysis = _analysis_from_snapshot(snapshot)
+        await analysis_cache.set(str(road_id), analysis)
+        return analysis
+
+    async def get_traffic_snapshots(self, road_ids: list[UUID]) -> dict[UUID, TrafficAnalysis]:
+        """
+        Get the precomputed traffic analyses of several roads at once.
+
+        Cache misses are read with a single query and written back with a single
+        round trip. Roads without a snapshot are left out.
+
+        Args:
+            road_ids: Road segment IDs
+
+        Returns:
+            Traffic analysis per road
+        """
+        cached = await analysis_cache.get_many(str(road_id) for road_id in road_ids)
+        analyses = {UUID(key): analysis for key, analysis in cached.items()}
+        missing = [road_id for road_id in road_ids if road_id not in analyses]
+        if not missing:
+            return analyses
+
+        async with self.uow:
+            snapshots = await self.snapshot_crud.get_snapshots(missing)
+
+        loaded = {snapshot.road_id: _analysis_from_snapshot(snapshot) for snapshot in snapshots}
+        await analysis_cache.set_many({str(road_id): analysis for road_id, analysis in loaded.items()})
+        return analyses | loaded
+
+    def _analysis_from_measurements(
+        self, road_id: UUID, capacity: RoadCapacity, measurements: MeasurementWindow, record_trend: bool = False
+    ) -> TrafficAnalysis:
+        """
+        Build the traffic analysis from recent measurements, newest first.
+
+        Args:
+            road_id: Road segment ID
+            capacity: Capacity of the road
+            measurements: Non-empty measurement columns of the window
+            record_trend: Record the trend for hysteresis, only done on ingestion
+
+        Returns:
+            Traffic analysis results
+        """
+        density_fit, speed_fit = fit_slope_arrays(
+            measurements.timestamp / 60, measurements.density, measurements.average_speed
+        )
+        trend = self._determine_trend(road_id, density_fit, record_trend)
+
+        density = float(measurements.density[0])
+        congestion_level = density / capacity.max_capacity
+        return TrafficAnalysis(
+            current_speed=_average_speed(measurements.average_speed, self.window_size),
+            flow_rate=int(measurements.flow_rate[0]),
+            density=density,
+            congestion_level=congestion_level,
+            state=self._determine_state(congestion_level),
+            trend=trend,
+            trend_confidence=density_fit.r_squared,
+            density_slope=density_fit.slope,
+            speed_slope=speed_fit.slope,
+        )
+
+    async def speed_percentiles(self, road_id: UUID, minutes: int = 60) -> SpeedPercentiles:
+        """
+        Get p15/p50/p85 speeds of a road from its speed sketches.
+
+        Args:
+            road_id: Road segment ID
+            minutes: Window to summarize
+
+        Returns:
+            Speed percentiles compared with the road's speed limit
+        """
+        now = datetime.now(UTC)
+        buckets = speed_sketches.buckets(minutes, now)
+        async with self.uow:
+            capacity = await self.capacity_crud.get_road_capacity(road_id)
+            # The buckets of the other processes, this one's are merged from memory.
+            exported = await self.sketch_crud.get_sketches(road_id, buckets, exclude_worker=speed_sketches.worker_id)
+
+        sketch = speed_sketches.combined(road_id, buckets, exported).window(road_id, minutes, now)
+        p85 = sketch.quantile(0.85)
+        return SpeedPercentiles(
+            road_id=road_id,
+            window_minutes=minutes,
+            count=sketch.count,
+            p15=sketch.quantile(0.15),
+            p50=sketch.quantile(0.5),
+            p85=p85,
+            speed_limit=capacity.speed_limit,
+            p85_over_limit=p85 is not None and p85 > capacity.speed_limit,
+        )
+
+    async def follow_measurements(self, after: tuple[datetime, UUID], batch_size: int) -> tuple[datetime, UUID]:
+        """
+        Fold the measurements stored after the ``(timestamp, id)`` key ``after`` into the forecaster,
+        in processes that do not ingest them. The measurements of the last ``FORECAST_FOLLOW_LAG_SECONDS``
+        are left for the next call, so ones committed a little late are not skipped.
+
+        Args:
+            after: Key of the last measurement folded in
+            batch_size: Measurements read per query
+
+        Returns:
+            Key of the last measurement folded in now
+        """
+        until = datetime.now(UTC) - timedelta(seconds=settings.FORECAST_FOLLOW_LAG_SECONDS)
+        while True:
+            async with self.uow:
+                rows = await self.traffic_crud.get_measurements_after(after, until, batch_size)
+            for row in rows:
+                traffic_forecaster.update(row.road_id, row.timestamp, row.average_speed, row.density)
+            if rows:
+                after = (rows[-1].timestamp, rows[-1].id)
+            if len(rows) < batch_size:
+                return after
+
+    async def flush_speed_sketches(self) -> int:
+        """
+        Write the speed sketch buckets this process counted into since the last flush,
+        for the percentiles of the other processes, and delete the expired buckets of all.
+
+        Returns:
+            Number of buckets written
+        """
+        changes = speed_sketches.changes()
+        if not changes:
+            return 0
+        try:
+            async with self.uow:
+                await self.sketch_crud.upsert_sketches(speed_sketches.worker_id, changes)
+                await self.sketch_crud.delete_sketches_before(
+                    speed_sketches.buckets(settings.SPEED_SKETCH_RETENTION_MINUTES).start
+                )
+        except Exception:
+            # Written with the next flush instead.
+            speed_sketches.mark_changed(changes)
+            raise
+        return sum(len(buckets) for buckets in changes.values())
+
+    async def congestion_in_bbox(
+        self, south: float, west: float, north: float, east: float, zoom: int
+    ) -> BboxCongestion:
+        """
+        Get the congestion of the roads in a map viewport.
+
+        Served from the spatial index, whose road states are refreshed from the
+        snapshots changed since the last check.
+
+        Args:
+            south: Southern latitude of the box
+            west: Western longitude of the box
+            north: Northern latitude of the box
+            east: Eastern longitude of the box
+            zoom: Map zoom level, roads are clustered below ``BBOX_DETAIL_ZOOM``
+
+        Returns:
+            Road or cluster columns of the viewport
+        """
+        index = await RoadService(read_only=True).spatial_index()
+        await road_locator.refresh_states(index, self._load_state_changes)
+        return index.bbox(south, west, north, east, zoom, settings.BBOX_DETAIL_ZOOM, settings.BBOX_MAX_ROADS)
+
+    async def _load_state_changes(self, since: datetime | None) -> list[Row]:
+        """Load the snapshot states changed after ``since`` for the spatial index."""
+        async with self.uow:
+            return await self.snapshot_crud.get_states_since(since)
+
+    async def route(self, origin: str, destination: str) -> Route | None:
+        """
+        Get the fastest route between two road network nodes at current speeds.
+
+        Args:
+            origin: Start point name of a road
+            destination: End point name of a road
+
+        Returns:
+            Route with its ETA, or None if a node is unknown or unreachable
+        """
+        graph = await self.road_graph()
+        return graph.route(origin, destination)
+
+    async def road_graph(self) -> RoadGraph:
+        """Get the road network with its speed limits and current speeds, loading it on first use."""
+        return await road_network.get(self._load_road_edges)
+
+    async def _load_road_edges(self) -> list[RoadEdge]:
+        """Load every road with its speed limit and latest speed for the road network."""
+        async with self.uow:
+            rows = await self.road_crud.get_road_edges()
+        return [
+            RoadEdge(
+                road_id=road_id,
+                start=start,
+                end=end,
+                length=length,
+                free_speed=float(speed_limit or settings.ROUTING_DEFAULT_SPEED_KMH),
+                speed=current_speed or None,
             )
+            for road_id, start, end, length, speed_limit, current_speed in rows
+        ]
 
     def _determine_state(self, congestion_level: float) -> State:
         """
@@ -256,19 +612,21 @@ class TrafficAnalysisService:
         else:
             return State("LOW")
 
-    def _determine_trend(self, measurements: list) -> str:
-        """Determine traffic trend based on recent measurements."""
-        if len(measurements) < 2:
-            return "STABLE"
+    def _determine_trend(self, road_id: UUID, density_fit: SlopeFit, record: bool = False) -> str:
+        """
+        Determine traffic trend from the density slope over the whole window.
 
-        latest = measurements[0].density
-        previous = measurements[1].density
+        Args:
+            road_id: Road segment ID
+            density_fit: Least-squares fit of the window's density
+            record: Keep the trend as the road's previous one, so reads never move the hysteresis
 
-        if latest > previous * 1.1:
-            return "INCREASING"
-        elif latest < previous * 0.9:
-            return "DECREASING"
-        return "STABLE"
+        Returns:
+            STABLE, INCREASING or DECREASING, with hysteresis per road
+        """
+        if record:
+            return trend_tracker.update(road_id, density_fit)
+        return trend_tracker.classify(road_id, density_fit)
 
     async def update_traffic_measurement(self, road_id: UUID, cars: list[Car]) -> None:
         """
@@ -286,7 +644,7 @@ class TrafficAnalysisService:
             average_speed = sum(car.average_speed for car in cars) / len(cars)
 
             # Get road length
-            road = await self.road_crud.get_road_by_id(road_id=road_id)
+            road = await road_cache.get_or_load(str(road_id), lambda: self._load_road(road_id))
 
             if not road:
                 raise ValueError(f"Road {road_id} not found")
@@ -305,29 +663,319 @@ class TrafficAnalysisService:
             )
 
             await self.traffic_crud.create_measurement(measurement)
+            analysis = await self._refresh_snapshot(road_id, measurement.timestamp)
+
+        # Folded in once the measurement is committed, so a rolled back one never reaches the process state.
+        traffic_forecaster.update(road_id, measurement.timestamp, average_speed, density)
+        shared_aggregates.add(road_id, measurement.timestamp, average_speed, density)
+
+        anomalies = traffic_anomaly_detector.update(road_id, measurement.timestamp, average_speed, density)
+        for anomaly in anomalies:
+            traffic_anomalies_total.labels(anomaly.kind).inc()
+            logger.warning(
+                "{} on road {}: {:.1f} against baseline {:.1f} (z={:.1f})",
+                anomaly.kind,
+                road_id,
+                anomaly.value,
+                anomaly.baseline,
+                anomaly.z_score,
+            )
+        if anomalies and settings.ANOMALY_AUTO_ROAD_CONDITION:
+            async with self.uow:
+                await self._record_incident(anomalies[0])
+
+        # Written once the snapshot is committed, so other workers never see an uncommitted one.
+        if analysis is not None:
+            await analysis_cache.set(str(road_id), analysis)
+            road_network.update_speed(road_id, analysis.current_speed)
+            road_locator.update_state(road_id, analysis)
+        for anomaly in anomalies:
+            await anomaly_feed.publish(anomaly)
+
+    async def _load_road(self, road_id: UUID) -> RoadInfo | None:
+        """Load road metadata for the road cache."""
+        road = await self.road_crud.one_or_none(GetRoad(id=road_id))
+        return RoadInfo.model_validate(road) if road else None
+
+    async def _refresh_snapshot(self, road_id: UUID, timestamp: datetime) -> TrafficAnalysis | None:
+        """
+        Recompute the analysis of a road and upsert its snapshot.
 
+        Runs inside the unit of work of the new measurement. Roads without capacity
+        information get no snapshot and keep being analyzed on read.
+        """
+        capacity = await self.capacity_crud.get_capacity_by_road(road_id)
+        if capacity is None:
+            return None
+
+        measurements = await self.traffic_crud.get_recent_measurement_window(road_id, self.window_size)
+        if not measurements:
+            return None
+        analysis = self._analysis_from_measurements(road_id, capacity, measurements, record_trend=True)
+        analysis.updated_at = timestamp
+        await self.snapshot_crud.upsert_snapshot(road_id, analysis)
+        return analysis
+
+    async def _record_incident(self, anomaly: TrafficAnomaly) -> None:
+        """Store a detected incident as a HIGH jam road condition, keeping the last known weather."""
+        latest = await self.condition_crud.get_latest_road_condition(anomaly.road_id)
+        await self.condition_crud.create_road_condition(
+            RoadConditionCreate(
+                road_id=anomaly.road_id,
+                weather_status=Weather(latest.weather_status) if latest else Weather.DRY,
+                jam_status=Jam.HIGH,
+                name=f"AUTO-{anomaly.kind}-{anomaly.road_id.hex[:8]}-{anomaly.detected_at:%Y%m%d%H%M%S}",
+                description=(
+                    f"Detected {anomaly.kind.lower().replace('_', ' ')}: {anomaly.value:.1f} "
+                    f"against baseline {anomaly.baseline:.1f}"
+                ),
+            )
+        )
 
-def _moving_average(data: list[float], window: int) -> list[float]:
-    """Вычислить центральное скользящее среднее для списка data с заданным окном."""
+
+class TrajectoryService:
+    """
+    Service for the trajectory history of cars: the append-only sighting log,
+    compacted into dictionary and delta encoded chunks once it gets old.
+    """
+
+    def __init__(self, read_only: bool = False) -> None:
+        self.uow: PgUnitOfWork = PgUnitOfWork(read_only=read_only)
+        self.sighting_crud: CarSightingCrud = CarSightingCrud(uow=self.uow)
+        self.chunk_crud: CarTrajectoryChunkCrud = CarTrajectoryChunkCrud(uow=self.uow)
+
+    async def get_trajectory(self, plate_number: str, since: datetime, until: datetime) -> Trajectory:
+        """Get the sightings of a car in a time range, from the chunks and the not yet compacted log."""
+        async with self.uow:
+            chunks = await self.chunk_crud.get_chunks(plate_number, since, until)
+            rows = await self.sighting_crud.get_sightings(plate_number, since, until)
+        parts = [decode(chunk) for chunk in chunks]
+        parts.append(Trajectory.from_rows(rows))
+        return Trajectory.concat(parts).between(since, until)
+
+    async def car_trajectory(self, plate_number: str, since: datetime, until: datetime) -> CarTrajectory:
+        """Get the trajectory of a car in a time range as response columns."""
+        trajectory = await self.get_trajectory(plate_number, since, until)
+        road_ids = trajectory.road_ids
+        return CarTrajectory(
+            plate_number=plate_number,
+            timestamp=[from_epoch_ms(epoch_ms) for epoch_ms in trajectory.timestamp.tolist()],
+            road_id=[road_ids[road] for road in trajectory.road.tolist()],
+            speed=trajectory.speed.tolist(),
+        )
+
+    async def compact(self, before: datetime, batch_size: int) -> int:
+        """
+        Move up to ``batch_size`` of the oldest sightings seen before ``before`` into chunks.
+        Sightings are appended to the latest chunk of their car while it has room.
+        On Postgres, a transaction level advisory lock keeps other workers from compacting concurrently.
+
+        Returns:
+            Number of sightings compacted, 0 when there were none or another worker is compacting
+        """
+        async with self.uow:
+            if self.uow.dialect_name == "postgresql":
+                locked = await self.uow.execute(select(func.pg_try_advisory_xact_lock(COMPACTION_LOCK_ID)))
+                if not locked.scalar_one():
+                    return 0
+
+            rows = await self.sighting_crud.get_sightings_before(before, batch_size)
+            if not rows:
+                return 0
+            sightings: dict[str, list[tuple[UUID, datetime, float]]] = {}
+            for _id, plate_number, road_id, timestamp, speed in rows:
+                sightings.setdefault(plate_number, []).append((road_id, timestamp, speed))
+            open_chunks = await self.chunk_crud.get_open_chunks(list(sightings), CHUNK_MAX_POINTS)
+
+            for plate_number, car_sightings in sightings.items():
+                trajectory = Trajectory.from_rows(car_sightings)
+                chunk = open_chunks.get(plate_number)
+                if chunk is not None:
+                    trajectory = Trajectory.concat([decode(chunk), trajectory])
+                for piece in trajectory.chunks():
+                    columns = encode(piece)
+                    if chunk is not None:
+                        # The first piece rewrites the open chunk, flushed with the commit.
+                        for column, value in columns.items():
+                            setattr(chunk, column, value)
+                        chunk = None
+                    else:
+                        self.uow.add(CarTrajectoryChunk(plate_number=plate_number, **columns))
+
+            await self.sighting_crud.delete_sightings([row[0] for row in rows])
+        logger.info("Compacted {} sightings of {} cars", len(rows), len(sightings))
+        return len(rows)
+
+    async def compact_all(self, before: datetime, batch_size: int = 10_000) -> int:
+        """Compact every sighting seen before ``before``, one transaction per batch."""
+        total = 0
+        while (compacted := await self.compact(before, batch_size)) > 0:
+            total += compacted
+            if compacted < batch_size:
+                break
+        return total
+
+
+class OdMatrixService:
+    """Service for reading the results of the origin-destination matrix job."""
+
+    def __init__(self, read_only: bool = False) -> None:
+        self.uow: PgUnitOfWork = PgUnitOfWork(read_only=read_only)
+        self.job_crud: OdJobCrud = OdJobCrud(uow=self.uow)
+        self.count_crud: OdCountCrud = OdCountCrud(uow=self.uow)
+
+    async def get_jobs(self, limit: int) -> list[OdJobInfo]:
+        """Get the latest job runs, newest first."""
+        async with self.uow:
+            return [OdJobInfo.model_validate(job) for job in await self.job_crud.get_jobs(limit)]
+
+    async def get_matrix(
+        self, job_id: UUID, limit: int, origin: str | None = None, destination: str | None = None
+    ) -> OdMatrix:
+        """
+        Get the zone pairs with the most trips of a job, from or to one zone when given.
+
+        Raises:
+            ValueError: No job with this ID
+        """
+        async with self.uow:
+            job = await self.job_crud.get_job(job_id)
+            rows = await self.count_crud.get_top_counts(job_id, limit, origin, destination) if job else []
+        if job is None:
+            raise ValueError(f"OD job {job_id} not found")
+        return OdMatrix(
+            job=OdJobInfo.model_validate(job),
+            origin=[row[0] for row in rows],
+            destination=[row[1] for row in rows],
+            trips=[row[2] for row in rows],
+        )
+
+
+async def compact_trajectories_periodically(interval: float, age: timedelta, batch_size: int) -> None:
+    """Compact the sightings older than ``age`` every ``interval`` seconds, until cancelled."""
+    service = TrajectoryService()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await service.compact_all(datetime.now(UTC) - age, batch_size)
+        except Exception:  # noqa: BLE001 - a failed run is retried at the next interval
+            logger.exception("Trajectory compaction failed")
+
+
+def start_trajectory_compaction() -> asyncio.Task | None:
+    """Start compacting trajectories in the background, unless ``TRAJECTORY_COMPACT_INTERVAL_SECONDS`` is 0."""
+    if settings.TRAJECTORY_COMPACT_INTERVAL_SECONDS <= 0:
+        return None
+    return asyncio.create_task(
+        compact_trajectories_periodically(
+            settings.TRAJECTORY_COMPACT_INTERVAL_SECONDS,
+            timedelta(minutes=settings.TRAJECTORY_COMPACT_AFTER_MINUTES),
+            settings.TRAJECTORY_COMPACT_BATCH_SIZE,
+        ),
+        name="trajectory-compaction",
+    )
+
+
+async def flush_speed_sketches_periodically(interval: float) -> None:
+    """Flush the speed sketches every ``interval`` seconds, and once more when cancelled."""
+    service = TrafficAnalysisService()
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await service.flush_speed_sketches()
+            except Exception:  # noqa: BLE001 - the buckets are written at the next interval
+                logger.exception("Speed sketch flush failed")
+    finally:
+        try:
+            await service.flush_speed_sketches()
+        except Exception:  # noqa: BLE001 - shutting down, the buckets are lost
+            logger.exception("Speed sketch flush failed")
+
+
+async def follow_measurements_periodically(interval: float, backfill: timedelta, batch_size: int) -> None:
+    """Fold new measurements into the forecaster every ``interval`` seconds, starting ``backfill`` ago."""
+    # Read from the primary, a lagging replica would skip measurements.
+    service = TrafficAnalysisService()
+    after = (datetime.now(UTC) - backfill, UUID(int=0))
+    while True:
+        try:
+            after = await service.follow_measurements(after, batch_size)
+        except Exception:  # noqa: BLE001 - the same measurements are read at the next interval
+            logger.exception("Following traffic measurements failed")
+        await asyncio.sleep(interval)
+
+
+def start_measurement_follow() -> asyncio.Task | None:
+    """Start following the measurements in the background, unless ``FORECAST_FOLLOW_SECONDS`` is 0."""
+    if settings.FORECAST_FOLLOW_SECONDS <= 0:
+        return None
+    return asyncio.create_task(
+        follow_measurements_periodically(
+            settings.FORECAST_FOLLOW_SECONDS,
+            timedelta(minutes=settings.FORECAST_BACKFILL_MINUTES),
+            FOLLOW_BATCH_SIZE,
+        ),
+        name="measurement-follow",
+    )
+
+
+def start_speed_sketch_flush() -> asyncio.Task | None:
+    """Start publishing the speed sketches in the background, unless ``SPEED_SKETCH_FLUSH_SECONDS`` is 0."""
+    if settings.SPEED_SKETCH_FLUSH_SECONDS <= 0:
+        return None
+    return asyncio.create_task(
+        flush_speed_sketches_periodically(settings.SPEED_SKETCH_FLUSH_SECONDS), name="speed-sketch-flush"
+    )
+
+
+async def warm_caches() -> None:
+    """
+    Load the road cache, the road network (with the speed limits of the road capacities)
+    and the spatial index concurrently, so the first requests of a worker do not wait for them.
+    A cache that fails to load is loaded on first use instead.
+    """
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        RoadService(read_only=True).warm_road_cache(),
+        TrafficAnalysisService(read_only=True).road_graph(),
+        RoadService(read_only=True).spatial_index(),
+        return_exceptions=True,
+    )
+    for name, result in zip(("road cache", "road network", "spatial index"), results, strict=True):
+        if isinstance(result, Exception):
+            logger.warning(f"Warming up the {name} failed: {result!s}")
+    logger.info("Caches warmed up in {:.0f} ms", (time.perf_counter() - started) * 1000)
+
+
+def _analysis_from_snapshot(snapshot: RoadTrafficSnapshot) -> TrafficAnalysis:
+    """Convert a stored snapshot into the analysis response."""
+    return TrafficAnalysis(
+        current_speed=snapshot.current_speed,
+        flow_rate=snapshot.flow_rate,
+        density=snapshot.density,
+        congestion_level=snapshot.congestion_level,
+        state=State(snapshot.state),  # pyright: ignore[reportArgumentType]
+        trend=snapshot.trend,
+        trend_confidence=snapshot.trend_confidence,
+        density_slope=snapshot.density_slope,
+        speed_slope=snapshot.speed_slope,
+        updated_at=snapshot.updated_at,
+    )
+
+
+def _moving_average(data: np.ndarray, window: int) -> np.ndarray:
+    """Вычислить центральное скользящее среднее для массива data с заданным окном, усекая его по краям."""
     if window < 1:
         return data
     half = window // 2
-    result = []
-    for i in range(len(data)):
-        start = max(0, i - half)
-        end = min(len(data), i + half + 1)
-        subset = data[start:end]
-        avg = sum(subset) / len(subset)
-        result.append(avg)
-    return result
-
-
-def _average_speed(items: list[HasAverageSpeed], window_size: int) -> float:
-    """Calculate the average speed of a list of items."""
-
-    return sum(
-        _moving_average(
-            data=[item.average_speed for item in items],
-            window=window_size,
-        )
-    ) / len(items)
+    kernel = np.ones(2 * half + 1)
+    center = slice(half, half + len(data))
+    sums = np.convolve(data, kernel)[center]
+    counts = np.convolve(np.ones(len(data)), kernel)[center]
+    return sums / counts
+
+
+def _average_speed(speeds: ArrayLike, window_size: int) -> float:
+    """Calculate the average of the smoothed speeds."""
+    return float(_moving_average(np.asarray(speeds, dtype=np.float64), window_size).mean())
@@ -0,0 +1,373 @@
+import asyncio
+import contextlib
+import os
+import secrets
+import time
+from collections.abc import Iterable
+from datetime import datetime
+from multiprocessing.shared_memory import SharedMemory
+from uuid import UUID
+
+import numpy as np
+from loguru import logger
+
+from src.analytics.trajectories import from_epoch_ms, to_epoch_ms
+from src.commons.schemas import LiveAggregate
+from src.config import settings
+
+MAGIC = 0x61676764  # "aggd"
+# ``heartbeat_ms`` is the wall clock time the writer last showed it is alive. ``pid`` is for
+# the logs only, writers may run in other containers whose process IDs mean nothing here.
+HEADER = np.dtype(
+    [
+        ("magic", "<u8"),
+        ("capacity", "<u8"),
+        ("token", "<u8"),
+        ("closed", "<u8"),
+        ("pid", "<u8"),
+        ("heartbeat_ms", "<i8"),
+        ("_pad", "<u8", 2),
+    ]
+)
+# One 64 byte cache line per road. ``seq`` is odd while the writer updates the slot.
+SLOT = np.dtype(
+    [
+        ("seq", "<u8"),
+        ("count", "<u8"),
+        ("speed_sum", "<f8"),
+        ("density_sum", "<f8"),
+        ("speed", "<f8"),
+        ("density", "<f8"),
+        ("updated_ms", "<i8"),
+        ("_pad", "<u8"),
+    ]
+)
+# Road IDs as two uint64 halves, (0, 0) marks a free slot.
+KEY = np.dtype(("<u8", 2))
+SEQLOCK_RETRIES = 100
+# How often a reader looks for writers that started, stopped or were replaced.
+REFRESH_SECONDS = 1.0
+# How often a writer refreshes its heartbeat, and how old a heartbeat may get before
+# readers skip the segment and a new writer may take it over.
+HEARTBEAT_SECONDS = 1.0
+STALE_SECONDS = 10.0
+
+
+def road_key(road_id: UUID) -> tuple[int, int]:
+    return divmod(road_id.int, 1 << 64)
+
+
+def now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+class Segment:
+    """
+    Shared memory of one writer process: a header, the road slot table and the slots.
+
+    The slot table is an open addressing hash table keyed by road ID with linear probing.
+    Slots are never freed, so once found a road keeps its slot for the life of the segment.
+    """
+
+    def __init__(self, shm: SharedMemory) -> None:
+        self.shm = shm
+        self.header = np.ndarray((), dtype=HEADER, buffer=shm.buf)
+        capacity = int(self.header["capacity"])
+        self.keys = np.ndarray((capacity,), dtype=KEY, buffer=shm.buf, offset=HEADER.itemsize)
+        self.slots = np.ndarray(
+            (capacity,), dtype=SLOT, buffer=shm.buf, offset=HEADER.itemsize + capacity * KEY.itemsize
+        )
+        # Field views made once, indexing them is much cheaper than building a view per update.
+        self._seq, self._count, self._speed_sum, self._density_sum, self._speed, self._density, self._updated_ms = (
+            self.slots[field] for field in SLOT.names[:-1]
+        )
+        self.token = int(self.header["token"])
+        self._found: dict[UUID, int] = {}
+
+    @staticmethod
+    def size(capacity: int) -> int:
+        return HEADER.itemsize + capacity * (KEY.itemsize + SLOT.itemsize)
+
+    @classmethod
+    def create(cls, name: str, capacity: int) -> "Segment":
+        """Create the segment, raises FileExistsError when another writer holds ``name``."""
+        shm = SharedMemory(name=name, create=True, size=cls.size(capacity))
+        header = np.ndarray((), dtype=HEADER, buffer=shm.buf)
+        header["capacity"] = capacity
+        header["token"] = secrets.randbits(63)
+        header["pid"] = os.getpid()
+        header["heartbeat_ms"] = now_ms()
+        # Written last, readers skip the segment until it is set.
+        header["magic"] = MAGIC
+        del header
+        return cls(shm)
+
+    @classmethod
+    def open(cls, name: str) -> "Segment | None":
+        """Map a segment whatever the state of its writer, None while there is no complete one."""
+        try:
+            # Not tracked (Python 3.13), the resource tracker would unlink the writer's segment on exit.
+            shm = SharedMemory(name=name, track=False)
+        except FileNotFoundError:
+            return None
+        complete = False
+        if shm.size >= HEADER.itemsize:
+            header = np.ndarray((), dtype=HEADER, buffer=shm.buf)
+            complete = int(header["magic"]) == MAGIC
+            del header
+        if not complete:
+            shm.close()
+            return None
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name: str) -> "Segment | None":
+        """Map the segment of a live writer, None while there is none."""
+        segment = cls.open(name)
+        if segment is not None and not segment.live:
+            segment.close()
+            return None
+        return segment
+
+    @property
+    def closed(self) -> bool:
+        return bool(self.header["closed"])
+
+    @property
+    def pid(self) -> int:
+        return int(self.header["pid"])
+
+    @property
+    def live(self) -> bool:
+        """Whether the writer holds the segment: not released, with a heartbeat within ``STALE_SECONDS``."""
+        return not self.closed and now_ms() - int(self.header["heartbeat_ms"]) <= STALE_SECONDS * 1000
+
+    def beat(self) -> None:
+        self.header["heartbeat_ms"] = now_ms()
+
+    def find(self, road_id: UUID, claim: bool = False) -> int | None:
+        """Slot of ``road_id``, a free one is claimed for it when ``claim`` (writer only)."""
+        slot = self._found.get(road_id)
+        if slot is not None:
+            return slot
+        high, low = road_key(road_id)
+        capacity = len(self.keys)
+        start = road_id.int % capacity
+        for probe in range(capacity):
+            slot = (start + probe) % capacity
+            key_high, key_low = self.keys[slot]
+            if key_high == high and key_low == low:
+                self._found[road_id] = slot
+                return slot
+            if key_high == 0 and key_low == 0:
+                if not claim:
+                    return None
+                self.keys[slot] = (high, low)
+                self._found[road_id] = slot
+                return slot
+        return None
+
+    def add(self, slot: int, timestamp: datetime, speed: float, density: float) -> None:
+        """Fold one measurement into the slot, readers retry while the sequence is odd."""
+        updated_ms = to_epoch_ms(timestamp)
+        self._seq[slot] += 1
+        self._count[slot] += 1
+        self._speed_sum[slot] += speed
+        self._density_sum[slot] += density
+        self._speed[slot] = speed
+        self._density[slot] = density
+        self._updated_ms[slot] = updated_ms
+        self._seq[slot] += 1
+
+    def read(self, slot: int) -> np.void | None:
+        """Consistent copy of the slot, None when the writer kept it busy for every retry."""
+        seq = self._seq
+        for _ in range(SEQLOCK_RETRIES):
+            before = int(seq[slot])
+            if before & 1:
+                continue
+            record = self.slots[slot].copy()
+            if int(seq[slot]) == before:
+                return record
+        return None
+
+    def close(self, unlink: bool = False) -> None:
+        if unlink:
+            self.header["closed"] = 1
+        # The views must go before the mapping can be closed.
+        del self.header, self.keys, self.slots
+        del self._seq, self._count, self._speed_sum, self._density_sum, self._speed, self._density, self._updated_ms
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class SharedAggregates:
+    """
+    Per-road running totals of the traffic measurements, shared between processes.
+
+    Each ingestion process claims one of ``writers`` shared memory segments named
+    ``{name}-{index}`` and is the only writer of it, so updates need no locks across
+    processes. Every road slot is guarded by a sequence lock: the writer makes the
+    sequence odd, updates the fields and makes it even again, and a reader retries
+    until it copied the slot between two equal even sequences. Readers map every
+    segment and add up the totals of a road, reading the mapped memory directly
+    without a database round trip. The totals count the measurements since the
+    writers started. Writers refresh a heartbeat in their segment, readers skip
+    segments whose heartbeat is stale, and a new writer takes them over. The sequence
+    lock relies on stores becoming visible in program order, as on x86. Numpy stores
+    carry no memory barriers, so on weakly ordered CPUs a reader may rarely see a torn slot.
+    """
+
+    def __init__(self, name: str, writers: int = 8, capacity: int = 65_536) -> None:
+        self.name = name
+        self.writers = writers
+        self.capacity = capacity
+        self._writer: Segment | None = None
+        self._writer_name: str | None = None
+        self._readers: dict[int, Segment] = {}
+        self._refreshed_at = float("-inf")
+        self._full_warned = False
+
+    @property
+    def writing(self) -> bool:
+        return self._writer is not None
+
+    def open_writer(self) -> bool:
+        """
+        Claim a free segment for this process, or one whose writer stopped without releasing it,
+        False when all of them are held by live writers.
+        """
+        for index in range(self.writers):
+            name = f"{self.name}-{index}"
+            try:
+                self._writer = Segment.create(name, self.capacity)
+            except FileExistsError:
+                if not self._release_stale(name):
+                    continue
+                try:
+                    self._writer = Segment.create(name, self.capacity)
+                except FileExistsError:
+                    continue
+            self._writer_name = name
+            logger.info(f"Publishing shared aggregates to {name}")
+            return True
+        logger.warning(f"All {self.writers} shared aggregate segments of {self.name} are taken, not publishing")
+        return False
+
+    @staticmethod
+    def _release_stale(name: str) -> bool:
+        """Unlink the segment ``name`` if its writer is gone, True when it was."""
+        segment = Segment.open(name)
+        if segment is None:
+            return False
+        if segment.live:
+            segment.close()
+            return False
+        logger.warning(f"Taking over shared aggregate segment {name} of stopped writer pid {segment.pid}")
+        # Another writer may unlink it first, the next create decides who gets the name.
+        with contextlib.suppress(FileNotFoundError):
+            segment.close(unlink=True)
+        return True
+
+    def beat(self) -> bool:
+        """
+        Refresh the heartbeat of this process's segment. If another writer took the segment over,
+        e.g. after this process stalled, another one is claimed. False while this process is not a writer.
+        """
+        if self._writer is None:
+            return False
+        self._writer.beat()
+        current = Segment.open(self._writer_name)  # pyright: ignore[reportArgumentType]
+        owned = current is not None and current.token == self._writer.token
+        if current is not None:
+            current.close()
+        if owned:
+            return True
+        logger.warning(f"Shared aggregate segment {self._writer_name} was taken over, claiming another one")
+        # Only unmapped, the name belongs to the new writer now.
+        self._writer.close()
+        self._writer = self._writer_name = None
+        return self.open_writer()
+
+    async def heartbeat(self) -> None:
+        """Keep the segment of this process live, beating every ``HEARTBEAT_SECONDS`` until cancelled."""
+        while self.beat():
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+
+    def start_publishing(self) -> asyncio.Task | None:
+        """Claim a segment and keep it live in the background, None when none is free."""
+        if not self.open_writer():
+            return None
+        return asyncio.create_task(self.heartbeat(), name="shared-aggregates-heartbeat")
+
+    def add(self, road_id: UUID, timestamp: datetime, speed: float, density: float) -> None:
+        """Publish a measurement of ``road_id``, a no-op unless this process is a writer."""
+        if self._writer is None:
+            return
+        slot = self._writer.find(road_id, claim=True)
+        if slot is None:
+            if not self._full_warned:
+                logger.warning(f"Shared aggregate slots of {self.name} are full, new roads are not published")
+                self._full_warned = True
+            return
+        self._writer.add(slot, timestamp, speed, density)
+
+    def _refresh(self) -> None:
+        """Attach new writers and drop the segments of writers that stopped or were replaced."""
+        for index in range(self.writers):
+            current = self._readers.get(index)
+            latest = Segment.attach(f"{self.name}-{index}")
+            if current is not None and (latest is None or latest.token != current.token or not current.live):
+                current.close()
+                del self._readers[index]
+                current = None
+            if latest is None:
+                continue
+            if current is None:
+                self._readers[index] = latest
+            else:
+                latest.close()
+        self._refreshed_at = time.monotonic()
+
+    def read(self, road_ids: Iterable[UUID]) -> dict[UUID, LiveAggregate]:
+        """Totals of the roads over every writer, roads without measurements are left out."""
+        if time.monotonic() - self._refreshed_at >= REFRESH_SECONDS:
+            self._refresh()
+        result: dict[UUID, LiveAggregate] = {}
+        for road_id in road_ids:
+            records = []
+            for segment in self._readers.values():
+                slot = segment.find(road_id)
+                record = None if slot is None else segment.read(slot)
+                if record is not None and record["count"]:
+                    records.append(record)
+            if not records:
+                continue
+            count = sum(int(record["count"]) for record in records)
+            latest = max(records, key=lambda record: int(record["updated_ms"]))
+            result[road_id] = LiveAggregate(
+                road_id=road_id,
+                count=count,
+                average_speed=sum(float(record["speed_sum"]) for record in records) / count,
+                average_density=sum(float(record["density_sum"]) for record in records) / count,
+                speed=float(latest["speed"]),
+                density=float(latest["density"]),
+                updated_at=from_epoch_ms(int(latest["updated_ms"])),
+            )
+        return result
+
+    def close(self) -> None:
+        """Release the segment of this process and unmap the others."""
+        if self._writer is not None:
+            self._writer.close(unlink=True)
+            self._writer = self._writer_name = None
+        for segment in self._readers.values():
+            segment.close()
+        self._readers.clear()
+        self._refreshed_at = float("-inf")
+
+
+shared_aggregates = SharedAggregates(
+    settings.SHARED_AGGREGATES_NAME, settings.SHARED_AGGREGATES_WRITERS, settings.SHARED_AGGREGATES_ROADS
+)
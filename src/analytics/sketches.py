@@ -0,0 +1,208 @@
+import math
+import os
+from collections import defaultdict
+from collections.abc import Container, Iterable, Mapping
+from datetime import UTC, datetime
+from typing import Any
+from uuid import UUID, uuid4
+
+from src.config import settings
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+# Values below this go to the zero bucket, log-buckets are meaningless around 0.
+MIN_INDEXABLE = 1e-3
+
+
+class DDSketch:
+    """
+    Mergeable quantile sketch with relative error guarantees (DDSketch).
+
+    Values are counted in logarithmic buckets, so any quantile is returned within
+    ``relative_accuracy`` of the true value. Two sketches with the same accuracy
+    merge by adding bucket counts, which makes them safe to combine across time
+    buckets and workers. When more than ``max_bins`` buckets are used the lowest
+    ones are collapsed, which only affects the accuracy of the lowest quantiles.
+    """
+
+    __slots__ = ("_bins", "_gamma", "_log_gamma", "count", "max_bins", "relative_accuracy", "zero_count")
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY, max_bins: int = 2048) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._bins: defaultdict[int, int] = defaultdict(int)
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float, weight: int = 1) -> None:
+        """Count ``value``, negative values are treated as zero."""
+        self.count += weight
+        if value < MIN_INDEXABLE:
+            self.zero_count += weight
+            return
+        self._bins[math.ceil(math.log(value) / self._log_gamma)] += weight
+        if len(self._bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        keys = sorted(self._bins)
+        excess = keys[: len(keys) - self.max_bins + 1]
+        target = keys[len(excess)]
+        for key in excess:
+            self._bins[target] += self._bins.pop(key)
+
+    def merge(self, other: "DDSketch") -> None:
+        """Add the counts of ``other`` into this sketch."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        for key, count in other._bins.items():
+            self._bins[key] += count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if len(self._bins) > self.max_bins:
+            self._collapse()
+
+    def quantile(self, q: float) -> float | None:
+        """Return the ``q`` quantile (0-1), or None for an empty sketch."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self._bins):
+            seen += self._bins[key]
+            if seen > rank:
+                return 2 * self._gamma**key / (self._gamma + 1)
+        return 2 * self._gamma ** max(self._bins) / (self._gamma + 1)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize to a JSON compatible dict."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zero_count": self.zero_count,
+            "bins": {str(key): count for key, count in self._bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "DDSketch":
+        """Restore a sketch serialized with ``to_dict``."""
+        sketch = cls(data["relative_accuracy"])
+        sketch.zero_count = data["zero_count"]
+        for key, count in data["bins"].items():
+            sketch._bins[int(key)] = count
+        sketch.count = sketch.zero_count + sum(sketch._bins.values())
+        return sketch
+
+
+class SpeedSketchStore:
+    """
+    Speed sketches per road and time bucket.
+
+    Each road keeps one ``DDSketch`` per ``bucket_minutes`` bucket for the
+    retention period. Percentiles over a window are answered by merging the
+    buckets it covers, without touching the ``Car`` table. The buckets changed
+    since the last ``changes`` call are tracked, so each process can publish
+    them for the others to merge.
+    """
+
+    def __init__(
+        self,
+        bucket_minutes: int = 5,
+        retention_minutes: int = 24 * 60,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+    ) -> None:
+        self.bucket_minutes = bucket_minutes
+        self.retention_minutes = retention_minutes
+        self.bucket_seconds = bucket_minutes * 60
+        self.retained_buckets = max(retention_minutes // bucket_minutes, 1)
+        self.relative_accuracy = relative_accuracy
+        self._sketches: defaultdict[UUID, dict[int, DDSketch]] = defaultdict(dict)
+        self._changed: defaultdict[UUID, set[int]] = defaultdict(set)
+        self._worker_id = uuid4()
+        self._pid = os.getpid()
+
+    @property
+    def worker_id(self) -> UUID:
+        """ID of the process in published buckets, a forked process gets its own."""
+        if self._pid != os.getpid():
+            self._worker_id, self._pid = uuid4(), os.getpid()
+        return self._worker_id
+
+    def _bucket(self, timestamp: datetime | None) -> int:
+        return int((timestamp or datetime.now(UTC)).timestamp() // self.bucket_seconds)
+
+    def _sketch(self, road_id: UUID, bucket: int) -> DDSketch:
+        buckets = self._sketches[road_id]
+        sketch = buckets.get(bucket)
+        if sketch is None:
+            sketch = buckets[bucket] = DDSketch(self.relative_accuracy)
+            oldest = bucket - self.retained_buckets
+            for expired in [key for key in buckets if key <= oldest]:
+                del buckets[expired]
+        return sketch
+
+    def add(self, road_id: UUID, speed: float, timestamp: datetime | None = None) -> None:
+        """Count a single speed observation."""
+        bucket = self._bucket(timestamp)
+        self._sketch(road_id, bucket).add(speed)
+        self._changed[road_id].add(bucket)
+
+    def buckets(self, minutes: int, now: datetime | None = None) -> range:
+        """Buckets covering the last ``minutes`` minutes."""
+        newest = self._bucket(now)
+        return range(newest - max(math.ceil(minutes * 60 / self.bucket_seconds), 1) + 1, newest + 1)
+
+    def window(self, road_id: UUID, minutes: int, now: datetime | None = None) -> DDSketch:
+        """Merge the buckets of the last ``minutes`` minutes into one sketch."""
+        buckets = self.buckets(minutes, now)
+        merged = DDSketch(self.relative_accuracy)
+        for bucket, sketch in self._sketches.get(road_id, {}).items():
+            if bucket in buckets:
+                merged.merge(sketch)
+        return merged
+
+    def export(self, road_id: UUID, buckets: Container[int] | None = None) -> dict[int, dict[str, Any]]:
+        """Serialize the buckets of a road, or only ``buckets`` of them, to be merged by another worker."""
+        return {
+            bucket: sketch.to_dict()
+            for bucket, sketch in self._sketches.get(road_id, {}).items()
+            if buckets is None or bucket in buckets
+        }
+
+    def merge(self, road_id: UUID, buckets: Mapping[int, dict[str, Any]]) -> None:
+        """Merge buckets exported by another worker."""
+        for bucket, data in buckets.items():
+            self._sketch(road_id, int(bucket)).merge(DDSketch.from_dict(data))
+
+    def combined(
+        self, road_id: UUID, buckets: Container[int], exported: Iterable[tuple[int, dict[str, Any]]]
+    ) -> "SpeedSketchStore":
+        """
+        New store with ``buckets`` of a road merged from this store and from the
+        ``(bucket, sketch)`` pairs exported by other workers, this store is left as is.
+        """
+        store = SpeedSketchStore(self.bucket_minutes, self.retention_minutes, self.relative_accuracy)
+        store.merge(road_id, self.export(road_id, buckets))
+        for bucket, data in exported:
+            store.merge(road_id, {bucket: data})
+        return store
+
+    def changes(self) -> dict[UUID, dict[int, dict[str, Any]]]:
+        """Export the buckets counted into since the last call, per road."""
+        changed, self._changed = self._changed, defaultdict(set)
+        return {road_id: self.export(road_id, buckets) for road_id, buckets in changed.items()}
+
+    def mark_changed(self, changes: Mapping[UUID, Iterable[int]]) -> None:
+        """Return buckets to the next ``changes``, after publishing them failed."""
+        for road_id, buckets in changes.items():
+            self._changed[road_id].update(buckets)
+
+
+speed_sketches = SpeedSketchStore(
+    bucket_minutes=settings.SPEED_SKETCH_BUCKET_MINUTES,
+    retention_minutes=settings.SPEED_SKETCH_RETENTION_MINUTES,
+)
@@ -0,0 +1,324 @@
+import asyncio
+import math
+import time
+import typing
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import Row
+
+from src.commons.project_utils import RADIUS, haversine
+from src.commons.schemas import BboxClusters, BboxCongestion, BboxRoads, RoadDistance, TrafficAnalysis
+from src.commons.state import VARIANT_STATE
+from src.config import settings
+
+KM_PER_DEGREE = math.pi * RADIUS / 180
+# Longitude cells shrink towards the poles, their width is never taken below this share.
+MIN_COS_LATITUDE = 0.01
+# Below the detail zoom, a map tile is split into this many clusters per side.
+CLUSTER_CELLS_PER_TILE = 8
+# Snapshots committed late with an older timestamp are still picked up by the next refresh.
+STATE_REFRESH_OVERLAP = timedelta(seconds=5)
+
+STATE_NAMES: tuple[str, ...] = typing.get_args(VARIANT_STATE)
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+UNKNOWN_STATE = -1
+
+
+@dataclass(slots=True, frozen=True)
+class RoadLocation:
+    """Reference point of a road."""
+
+    road_id: UUID
+    latitude: float
+    longitude: float
+
+
+class GridIndex:
+    """
+    Uniform latitude/longitude grid over road reference points.
+
+    Cells are ``cell_km`` high and ``cell_km`` degrees-equivalent wide, each holds
+    the array of its point indices. A query reads the cells overlapping the search
+    square and computes the haversine distance of their points in one vectorized
+    step, so its cost depends on the local density, not on the number of roads.
+    Longitudes are not wrapped at the antimeridian.
+
+    The latest speed, congestion level and state of every road are kept in arrays
+    parallel to the points (NaN and ``UNKNOWN_STATE`` until known), so a viewport
+    is answered without touching the database.
+    """
+
+    def __init__(self, locations: list[RoadLocation], cell_km: float = 1.0) -> None:
+        self.cell_km = cell_km
+        self.cell_degrees = cell_km / KM_PER_DEGREE
+        self.road_ids = [location.road_id for location in locations]
+        self.latitudes = np.array([location.latitude for location in locations], dtype=np.float64)
+        self.longitudes = np.array([location.longitude for location in locations], dtype=np.float64)
+        self._positions = {road_id: position for position, road_id in enumerate(self.road_ids)}
+        self._cells: dict[tuple[int, int], np.ndarray] = {}
+        self.speeds = np.full(len(locations), np.nan)
+        self.congestion = np.full(len(locations), np.nan)
+        self.states = np.full(len(locations), UNKNOWN_STATE, dtype=np.int8)
+        # Newest snapshot applied, and when the snapshots were last checked.
+        self.states_until: datetime | None = None
+        self.states_checked_at = -math.inf
+        if not locations:
+            return
+
+        rows = np.floor(self.latitudes / self.cell_degrees).astype(np.int64)
+        columns = np.floor(self.longitudes / self.cell_degrees).astype(np.int64)
+        order = np.lexsort((columns, rows))
+        changes = (np.diff(rows[order]) != 0) | (np.diff(columns[order]) != 0)
+        for cell in np.split(order, np.flatnonzero(changes) + 1):
+            self._cells[int(rows[cell[0]]), int(columns[cell[0]])] = cell
+
+    def __len__(self) -> int:
+        return len(self.road_ids)
+
+    def set_state(self, road_id: UUID, speed: float, congestion_level: float, state: str) -> None:
+        """Store the latest analysis of a road, roads without coordinates are ignored."""
+        position = self._positions.get(road_id)
+        if position is not None:
+            self.speeds[position] = speed
+            self.congestion[position] = congestion_level
+            self.states[position] = STATE_CODES.get(state, UNKNOWN_STATE)
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> list[RoadDistance]:
+        """Roads whose reference point is within ``radius_km`` of a point, nearest first."""
+        candidates = self._candidates(latitude, longitude, radius_km)
+        if not len(candidates):
+            return []
+        distances = haversine(latitude, longitude, self.latitudes[candidates], self.longitudes[candidates])
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return [
+            RoadDistance(road_id=self.road_ids[index], distance_km=float(distance))
+            for index, distance in zip(candidates[order].tolist(), distances[order].tolist(), strict=True)
+        ]
+
+    def nearest(self, latitude: float, longitude: float, max_km: float) -> RoadDistance | None:
+        """Road nearest to a point, searched in growing squares up to ``max_km`` away."""
+        radius = min(self.cell_km, max_km)
+        while True:
+            found = self.within(latitude, longitude, radius)
+            if found:
+                return found[0]
+            if radius >= max_km:
+                return None
+            radius = min(radius * 4, max_km)
+
+    def in_bbox(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """Positions of the roads whose reference point is inside a bounding box."""
+        rows = range(math.floor(south / self.cell_degrees), math.floor(north / self.cell_degrees) + 1)
+        columns = range(math.floor(west / self.cell_degrees), math.floor(east / self.cell_degrees) + 1)
+        if len(rows) * len(columns) >= len(self._cells):
+            candidates = np.arange(len(self.road_ids))
+        else:
+            cells = [
+                self._cells[key] for key in ((row, column) for row in rows for column in columns) if key in self._cells
+            ]
+            candidates = np.concatenate(cells) if cells else np.empty(0, dtype=np.int64)
+        latitudes, longitudes = self.latitudes[candidates], self.longitudes[candidates]
+        inside = (latitudes >= south) & (latitudes <= north) & (longitudes >= west) & (longitudes <= east)
+        return candidates[inside]
+
+    def bbox(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        zoom: int,
+        detail_zoom: int,
+        max_roads: int,
+    ) -> BboxCongestion:
+        """
+        Congestion of the roads in a bounding box for a map viewport.
+
+        From ``detail_zoom`` on, every road is returned, as long as there are at most
+        ``max_roads``. Otherwise roads are merged into clusters of a fixed share of a
+        map tile at ``zoom``.
+        """
+        positions = self.in_bbox(south, west, north, east)
+        if zoom >= detail_zoom and len(positions) <= max_roads:
+            return BboxCongestion(zoom=zoom, total=len(positions), roads=self._roads(positions))
+        cell_degrees = 360 / (2**zoom * CLUSTER_CELLS_PER_TILE)
+        return BboxCongestion(zoom=zoom, total=len(positions), clusters=self._clusters(positions, cell_degrees))
+
+    def _roads(self, positions: np.ndarray) -> BboxRoads:
+        return BboxRoads(
+            road_id=[self.road_ids[position] for position in positions.tolist()],
+            latitude=np.round(self.latitudes[positions], 5).tolist(),
+            longitude=np.round(self.longitudes[positions], 5).tolist(),
+            speed=_nullable(np.round(self.speeds[positions], 1)),
+            congestion_level=_nullable(np.round(self.congestion[positions], 3)),
+            state=[STATE_NAMES[code] if code != UNKNOWN_STATE else None for code in self.states[positions].tolist()],
+        )
+
+    def _clusters(self, positions: np.ndarray, cell_degrees: float) -> BboxClusters:
+        if not len(positions):
+            return BboxClusters(latitude=[], longitude=[], count=[], congestion_level=[], max_congestion_level=[])
+
+        latitudes, longitudes = self.latitudes[positions], self.longitudes[positions]
+        rows = np.floor(latitudes / cell_degrees).astype(np.int64)
+        columns = np.floor(longitudes / cell_degrees).astype(np.int64)
+        # One integer per cell, a 1-d unique is much faster than a row-wise one.
+        rows -= rows.min()
+        columns -= columns.min()
+        cells = rows * (int(columns.max()) + 1) + columns
+        _, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+        size = len(counts)
+
+        congestion = self.congestion[positions]
+        known = ~np.isnan(congestion)
+        known_counts = np.bincount(inverse, weights=known, minlength=size)
+        sums = np.bincount(inverse, weights=np.where(known, congestion, 0), minlength=size)
+        means = np.divide(sums, known_counts, out=np.full(size, np.nan), where=known_counts > 0)
+        maxima = np.full(size, -np.inf)
+        np.maximum.at(maxima, inverse[known], congestion[known])
+        maxima[known_counts == 0] = np.nan
+
+        return BboxClusters(
+            latitude=np.round(np.bincount(inverse, weights=latitudes) / counts, 5).tolist(),
+            longitude=np.round(np.bincount(inverse, weights=longitudes) / counts, 5).tolist(),
+            count=counts.tolist(),
+            congestion_level=_nullable(np.round(means, 3)),
+            max_congestion_level=_nullable(np.round(maxima, 3)),
+        )
+
+    def _candidates(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        row = math.floor(latitude / self.cell_degrees)
+        column = math.floor(longitude / self.cell_degrees)
+        row_span = math.ceil(radius_km / self.cell_km)
+        # Longitude cells are narrowest on the side of the square closest to a pole.
+        farthest_latitude = min(abs(latitude) + radius_km / KM_PER_DEGREE, 90.0)
+        cos_latitude = max(math.cos(math.radians(farthest_latitude)), MIN_COS_LATITUDE)
+        column_span = math.ceil(radius_km / (self.cell_km * cos_latitude))
+
+        if (2 * row_span + 1) * (2 * column_span + 1) >= len(self._cells):
+            return np.arange(len(self.road_ids))
+        cells = [
+            self._cells[key]
+            for key in (
+                (row + row_offset, column + column_offset)
+                for row_offset in range(-row_span, row_span + 1)
+                for column_offset in range(-column_span, column_span + 1)
+            )
+            if key in self._cells
+        ]
+        return np.concatenate(cells) if cells else np.empty(0, dtype=np.int64)
+
+
+def _nullable(values: np.ndarray) -> list[float | None]:
+    return [None if math.isnan(value) else value for value in values.tolist()]
+
+
+class RoadLocator:
+    """
+    Process-wide spatial index of the roads, built on first use and rebuilt after roads change.
+
+    Roads changed by this process invalidate the index directly. Changes made by other
+    processes are found by comparing the version of the road table, at most every
+    ``roads_max_age`` seconds.
+
+    Road states are applied in place: by the ingestion of this process, and from the
+    snapshots changed since the last check, at most every ``state_max_age`` seconds.
+    """
+
+    def __init__(
+        self,
+        cell_km: float,
+        state_max_age: float,
+        roads_max_age: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.cell_km = cell_km
+        self.state_max_age = state_max_age
+        self.roads_max_age = roads_max_age
+        self.index: GridIndex | None = None
+        self._clock = clock
+        self._generation = 0
+        self._version: tuple | None = None
+        self._roads_checked_at = -math.inf
+        self._lock = asyncio.Lock()
+        self._state_lock = asyncio.Lock()
+
+    @property
+    def fresh(self) -> bool:
+        """Whether the current index can be served without checking the roads."""
+        return self.index is not None and self._clock() - self._roads_checked_at < self.roads_max_age
+
+    def invalidate(self) -> None:
+        """Rebuild the index on its next use, after roads were added or removed."""
+        self.index = None
+        self._generation += 1
+
+    async def get(
+        self,
+        load: Callable[[], Awaitable[list[RoadLocation]]],
+        load_version: Callable[[], Awaitable[tuple]],
+    ) -> GridIndex:
+        """
+        Get the index, building it from the locations returned by ``load`` when needed.
+
+        Args:
+            load: Loader of the road locations
+            load_version: Loader of a value of the road table that changes with any road
+        """
+        if self.fresh:
+            return self.index  # pyright: ignore[reportReturnType]
+        async with self._lock:
+            if self.fresh:
+                return self.index  # pyright: ignore[reportReturnType]
+            checked_at, generation = self._clock(), self._generation
+            # Read before the locations, so a change in between rebuilds the index on the next check.
+            version = await load_version()
+            if self.index is not None and version == self._version:
+                self._roads_checked_at = checked_at
+                return self.index
+            index = GridIndex(await load(), self.cell_km)
+            # Roads changed while loading, the next request builds the index again.
+            if generation == self._generation:
+                self.index, self._version, self._roads_checked_at = index, version, checked_at
+        return index
+
+    def update_state(self, road_id: UUID, analysis: TrafficAnalysis) -> None:
+        """Apply a new analysis of a road, if the index is built."""
+        if self.index is not None:
+            self.index.set_state(road_id, analysis.current_speed, analysis.congestion_level, analysis.state.state)
+
+    async def refresh_states(
+        self,
+        index: GridIndex,
+        load_changes: Callable[[datetime | None], Awaitable[list[Row]]],
+    ) -> None:
+        """
+        Apply the snapshots changed since the last check, all of them the first time.
+
+        Args:
+            index: Index to update
+            load_changes: Loader of ``(road_id, current_speed, congestion_level, state, updated_at)``
+                rows updated after the given time, or of all rows for None
+        """
+        if self._clock() - index.states_checked_at < self.state_max_age:
+            return
+        async with self._state_lock:
+            if self._clock() - index.states_checked_at < self.state_max_age:
+                return
+            checked_at = self._clock()
+            since = index.states_until - STATE_REFRESH_OVERLAP if index.states_until else None
+            for road_id, speed, congestion_level, state, updated_at in await load_changes(since):
+                index.set_state(road_id, speed, congestion_level, state)
+                if index.states_until is None or updated_at > index.states_until:
+                    index.states_until = updated_at
+            index.states_checked_at = checked_at
+
+
+road_locator = RoadLocator(
+    settings.SPATIAL_CELL_KM, settings.SPATIAL_STATE_REFRESH_SECONDS, settings.SPATIAL_ROADS_CHECK_SECONDS
+)
@@ -0,0 +1,197 @@
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from itertools import pairwise
+from typing import Any, Protocol
+from uuid import UUID
+
+import numpy as np
+
+# Road codes are uint16, so a chunk holds at most this many sightings (and distinct roads).
+CHUNK_MAX_POINTS = 4096
+# Time deltas are uint32 milliseconds, a longer gap starts a new chunk (about 49 days).
+MAX_TIME_DELTA_MS = np.iinfo(np.uint32).max
+SPEED_SCALE = 10  # stored in 0.1 km/h
+UUID_BYTES = 16
+# Road IDs as raw 16 byte keys: a chunk's dictionary is read without building UUID objects,
+# and arrays of them sort, unique and search like any numpy array.
+ROAD_KEY = np.dtype("S16")
+# Postgres advisory lock key held by the worker compacting sightings into chunks, "traj" in ASCII.
+COMPACTION_LOCK_ID = 0x7472616A
+
+
+class EncodedChunk(Protocol):
+    """Packed columns of a CarTrajectoryChunk row."""
+
+    started_at: datetime
+    points: int
+    roads: bytes
+    road_codes: bytes
+    time_deltas: bytes
+    speeds: bytes
+
+
+def to_epoch_ms(moment: datetime) -> int:
+    """Milliseconds since the epoch, naive datetimes (e.g. from SQLite) are UTC."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=UTC)
+    return round(moment.timestamp() * 1000)
+
+
+def from_epoch_ms(epoch_ms: int) -> datetime:
+    return datetime.fromtimestamp(epoch_ms / 1000, tz=UTC)
+
+
+def to_road_keys(road_ids: Iterable[UUID]) -> np.ndarray:
+    """Road IDs as an array of raw 16 byte keys."""
+    return np.frombuffer(b"".join(road_id.bytes for road_id in road_ids), dtype=ROAD_KEY)
+
+
+def from_road_keys(road_keys: np.ndarray) -> tuple[UUID, ...]:
+    # Through the whole buffer, a single S16 item drops its trailing zero bytes.
+    raw = road_keys.tobytes()
+    return tuple(UUID(bytes=raw[offset : offset + UUID_BYTES]) for offset in range(0, len(raw), UUID_BYTES))
+
+
+@dataclass(slots=True, frozen=True)
+class Trajectory:
+    """
+    Sightings of one car as columns, oldest first. Roads are dictionary encoded:
+    ``road`` holds an index into ``road_keys`` per sighting.
+    """
+
+    timestamp: np.ndarray  # epoch milliseconds, int64
+    road: np.ndarray  # int64 codes into road_keys
+    speed: np.ndarray  # km/h, float64
+    road_keys: np.ndarray  # ROAD_KEY
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @property
+    def road_ids(self) -> tuple[UUID, ...]:
+        """The road dictionary as UUIDs, built on every access."""
+        return from_road_keys(self.road_keys)
+
+    @classmethod
+    def empty(cls) -> "Trajectory":
+        return cls(
+            timestamp=np.empty(0, dtype=np.int64),
+            road=np.empty(0, dtype=np.int64),
+            speed=np.empty(0, dtype=np.float64),
+            road_keys=np.empty(0, dtype=ROAD_KEY),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]]) -> "Trajectory":
+        """Build the trajectory from ``(road_id, timestamp, speed)`` rows in any order."""
+        dictionary: dict[UUID, int] = {}
+        timestamps: list[int] = []
+        roads: list[int] = []
+        speeds: list[float] = []
+        for road_id, timestamp, speed in rows:
+            roads.append(dictionary.setdefault(road_id, len(dictionary)))
+            timestamps.append(to_epoch_ms(timestamp))
+            speeds.append(speed)
+        return cls(
+            timestamp=np.array(timestamps, dtype=np.int64),
+            road=np.array(roads, dtype=np.int64),
+            speed=np.array(speeds, dtype=np.float64),
+            road_keys=to_road_keys(dictionary),
+        ).sorted()
+
+    @classmethod
+    def concat(cls, parts: Iterable["Trajectory"]) -> "Trajectory":
+        """Merge trajectories of the same car into one, with a shared road dictionary."""
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+
+        road_keys, remap = np.unique(np.concatenate([part.road_keys for part in parts]), return_inverse=True)
+        offsets = np.cumsum([0] + [len(part.road_keys) for part in parts])
+        return cls(
+            timestamp=np.concatenate([part.timestamp for part in parts]),
+            road=np.concatenate([remap[offset + part.road] for offset, part in zip(offsets, parts, strict=False)]),
+            speed=np.concatenate([part.speed for part in parts]),
+            road_keys=road_keys,
+        ).sorted()
+
+    def sorted(self) -> "Trajectory":
+        """The trajectory in time order, itself when it already is."""
+        if len(self) < 2 or bool(np.all(self.timestamp[1:] >= self.timestamp[:-1])):
+            return self
+        order = np.argsort(self.timestamp, kind="stable")
+        return Trajectory(self.timestamp[order], self.road[order], self.speed[order], self.road_keys)
+
+    def between(self, since: datetime | None = None, until: datetime | None = None) -> "Trajectory":
+        """Sightings from ``since`` up to and including ``until``."""
+        start = 0 if since is None else int(np.searchsorted(self.timestamp, to_epoch_ms(since), side="left"))
+        stop = len(self) if until is None else int(np.searchsorted(self.timestamp, to_epoch_ms(until), side="right"))
+        return self[start:stop]
+
+    def __getitem__(self, index: slice) -> "Trajectory":
+        return Trajectory(self.timestamp[index], self.road[index], self.speed[index], self.road_keys)
+
+    def trip_bounds(self, gap_ms: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Split the trajectory into trips wherever the car was not seen for more than ``gap_ms``.
+
+        Returns:
+            Positions of the first and the last sighting of each trip
+        """
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        breaks = np.flatnonzero(np.diff(self.timestamp) > gap_ms)
+        starts = np.concatenate(([0], breaks + 1))
+        ends = np.concatenate((breaks, [len(self) - 1]))
+        return starts, ends
+
+    def trips(self, gap_ms: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Origin and destination road codes of each trip (see ``trip_bounds``), indices into ``road_keys``.
+        """
+        starts, ends = self.trip_bounds(gap_ms)
+        return self.road[starts], self.road[ends]
+
+    def chunks(self, size: int = CHUNK_MAX_POINTS) -> Iterator["Trajectory"]:
+        """Split the trajectory into pieces that fit one chunk row each."""
+        cuts = np.flatnonzero(np.diff(self.timestamp) > MAX_TIME_DELTA_MS) + 1
+        bounds = [0, *cuts.tolist(), len(self)]
+        for start, stop in pairwise(bounds):
+            for offset in range(start, stop, size):
+                yield self[offset : min(offset + size, stop)]
+
+
+def encode(trajectory: Trajectory) -> dict[str, Any]:
+    """
+    Pack a trajectory that fits one chunk into the CarTrajectoryChunk columns.
+    Only the roads it uses are kept in the chunk's dictionary.
+    """
+    if not 0 < len(trajectory) <= CHUNK_MAX_POINTS:
+        raise ValueError(f"A chunk holds 1 to {CHUNK_MAX_POINTS} sightings, got {len(trajectory)}")
+    used, codes = np.unique(trajectory.road, return_inverse=True)
+    deltas = np.diff(trajectory.timestamp, prepend=trajectory.timestamp[0])
+    if deltas.max() > MAX_TIME_DELTA_MS:
+        raise ValueError("Sightings of a chunk must be less than 49 days apart")
+    return {
+        "started_at": from_epoch_ms(int(trajectory.timestamp[0])),
+        "ended_at": from_epoch_ms(int(trajectory.timestamp[-1])),
+        "points": len(trajectory),
+        "roads": trajectory.road_keys[used].tobytes(),
+        "road_codes": codes.astype("<u2").tobytes(),
+        "time_deltas": deltas.astype("<u4").tobytes(),
+        "speeds": np.clip(np.rint(trajectory.speed * SPEED_SCALE), 0, np.iinfo(np.uint16).max).astype("<u2").tobytes(),
+    }
+
+
+def decode(chunk: EncodedChunk) -> Trajectory:
+    """Unpack the columns of a CarTrajectoryChunk row."""
+    deltas = np.frombuffer(chunk.time_deltas, dtype="<u4").astype(np.int64)
+    return Trajectory(
+        timestamp=to_epoch_ms(chunk.started_at) + np.cumsum(deltas),
+        road=np.frombuffer(chunk.road_codes, dtype="<u2").astype(np.int64),
+        speed=np.frombuffer(chunk.speeds, dtype="<u2") / SPEED_SCALE,
+        road_keys=np.frombuffer(chunk.roads, dtype=ROAD_KEY),
+    )
@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from typing import Literal
+from uuid import UUID
+
+import numpy as np
+
+type Trend = Literal["STABLE", "INCREASING", "DECREASING"]
+
+# Relative change across the window that starts a trend, and the one below which it ends.
+TREND_ENTER = 0.10
+TREND_EXIT = 0.05
+# Share of the variance the fitted line must explain before a trend is reported.
+MIN_CONFIDENCE = 0.6
+MIN_POINTS = 3
+
+DIRECTIONS: dict[Trend, int] = {"STABLE": 0, "INCREASING": 1, "DECREASING": -1}
+
+
+@dataclass(slots=True)
+class SlopeFit:
+    """Least-squares line through a series of timestamped values."""
+
+    slope: float = 0.0  # units per minute
+    mean: float = 0.0
+    r_squared: float = 0.0
+    points: int = 0
+    span_minutes: float = 0.0
+
+    @property
+    def relative_change(self) -> float:
+        """Change predicted by the line across the window, relative to the mean."""
+        if self.mean == 0:
+            return 0.0
+        return self.slope * self.span_minutes / abs(self.mean)
+
+
+class _Sums:
+    """Sums of a series, shifted by its first value for numerical stability."""
+
+    __slots__ = ("origin", "ty", "y", "yy")
+
+    def __init__(self, origin: float) -> None:
+        self.origin = origin
+        self.y = 0.0
+        self.yy = 0.0
+        self.ty = 0.0
+
+    @classmethod
+    def from_array(cls, minutes: np.ndarray, values: np.ndarray) -> "_Sums":
+        sums = cls(float(values[0]))
+        shifted = values - sums.origin
+        sums.y = float(shifted.sum())
+        sums.yy = float(shifted @ shifted)
+        sums.ty = float(minutes @ shifted)
+        return sums
+
+    def fit(self, n: int, t: float, tt: float, span: float) -> SlopeFit:
+        sxx = tt - t * t / n
+        sxy = self.ty - t * self.y / n
+        syy = self.yy - self.y * self.y / n
+        slope = sxy / sxx if sxx > 0 else 0.0
+        if syy <= 0:
+            # A flat series is perfectly explained by a flat line.
+            r_squared = 1.0
+        elif sxx > 0:
+            r_squared = min(sxy * sxy / (sxx * syy), 1.0)
+        else:
+            r_squared = 0.0
+        return SlopeFit(
+            slope=slope,
+            mean=self.origin + self.y / n,
+            r_squared=r_squared,
+            points=n,
+            span_minutes=span,
+        )
+
+
+def fit_slope_arrays(minutes: np.ndarray, first: np.ndarray, second: np.ndarray) -> tuple[SlopeFit, SlopeFit]:
+    """
+    Fit least-squares lines to two series stored as column arrays, with vectorized sums.
+
+    Args:
+        minutes: Time of each point in minutes, any origin and order
+        first: Values of the first series
+        second: Values of the second series
+
+    Returns:
+        Fits of the first and the second series
+    """
+    n = len(minutes)
+    if n == 0:
+        return SlopeFit(), SlopeFit()
+
+    minutes = np.asarray(minutes, dtype=np.float64) - minutes[0]
+    t, tt = float(minutes.sum()), float(minutes @ minutes)
+    span = float(np.ptp(minutes))
+    return (
+        _Sums.from_array(minutes, np.asarray(first, dtype=np.float64)).fit(n, t, tt, span),
+        _Sums.from_array(minutes, np.asarray(second, dtype=np.float64)).fit(n, t, tt, span),
+    )
+
+
+class TrendTracker:
+    """
+    Trend per road with hysteresis.
+
+    A trend starts when the fitted change across the window reaches ``enter`` with
+    enough confidence, and is kept until the change falls below ``exit``, so a
+    single noisy measurement does not flip it.
+    """
+
+    def __init__(self, enter: float = TREND_ENTER, exit: float = TREND_EXIT, min_confidence: float = MIN_CONFIDENCE):
+        self.enter = enter
+        self.exit = exit
+        self.min_confidence = min_confidence
+        self._trends: dict[UUID, Trend] = {}
+
+    def classify(self, road_id: UUID, fit: SlopeFit) -> Trend:
+        """Classify the latest fit for a road against its previous trend, without recording it."""
+        previous = self._trends.get(road_id, "STABLE")
+        if fit.points < MIN_POINTS:
+            return previous
+
+        change = fit.relative_change
+        if fit.r_squared >= self.min_confidence and abs(change) >= self.enter:
+            return "INCREASING" if change > 0 else "DECREASING"
+        if change * DIRECTIONS[previous] >= self.exit:
+            return previous
+        return "STABLE"
+
+    def update(self, road_id: UUID, fit: SlopeFit) -> Trend:
+        """Classify the latest fit for a road and record it as the road's trend."""
+        if fit.points < MIN_POINTS:
+            return self._trends.get(road_id, "STABLE")
+        trend = self.classify(road_id, fit)
+        self._trends[road_id] = trend
+        return trend
+
+
+trend_tracker = TrendTracker()
@@ -4,7 +4,7 @@ from typing import Any, TypeVar
 
 from loguru import logger
 
-from src.analytics.handlers import traffic_state_manager
+from src.analytics.handlers import traffic_state_feed, traffic_state_manager
 from src.commons.schemas import TrafficAnalysis
 
 RT = TypeVar("RT", bound=TrafficAnalysis)
@@ -14,6 +14,7 @@ def monitor_traffic_congestion(func: Callable[..., Coroutine[Any, Any, RT]]) ->
     """
     Decorator that monitors traffic congestion and calls the decorated function
     with the current state (True for HIGH congestion, False for LOW).
+    State changes are published on the change feed to reach every worker.
     """
 
     @wraps(func)
@@ -22,7 +23,8 @@ def monitor_traffic_congestion(func: Callable[..., Coroutine[Any, Any, RT]]) ->
             result: RT = await func(*args, **kwargs)
 
             traffic_state_manager.response_data = result
-            traffic_state_manager.update_state(result.state)
+            if traffic_state_manager.update_state(result.state):
+                await traffic_state_feed.publish(traffic_state_manager.to_message())
 
             return result
 
@@ -33,3 +33,19 @@ class Topics(str, Enum):
     CAR = "car"
     ROAD = "road"
     ROAD_CONDITION = "road_condition"
+
+
+class OdLevel(str, Enum):
+    """Zones the origin-destination matrix is aggregated over."""
+
+    ROAD = "road"
+    STREET = "street"
+    CITY = "city"
+
+
+class JobStatus(str, Enum):
+    """Status of a batch job run."""
+
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
@@ -0,0 +1,30 @@
+from collections import defaultdict
+
+
+class LogSampler:
+    """
+    Deterministic 1-in-N sampler for hot path log lines.
+
+    Rates are fractions in ``[0, 1]`` and are looked up per key (route template
+    or Kafka topic), falling back to the default rate. A rate of ``0.25`` logs
+    every fourth call for that key.
+    """
+
+    def __init__(self, default_rate: float = 1.0, rates: dict[str, float] | None = None) -> None:
+        self._default_every = self._every(default_rate)
+        self._every_by_key = {key: self._every(rate) for key, rate in (rates or {}).items()}
+        self._seen: defaultdict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def _every(rate: float) -> int:
+        if rate <= 0:
+            return 0
+        return max(1, round(1 / min(rate, 1.0)))
+
+    def should_log(self, key: str) -> bool:
+        """Return True if this call for ``key`` should be logged."""
+        every = self._every_by_key.get(key, self._default_every)
+        if every <= 1:
+            return every == 1
+        self._seen[key] += 1
+        return self._seen[key] % every == 1
@@ -38,11 +38,11 @@ class Data:
 
 class Point:
     """
-    Mixin for latitude and longitude fields.
+    Mixin for latitude and longitude fields, in degrees. Rows without a location keep them empty.
     """
 
-    latitude: Mapped[float] = mapped_column()
-    longitude: Mapped[float] = mapped_column()
+    latitude: Mapped[float | None] = mapped_column(nullable=True)
+    longitude: Mapped[float | None] = mapped_column(nullable=True)
 
 
 class General(Base, PrimaryKeyUUID, TimestampMixin):
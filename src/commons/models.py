@@ -1,11 +1,30 @@
 from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, Integer, String, Table
+from sqlalchemy import (
+    DDL,
+    JSON,
+    BigInteger,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Table,
+    event,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.commons.enums import Jam, Weather
-from src.commons.model_base import Base, Data, General
+from src.commons.model_base import Base, Data, General, Point
+
+# The trigram indexes need pg_trgm, created with the tables like the migration does.
+event.listen(
+    Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
 
 association_table = Table(
     "association_table",
@@ -15,9 +34,9 @@ association_table = Table(
 )
 
 
-class Road(General, Data):
+class Road(General, Data, Point):
     """
-    Road model.
+    Road model, located by a reference point on the road (e.g. its midpoint).
     """
 
     start: Mapped[str] = mapped_column(String(255))
@@ -30,6 +49,8 @@ class Road(General, Data):
     __table_args__ = (
         Index("idx_road_city", "city"),
         Index("idx_road_name", "name", unique=True),
+        # Road name search (ILIKE '%term%'), needs the pg_trgm extension.
+        Index("idx_road_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
     )
 
 
@@ -46,17 +67,19 @@ class RoadCondition(General, Data):
 
     __table_args__ = (
         Index("idx_road_condition_road_id", "road_id"),
+        # The primary key makes the order unique for keyset paging of the admin list.
         Index(
             "idx_road_condition_created_at",
             "created_at",
+            "id",
             postgresql_using="btree",
-            postgresql_ops={"created_at": "DESC"},
+            postgresql_ops={"created_at": "DESC", "id": "DESC"},
         ),
     )
 
 
-class Car(General):
-    """Car model with aggregated data from sensors."""
+class Car(General, Point):
+    """Car model with aggregated data from sensors, located where it was last seen."""
 
     plate_number: Mapped[str] = mapped_column(String(255), unique=True)
     model: Mapped[str] = mapped_column(String(255))
@@ -66,13 +89,29 @@ class Car(General):
     road: Mapped["Road"] = relationship(back_populates="cars")
 
     __table_args__ = (
+        # The primary key makes the order unique for keyset paging of the admin list.
         Index(
             "idx_car_created_at",
             "created_at",
+            "id",
             postgresql_using="btree",
-            postgresql_ops={"created_at": "DESC"},
+            postgresql_ops={"created_at": "DESC", "id": "DESC"},
         ),
         Index("idx_car_plate_number", "plate_number", unique=True),
+        # Plate number prefix search (LIKE 'AB%') whatever the database collation.
+        Index(
+            "idx_car_plate_number_pattern",
+            "plate_number",
+            postgresql_using="btree",
+            postgresql_ops={"plate_number": "varchar_pattern_ops"},
+        ),
+        # Partial plate number search (ILIKE '%term%'), needs the pg_trgm extension.
+        Index(
+            "idx_car_plate_number_trgm",
+            "plate_number",
+            postgresql_using="gin",
+            postgresql_ops={"plate_number": "gin_trgm_ops"},
+        ),
     )
 
 
@@ -85,7 +124,11 @@ class TrafficMeasurement(General):
     flow_rate: Mapped[int] = mapped_column()  # vehicles per hour
     density: Mapped[float] = mapped_column()  # vehicles per kilometer
 
-    __table_args__ = (Index("idx_traffic_road_id_timestamp", "road_id", "timestamp"),)
+    __table_args__ = (
+        Index("idx_traffic_road_id_timestamp", "road_id", "timestamp"),
+        # Measurements in insertion order for the API processes, see TrafficMeasurementCrud.get_measurements_after.
+        Index("idx_traffic_timestamp_id", "timestamp", "id"),
+    )
 
 
 class RoadCapacity(General, Data):
@@ -97,3 +140,110 @@ class RoadCapacity(General, Data):
     max_capacity: Mapped[int] = mapped_column(Integer())  # vehicles per hour
 
     __table_args__ = (Index("idx_road_capacity_road_id", "road_id"),)
+
+
+class RoadTrafficSnapshot(Base):
+    """Latest traffic analysis of a road, upserted by the ingestion path."""
+
+    __tablename__ = "road_traffic_snapshot"
+
+    road_id: Mapped[UUID] = mapped_column(ForeignKey("road.id"), primary_key=True)
+    current_speed: Mapped[float] = mapped_column()
+    flow_rate: Mapped[int] = mapped_column()
+    density: Mapped[float] = mapped_column()
+    congestion_level: Mapped[float] = mapped_column()
+    state: Mapped[str] = mapped_column(String(16))
+    trend: Mapped[str] = mapped_column(String(16))
+    trend_confidence: Mapped[float] = mapped_column(default=0.0)
+    density_slope: Mapped[float] = mapped_column(default=0.0)
+    speed_slope: Mapped[float] = mapped_column(default=0.0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+
+# BIGINT keys autoincrement on Postgres, SQLite only does that for INTEGER primary keys.
+BigIntegerKey = BigInteger().with_variant(Integer(), "sqlite")
+
+
+class CarSighting(Base):
+    """
+    Append-only log of where and how fast a car was seen, one row per sensor event.
+    Old rows are compacted into CarTrajectoryChunk rows. The road is not a foreign key,
+    so the history of a deleted road is kept.
+    """
+
+    __tablename__ = "car_sighting"
+
+    id: Mapped[int] = mapped_column(BigIntegerKey, primary_key=True, autoincrement=True)
+    plate_number: Mapped[str] = mapped_column(String(255))
+    road_id: Mapped[UUID] = mapped_column()
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    speed: Mapped[float] = mapped_column()
+
+    __table_args__ = (Index("idx_car_sighting_plate_number_timestamp", "plate_number", "timestamp"),)
+
+
+class CarTrajectoryChunk(Base):
+    """
+    Compacted sightings of one car in a time range, stored as packed little-endian columns:
+    ``roads`` is the dictionary of distinct road IDs (16 bytes each), ``road_codes`` the
+    uint16 index into it per sighting, ``time_deltas`` the uint32 milliseconds since the
+    previous sighting (0 for the first, at ``started_at``) and ``speeds`` uint16 in 0.1 km/h.
+    """
+
+    __tablename__ = "car_trajectory_chunk"
+
+    id: Mapped[int] = mapped_column(BigIntegerKey, primary_key=True, autoincrement=True)
+    plate_number: Mapped[str] = mapped_column(String(255))
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    ended_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    points: Mapped[int] = mapped_column(Integer())
+    roads: Mapped[bytes] = mapped_column(LargeBinary())
+    road_codes: Mapped[bytes] = mapped_column(LargeBinary())
+    time_deltas: Mapped[bytes] = mapped_column(LargeBinary())
+    speeds: Mapped[bytes] = mapped_column(LargeBinary())
+
+    __table_args__ = (Index("idx_car_trajectory_chunk_plate_number_started_at", "plate_number", "started_at"),)
+
+
+class RoadSpeedSketch(Base):
+    """
+    Speed sketch of a road in one time bucket as counted by one ingestion process,
+    see src.analytics.sketches. Percentiles merge the sketches of every process.
+    """
+
+    __tablename__ = "road_speed_sketch"
+
+    road_id: Mapped[UUID] = mapped_column(primary_key=True)
+    bucket: Mapped[int] = mapped_column(Integer(), primary_key=True)
+    worker_id: Mapped[UUID] = mapped_column(primary_key=True)
+    sketch: Mapped[dict] = mapped_column(JSON())
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+    __table_args__ = (Index("idx_road_speed_sketch_bucket", "bucket"),)
+
+
+class OdJob(General):
+    """Run of the origin-destination matrix job over a time range, see src.analytics.od_matrix."""
+
+    level: Mapped[str] = mapped_column(String(16))  # OdLevel
+    since: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    until: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    status: Mapped[str] = mapped_column(String(16))  # JobStatus
+    trips: Mapped[int] = mapped_column(BigInteger(), default=0)
+    pairs: Mapped[int] = mapped_column(Integer(), default=0)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (Index("idx_odjob_created_at", "created_at"),)
+
+
+class OdCount(Base):
+    """Trips from an origin zone to a destination zone counted by an OdJob."""
+
+    __tablename__ = "od_count"
+
+    job_id: Mapped[UUID] = mapped_column(ForeignKey("odjob.id", ondelete="CASCADE"), primary_key=True)
+    origin: Mapped[str] = mapped_column(String(255), primary_key=True)
+    destination: Mapped[str] = mapped_column(String(255), primary_key=True)
+    trips: Mapped[int] = mapped_column(Integer())
+
+    __table_args__ = (Index("idx_od_count_job_id_trips", "job_id", "trips"),)
@@ -1,6 +1,7 @@
 from types import TracebackType
 from typing import NoReturn
 
+import numpy as np
 from fastapi import HTTPException, status
 from sqlalchemy.exc import NoResultFound, SQLAlchemyError
 
@@ -59,3 +60,24 @@ def calculate_congestion_level(average_speed: float) -> str:
         return "MEDIUM"
     else:
         return "LOW"
+
+
+def haversine(
+    latitude1: float | np.ndarray,
+    longitude1: float | np.ndarray,
+    latitude2: float | np.ndarray,
+    longitude2: float | np.ndarray,
+) -> np.ndarray:
+    """Great-circle distance in km between points in degrees, element-wise over arrays."""
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(value, dtype=np.float64)) for value in (latitude1, longitude1, latitude2, longitude2)
+    )
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def grow_rows(array: np.ndarray) -> np.ndarray:
+    """Return a copy of ``array`` with twice the rows, the new rows zeroed."""
+    grown = np.zeros((len(array) * 2, *array.shape[1:]), dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
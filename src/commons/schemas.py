@@ -1,10 +1,10 @@
 from datetime import datetime
-from typing import TypeVar
+from typing import Literal, TypeVar
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, Field, PositiveInt
+from pydantic import BaseModel, ConfigDict, Field, PositiveInt, model_validator
 
-from src.commons.enums import Jam, Sort, Weather
+from src.commons.enums import Jam, JobStatus, OdLevel, Sort, Weather
 from src.commons.state import State
 
 T = TypeVar("T", bound=BaseModel)
@@ -32,9 +32,19 @@ class CarCreate(BaseModel):
     """Raw car data from traffic sensors."""
 
     plate_number: str = Field(..., description="Car plate number")
-    road_id: UUID
+    road_id: UUID | None = Field(None, description="Road of the sensor, matched from the coordinates when missing")
     model: str = Field(..., description="Car model")
     average_speed: float = Field(..., ge=0, description="Current speed from sensor")
+    latitude: float | None = Field(None, ge=-90, le=90, description="Sensor latitude (degrees)")
+    longitude: float | None = Field(None, ge=-180, le=180, description="Sensor longitude (degrees)")
+
+    @model_validator(mode="after")
+    def check_location(self) -> "CarCreate":
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError("latitude and longitude must be given together")
+        if self.road_id is None and self.latitude is None:
+            raise ValueError("Either road_id or latitude and longitude are required")
+        return self
 
 
 class GetCar(BaseModel):
@@ -82,6 +92,8 @@ class RoadBase(FromAttr):
     name: str = Field(..., min_length=1, max_length=100)
     street: str = Field(..., min_length=1, max_length=255)
     description: str = Field(..., min_length=1, max_length=400)
+    latitude: float | None = Field(None, ge=-90, le=90, description="Latitude of the road midpoint (degrees)")
+    longitude: float | None = Field(None, ge=-180, le=180, description="Longitude of the road midpoint (degrees)")
 
 
 class RoadCreate(RoadBase): ...
@@ -94,6 +106,16 @@ class GetRoad(BaseModel):
     length: float | None = None
 
 
+class RoadInfo(FromAttr):
+    """Road metadata kept in the cache."""
+
+    id: UUID
+    name: str
+    city: str
+    street: str
+    length: float
+
+
 class TrafficState(BaseModel):
     """Traffic state response model."""
 
@@ -133,6 +155,155 @@ class TrafficAnalysis(BaseModel):
     congestion_level: float = Field(..., description="Current congestion level (0-1)")
     state: State = Field(State("UNSTAGED"), description="Traffic status (UNSTAGED/LOW/MEDIUM/HIGH)")
     trend: str = Field(..., description="Speed trend (STABLE/INCREASING/DECREASING)")
+    trend_confidence: float = Field(0.0, description="Share of density variance explained by the trend line (0-1)")
+    density_slope: float = Field(0.0, description="Density change per minute over the window")
+    speed_slope: float = Field(0.0, description="Speed change per minute over the window (km/h)")
+    updated_at: datetime | None = Field(None, description="When the analysis was computed, to judge staleness")
+
+
+class ForecastPoint(BaseModel):
+    """Predicted traffic at a single horizon."""
+
+    horizon_minutes: int
+    timestamp: datetime
+    speed: float = Field(..., description="Predicted average speed (km/h)")
+    density: float = Field(..., description="Predicted density (vehicles/km)")
+
+
+class TrafficForecast(BaseModel):
+    """Short-term traffic forecast for a road segment."""
+
+    road_id: UUID
+    generated_at: datetime
+    last_measurement_at: datetime
+    observations: int = Field(..., description="Measurements folded into the model")
+    points: list[ForecastPoint]
+
+
+class LiveAggregate(BaseModel):
+    """Running totals of a road's measurements, published by the ingestion processes in shared memory."""
+
+    road_id: UUID
+    count: int = Field(..., description="Measurements since the ingestion processes started")
+    average_speed: float
+    average_density: float
+    speed: float = Field(..., description="Average speed of the latest measurement")
+    density: float = Field(..., description="Density of the latest measurement")
+    updated_at: datetime
+
+
+class TrafficAnomaly(BaseModel):
+    """Sudden deviation of a road's speed or density from its baseline."""
+
+    road_id: UUID
+    kind: Literal["SPEED_DROP", "DENSITY_SPIKE"]
+    value: float = Field(..., description="Measured value")
+    baseline: float = Field(..., description="Expected value before the measurement")
+    z_score: float
+    detected_at: datetime
+
+
+class RoadDistance(BaseModel):
+    """Road found near a location."""
+
+    road_id: UUID
+    distance_km: float = Field(..., description="Great-circle distance to the road's reference point")
+
+
+class CarMatch(FromAttr):
+    """Car found by part of its plate number."""
+
+    id: UUID
+    plate_number: str
+    model: str
+    road_id: UUID = Field(..., description="Road the car was last seen on")
+    average_speed: float
+
+
+class BboxRoads(BaseModel):
+    """Roads of a map viewport as parallel columns, one entry per road."""
+
+    road_id: list[UUID]
+    latitude: list[float]
+    longitude: list[float]
+    speed: list[float | None] = Field(..., description="Latest average speed (km/h), null when unknown")
+    congestion_level: list[float | None]
+    state: list[str | None]
+
+
+class BboxClusters(BaseModel):
+    """Roads of a map viewport merged into clusters, as parallel columns."""
+
+    latitude: list[float] = Field(..., description="Centroid latitude of the cluster's roads")
+    longitude: list[float] = Field(..., description="Centroid longitude of the cluster's roads")
+    count: list[int] = Field(..., description="Roads in the cluster")
+    congestion_level: list[float | None] = Field(..., description="Mean congestion level of the roads with a state")
+    max_congestion_level: list[float | None]
+
+
+class BboxCongestion(BaseModel):
+    """Congestion in a map viewport, per road when zoomed in and per cluster when zoomed out."""
+
+    zoom: int
+    total: int = Field(..., description="Roads in the bounding box")
+    roads: BboxRoads | None = None
+    clusters: BboxClusters | None = None
+
+
+class Route(BaseModel):
+    """Fastest route between two road network nodes at current speeds."""
+
+    origin: str
+    destination: str
+    road_ids: list[UUID] = Field(..., description="Roads to drive, in order")
+    length: float = Field(..., description="Route length (km)")
+    travel_time_seconds: float = Field(..., description="ETA at the latest analyzed speeds")
+    cached: bool = Field(..., description="Whether the path was served from the route cache")
+
+
+class CarTrajectory(BaseModel):
+    """Sightings of a car in a time range as parallel columns, oldest first."""
+
+    plate_number: str
+    timestamp: list[datetime]
+    road_id: list[UUID]
+    speed: list[float] = Field(..., description="Sensor speed (km/h), rounded to 0.1 km/h once compacted")
+
+
+class OdJobInfo(FromAttr):
+    """Run of the origin-destination matrix job."""
+
+    id: UUID
+    level: OdLevel
+    since: datetime
+    until: datetime
+    status: JobStatus
+    trips: int = Field(..., description="Trips counted")
+    pairs: int = Field(..., description="Origin-destination pairs with at least one trip")
+    created_at: datetime
+    finished_at: datetime | None
+
+
+class OdMatrix(BaseModel):
+    """Origin-destination trip counts of a job as parallel columns, most trips first."""
+
+    job: OdJobInfo
+    origin: list[str]
+    destination: list[str]
+    trips: list[int]
+
+
+class SpeedPercentiles(BaseModel):
+    """Speed distribution of a road segment over a time window."""
+
+    road_id: UUID
+    window_minutes: int
+    count: int = Field(..., description="Speed observations in the window")
+    p15: float | None = Field(None, description="15th percentile speed (km/h)")
+    p50: float | None = Field(None, description="Median speed (km/h)")
+    p85: float | None = Field(None, description="85th percentile speed (km/h)")
+    speed_limit: int = Field(..., description="Speed limit of the road (km/h)")
+    p85_over_limit: bool = Field(..., description="Whether the 85th percentile exceeds the speed limit")
 
 
 class GetTrafficMeasurement(BaseModel):
@@ -151,3 +322,13 @@ class GetRoadCapacity(BaseModel):
     lanes: int | None = None
     speed_limit: int | None = None
     max_capacity: int | None = None
+
+
+class ProfileInfo(BaseModel):
+    """Stored profile available for download."""
+
+    name: str
+    kind: str = Field(..., description="Profiled entry point (http/kafka)")
+    label: str
+    created_at: datetime
+    size: int = Field(..., description="File size in bytes")
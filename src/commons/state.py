@@ -48,13 +48,17 @@ class State:
 
     @classmethod
     def __get_pydantic_core_schema__(cls, _source_type: typing.Any, _handler: typing.Any) -> CoreSchema:
-        """Get Pydantic core schema."""
+        """Get Pydantic core schema, strings are validated into ``State`` instances."""
+        from_str = core_schema.no_info_after_validator_function(
+            cls,
+            core_schema.literal_schema(list(typing.get_args(VARIANT_STATE))),
+        )
         return core_schema.json_or_python_schema(
-            json_schema=core_schema.str_schema(),
+            json_schema=from_str,
             python_schema=core_schema.union_schema(
                 [
                     core_schema.is_instance_schema(cls),
-                    core_schema.str_schema(),
+                    from_str,
                 ]
             ),
             serialization=core_schema.plain_serializer_function_ser_schema(
@@ -1,9 +1,11 @@
+import sys
+from typing import Literal
+
 from loguru import logger
 from pydantic_settings import BaseSettings
 
 from src.commons.enums import Topics
-
-logger.add("logs/{time:YYYY-MM-DD}.log", format="{time} {level} {message}", rotation="1 week")
+from src.commons.log_sampling import LogSampler
 
 
 class Settings(BaseSettings):
@@ -19,23 +21,134 @@ class Settings(BaseSettings):
     PG_NAME: str = "dip_analytics"
     PG_USER: str = "postgres"
     PG_PASS: str = "avdeev97"  # noqa: S105
+    DATABASE_URL: str | None = None
+    # Read replica for dashboard reads, and how long to use the primary after it fails.
+    PG_REPLICA_URL: str | None = None
+    PG_REPLICA_RETRY_SECONDS: float = 30
+    # Connections kept per engine, 0 opens one per unit of work (NullPool, e.g. behind PgBouncer).
+    DB_POOL_SIZE: int = 0
+    DB_MAX_OVERFLOW: int = 10
+    # Prepared statements cached per asyncpg connection, useful with a pool. 0 disables it.
+    DB_STATEMENT_CACHE_SIZE: int = 500
 
     KAFKA_BOOTSTRAP_SERVERS: str = "172.18.0.4:9092"
     KAFKA_CONSUME_TOPICS: list[str] = [Topics.ROAD_CONDITION.value, Topics.CAR.value]
     SEND_TOPICS: list[str] = [Topics.ROAD_CONDITION.value, Topics.CAR.value]
+    # Consumer group of the ingestion workers, the partitions of each topic are split between its members.
     GROUP_ID: str = "as"
+    # "all" consumes the Kafka topics in the API process too, "api" only serves HTTP and leaves
+    # the ingestion to separate workers (faststream run src.analytics.kafka_handler:app).
+    RUN_MODE: Literal["all", "api"] = "all"
 
     REDIS_HOST: str = "redis"
     REDIS_PORT: str = "6379"
 
+    # Serve the admin panel at /admin, its views are loaded on the first admin request.
+    ADMIN_ENABLED: bool = True
     ADMIN_SECRET_KEY: str = "admin"  # noqa: S105
+    # Admin lists of tables estimated at this many rows show the estimate instead of counting them.
+    ADMIN_ESTIMATED_COUNT_THRESHOLD: int = 100_000
+
+    LOG_LEVEL: str = "INFO"
+    # Fraction of hot path log lines (per request / per message) that are written,
+    # with overrides keyed by route template or Kafka topic.
+    LOG_SAMPLE_RATE: float = 1.0
+    LOG_SAMPLE_RATES: dict[str, float] = {}
+
+    # Opt-in profiling, a request is profiled when it carries the header or the
+    # query parameter, or when it falls into the sampled share.
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_QUERY_PARAM: str = "profile"
+    PROFILER: Literal["cprofile", "pyinstrument"] = "cprofile"
+    PROFILES_DIR: str = "profiles"
+    PROFILES_KEPT: int = 50
+
+    # Width of the time-of-day buckets of the forecasting seasonal profile.
+    FORECAST_SLOT_MINUTES: int = 15
+    # With RUN_MODE=api the forecasts follow the stored measurements: how often they are read,
+    # how long a measurement may take to commit, and how much history is read at startup.
+    FORECAST_FOLLOW_SECONDS: float = 5
+    FORECAST_FOLLOW_LAG_SECONDS: float = 5
+    FORECAST_BACKFILL_MINUTES: int = 60
+
+    # Deviation from the per-road baseline, in standard deviations, that counts as an incident.
+    ANOMALY_Z_THRESHOLD: float = 3.5
+    # Record detected incidents as a HIGH jam RoadCondition.
+    ANOMALY_AUTO_ROAD_CONDITION: bool = False
+
+    # Per-road speed sketches: width of a time bucket and how long buckets are kept.
+    SPEED_SKETCH_BUCKET_MINUTES: int = 5
+    SPEED_SKETCH_RETENTION_MINUTES: int = 24 * 60
+    # How often an ingestion process writes its changed sketch buckets for the other processes, 0 disables it.
+    SPEED_SKETCH_FLUSH_SECONDS: float = 10
+
+    # Shared L2 cache behind the process-local one: "redis", "memory" or "none" (L1 only).
+    CACHE_BACKEND: Literal["redis", "memory", "none"] = "none"
+    CACHE_LOCAL_MAXSIZE: int = 10_000
+    # Latest analyses: how long L2 keeps them and how long a worker serves its L1 copy.
+    CACHE_ANALYSIS_TTL_SECONDS: float = 60
+    CACHE_ANALYSIS_LOCAL_TTL_SECONDS: float = 1
+    CACHE_ROAD_TTL_SECONDS: float = 60 * 60
+    # How long worker startup waits for the road caches to load before serving, 0 skips the warm-up.
+    CACHE_WARM_TIMEOUT_SECONDS: float = 10
+
+    # Road network routing: speed of roads without capacity data, relative travel time
+    # change that drops cached routes, cached routes per process and rebuild interval.
+    ROUTING_DEFAULT_SPEED_KMH: float = 50
+    ROUTING_INVALIDATION_THRESHOLD: float = 0.2
+    ROUTING_CACHE_SIZE: int = 10_000
+    ROUTING_GRAPH_MAX_AGE_SECONDS: float = 5 * 60
+
+    # Cell size of the road spatial index, and how far a sensor may be from the road it is matched to.
+    SPATIAL_CELL_KM: float = 1.0
+    SENSOR_MATCH_RADIUS_KM: float = 0.5
+    # How often road states for map viewports are refreshed from the snapshots.
+    SPATIAL_STATE_REFRESH_SECONDS: float = 2
+    # How often the spatial index checks for roads changed by other processes.
+    SPATIAL_ROADS_CHECK_SECONDS: float = 10
+    # Viewports are returned per road from this zoom level on and up to this many roads, clustered otherwise.
+    BBOX_DETAIL_ZOOM: int = 14
+    BBOX_MAX_ROADS: int = 20_000
+
+    # Car trajectories: sightings older than this are compacted into chunks, every interval
+    # (0 disables it) and in batches of this many sightings per transaction.
+    TRAJECTORY_COMPACT_AFTER_MINUTES: int = 60
+    TRAJECTORY_COMPACT_INTERVAL_SECONDS: float = 5 * 60
+    TRAJECTORY_COMPACT_BATCH_SIZE: int = 10_000
+
+    # Origin-destination job: worker processes, time slice per task, gap that ends a trip,
+    # how long trips are followed past the end of their slice and rows per streamed batch.
+    OD_WORKERS: int = 4
+    OD_SLICE_HOURS: float = 6
+    OD_TRIP_GAP_MINUTES: float = 30
+    OD_MAX_TRIP_HOURS: float = 6
+    OD_STREAM_BATCH_SIZE: int = 5_000
+
+    # Per-road running totals that ingestion processes publish in shared memory for GET /traffic/live:
+    # segment name prefix, writer processes per host and road slots per writer.
+    SHARED_AGGREGATES_ENABLED: bool = False
+    SHARED_AGGREGATES_NAME: str = "dip-analytics"
+    SHARED_AGGREGATES_WRITERS: int = 8
+    SHARED_AGGREGATES_ROADS: int = 65_536
+
+    # Postgres LISTEN/NOTIFY channels carrying traffic state changes and anomalies between workers.
+    CHANGE_FEED_CHANNEL: str = "traffic_state"
+    ANOMALY_FEED_CHANNEL: str = "traffic_anomaly"
 
     ECHO: bool = False
+    SLOW_QUERY_MS: int = 200
     DEBUG: bool = True
 
     @property
     def db_url_postgresql(self) -> str:
-        """Generate PostgreSQL connection URL."""
+        """Generate PostgreSQL connection URL.
+
+        ``DATABASE_URL`` takes precedence over the ``PG_*`` fields when set.
+        """
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return f"postgresql+asyncpg://{self.PG_USER}:{self.PG_PASS}@{self.PG_HOST}:{self.PG_PORT}/{self.PG_NAME}"
 
     @property
@@ -45,3 +158,24 @@ class Settings(BaseSettings):
 
 
 settings = Settings()  # pyright: ignore[reportCallIssue]
+
+
+def setup_logging() -> None:
+    """
+    Replace the default loguru sink with the application ones. Called when an entry point
+    starts rather than on import, so importing the package opens no files and starts no threads.
+    """
+    # Sinks are fed through a queue and written by a background thread,
+    # so log I/O never blocks the event loop.
+    logger.remove()
+    logger.add(sys.stderr, level=settings.LOG_LEVEL, enqueue=True)
+    logger.add(
+        "logs/{time:YYYY-MM-DD}.log",
+        format="{time} {level} {message}",
+        level=settings.LOG_LEVEL,
+        rotation="1 week",
+        enqueue=True,
+    )
+
+
+log_sampler = LogSampler(settings.LOG_SAMPLE_RATE, settings.LOG_SAMPLE_RATES)
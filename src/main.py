@@ -1,32 +1,84 @@
+import asyncio
+import contextlib
 import time
 from contextlib import asynccontextmanager
 from typing import Any
 
 from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.requests import Request
+from fastapi.responses import PlainTextResponse
 from loguru import logger
 
-from src.admin import setup_admin
-from src.analytics.kafka_handler import broker
+from src.admin import mount_admin
+from src.analytics.handlers import anomaly_feed, traffic_state_feed
 from src.analytics.routers import router as traffic_router
-from src.config import settings
+from src.analytics.services import (
+    start_measurement_follow,
+    start_speed_sketch_flush,
+    start_trajectory_compaction,
+    warm_caches,
+)
+from src.analytics.shared_aggregates import shared_aggregates
+from src.config import log_sampler, settings, setup_logging
+from src.services.cache import cache_backend
+from src.services.db import dispose_engines
+from src.services.metrics import http_request_seconds, registry
+from src.services.profiling import profiling_middleware
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Lifespan for the FastAPI application.
-    1. Connects to the Kafka broker.
-    2. Closes the Kafka broker when the application is stopped.
+    1. Sets up logging and starts warming up the road caches.
+    2. Starts listening for traffic state changes and anomalies of other workers.
+    3. With ``RUN_MODE=all``, consumes the Kafka topics, publishes the shared aggregates and the
+       speed sketches and compacts old car sightings into trajectory chunks, which the ingestion
+       workers do otherwise. With ``RUN_MODE=api``, follows the stored measurements for the forecasts.
+    4. Waits for the warm-up, at most ``CACHE_WARM_TIMEOUT_SECONDS``, then serves.
+    5. Stops the tasks, releases the shared memory and closes the cache backend and the database engines
+       when the application is stopped.
     """
-    await broker.connect()
-    # Setup admin panel
-    setup_admin(app)
+    setup_logging()
+    warm_up = None
+    if settings.CACHE_WARM_TIMEOUT_SECONDS > 0:
+        warm_up = asyncio.create_task(warm_caches(), name="cache-warm-up")
+    await traffic_state_feed.start(settings.db_url_postgresql)
+    await anomaly_feed.start(settings.db_url_postgresql)
+    broker = None
+    if settings.RUN_MODE == "all":
+        # Imported here, the Kafka client is not needed to import the application.
+        from src.analytics.kafka_handler import broker
+
+        publishing = shared_aggregates.start_publishing() if settings.SHARED_AGGREGATES_ENABLED else None
+        await broker.start()
+        tasks = [publishing, start_speed_sketch_flush(), start_trajectory_compaction()]
+    else:
+        tasks = [start_measurement_follow()]
+    if warm_up is not None:
+        # A slow warm-up goes on in the background, requests load what is missing on first use.
+        _, pending = await asyncio.wait({warm_up}, timeout=settings.CACHE_WARM_TIMEOUT_SECONDS)
+        if pending:
+            logger.warning(f"Cache warm-up still running after {settings.CACHE_WARM_TIMEOUT_SECONDS} s, serving")
 
     yield
 
-    await broker.close()
+    for task in (warm_up, *tasks):
+        if task is not None and not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    if broker is not None:
+        await broker.close()
+    shared_aggregates.close()
+    await anomaly_feed.stop()
+    await traffic_state_feed.stop()
+    if cache_backend is not None:
+        await cache_backend.close()
+    await dispose_engines()
+    await logger.complete()
 
 
 app = FastAPI(
@@ -43,7 +95,20 @@ app.state.settings = settings
 # Setup API routes
 v1_router = APIRouter(prefix="/api/v1")
 v1_router.include_router(traffic_router)
+if settings.PROFILING_ENABLED:
+    from src.admin.profiles import router as profiles_router
+
+    v1_router.include_router(profiles_router)
 app.include_router(v1_router)
+if settings.ADMIN_ENABLED:
+    mount_admin(app)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Expose process metrics in the Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 
 # Setup CORS
 app.add_middleware(
@@ -53,18 +118,37 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Large responses such as map viewports are compressed for clients that accept it.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next: Any):
     """
     Middleware for logging request information.
-    Logs the start time of the request and the time it took to process.
+    Records the latency per route, returns it in the ``X-Process-Time`` header
+    and logs a sampled summary line once the request is processed.
     """
-    logger.info(f"Start processing request {request.url}")
-    logger.info(f"Client ip_address:{request.headers.get('x-forwarded-for', None)}")
-    start_time = time.time()
+    start_time = time.perf_counter()
     response = await call_next(request)
-    process_time = time.time() - start_time
-    logger.info(f"Request processed time was {process_time}")
+    process_time = time.perf_counter() - start_time
+    # Route templates keep the label set bounded, unmatched paths share one child.
+    route = request.scope.get("route")
+    route_path = route.path if route else "unmatched"
+    http_request_seconds.labels(request.method, route_path).observe(process_time)
+    response.headers["X-Process-Time"] = str(process_time)
+    if log_sampler.should_log(route_path):
+        logger.info(
+            "{} {} {} processed in {:.2f} ms, client ip_address: {}",
+            request.method,
+            request.url.path,
+            response.status_code,
+            process_time * 1000,
+            request.headers.get("x-forwarded-for"),
+        )
     return response
+
+
+# Registered last so it wraps the whole stack, only when profiling is on.
+if settings.PROFILING_ENABLED:
+    app.middleware("http")(profiling_middleware)
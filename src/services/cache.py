@@ -0,0 +1,238 @@
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Protocol
+
+from loguru import logger
+from pydantic import BaseModel
+
+from src.config import settings
+from src.services.metrics import cache_requests_total
+
+try:
+    from redis import asyncio as redis_asyncio
+    from redis.exceptions import RedisError
+except ImportError:  # pragma: no cover - optional dependency
+    redis_asyncio = None
+    RedisError = OSError
+
+type Clock = Callable[[], float]
+
+
+class CacheBackend(Protocol):
+    """Shared (L2) cache storage of serialized values."""
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]: ...
+
+    async def set_many(self, items: dict[str, bytes], ttl: float) -> None: ...
+
+    async def delete_many(self, keys: list[str]) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class MemoryBackend:
+    """In-memory stand-in for Redis, used in tests and single process setups."""
+
+    def __init__(self, clock: Clock = time.monotonic) -> None:
+        self._clock = clock
+        self._items: dict[str, tuple[float, bytes]] = {}
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        now = self._clock()
+        values: list[bytes | None] = []
+        for key in keys:
+            item = self._items.get(key)
+            if item is not None and item[0] <= now:
+                del self._items[key]
+                item = None
+            values.append(item[1] if item else None)
+        return values
+
+    async def set_many(self, items: dict[str, bytes], ttl: float) -> None:
+        expires_at = self._clock() + ttl
+        for key, value in items.items():
+            self._items[key] = (expires_at, value)
+
+    async def delete_many(self, keys: list[str]) -> None:
+        for key in keys:
+            self._items.pop(key, None)
+
+    async def close(self) -> None:
+        self._items.clear()
+
+
+class RedisBackend:
+    """
+    Redis storage, a multi-get is a single ``MGET`` and writes are pipelined.
+
+    Redis errors are logged and reported as misses, so an unavailable Redis only
+    costs the database lookups it would have saved.
+    """
+
+    def __init__(self, url: str) -> None:
+        if redis_asyncio is None:
+            raise ImportError("The redis cache backend requires the 'redis' package")
+        self._client = redis_asyncio.from_url(url)
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        try:
+            return await self._client.mget(keys)
+        except (RedisError, OSError) as exc:
+            logger.warning(f"Redis cache read failed: {exc!s}")
+            return [None] * len(keys)
+
+    async def set_many(self, items: dict[str, bytes], ttl: float) -> None:
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(key, value, px=int(ttl * 1000))
+                await pipe.execute()
+        except (RedisError, OSError) as exc:
+            logger.warning(f"Redis cache write failed: {exc!s}")
+
+    async def delete_many(self, keys: list[str]) -> None:
+        try:
+            await self._client.delete(*keys)
+        except (RedisError, OSError) as exc:
+            logger.warning(f"Redis cache delete failed: {exc!s}")
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class LocalCache[T]:
+    """Process-local (L1) LRU cache with a time to live."""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Clock = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._items: OrderedDict[str, tuple[float, T]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> T | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        if item[0] <= self._clock():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return item[1]
+
+    def set(self, key: str, value: T) -> None:
+        self._items[key] = (self._clock() + self.ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._items.pop(key, None)
+
+
+class Cache[T: BaseModel]:
+    """
+    Two level cache of pydantic models.
+
+    Lookups go to the process-local L1 first and then to the shared L2 backend,
+    L2 hits are copied into L1. The L1 ``local_ttl`` is kept short, it bounds how
+    long a worker may serve a value another worker already replaced in L2.
+    Cached models are shared between callers and must not be mutated.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model: type[T],
+        backend: CacheBackend | None,
+        ttl: float,
+        local_ttl: float,
+        local_maxsize: int = 10_000,
+        clock: Clock = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.model = model
+        self.backend = backend
+        self.ttl = ttl
+        self.local = LocalCache[T](local_maxsize, local_ttl, clock)
+        self._hits = {layer: cache_requests_total.labels(name, layer, "hit") for layer in ("l1", "l2")}
+        self._misses = {layer: cache_requests_total.labels(name, layer, "miss") for layer in ("l1", "l2")}
+
+    def _key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    async def get(self, key: str) -> T | None:
+        """Get a single value."""
+        return (await self.get_many([key])).get(key)
+
+    async def get_many(self, keys: Iterable[str]) -> dict[str, T]:
+        """Get the cached values of ``keys``, missing keys are left out."""
+        found: dict[str, T] = {}
+        missing: list[str] = []
+        for key in dict.fromkeys(keys):
+            value = self.local.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        self._hits["l1"].inc(len(found))
+        self._misses["l1"].inc(len(missing))
+        if not missing or self.backend is None:
+            return found
+
+        raw_values = await self.backend.get_many([self._key(key) for key in missing])
+        hits = 0
+        for key, raw in zip(missing, raw_values, strict=True):
+            if raw is None:
+                continue
+            value = self.model.model_validate_json(raw)
+            self.local.set(key, value)
+            found[key] = value
+            hits += 1
+        self._hits["l2"].inc(hits)
+        self._misses["l2"].inc(len(missing) - hits)
+        return found
+
+    async def set(self, key: str, value: T) -> None:
+        """Store a single value in both levels."""
+        await self.set_many({key: value})
+
+    async def set_many(self, items: dict[str, T]) -> None:
+        """Store values in both levels, with one round trip to the backend."""
+        for key, value in items.items():
+            self.local.set(key, value)
+        if self.backend is not None and items:
+            await self.backend.set_many(
+                {self._key(key): value.model_dump_json().encode() for key, value in items.items()},
+                self.ttl,
+            )
+
+    async def delete(self, key: str) -> None:
+        """Drop a value from both levels."""
+        self.local.delete(key)
+        if self.backend is not None:
+            await self.backend.delete_many([self._key(key)])
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[T | None]]) -> T | None:
+        """Get a value, calling ``loader`` and caching its result on a miss. None is not cached."""
+        value = await self.get(key)
+        if value is None:
+            value = await loader()
+            if value is not None:
+                await self.set(key, value)
+        return value
+
+
+def create_backend(kind: str) -> CacheBackend | None:
+    """Create the configured L2 backend, None keeps the caches process local."""
+    if kind == "redis":
+        return RedisBackend(settings.db_url_redis)
+    if kind == "memory":
+        return MemoryBackend()
+    return None
+
+
+cache_backend = create_backend(settings.CACHE_BACKEND)
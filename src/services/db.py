@@ -1,4 +1,6 @@
+import time
 from abc import ABC, abstractmethod
+from collections.abc import Callable
 from datetime import UTC, datetime
 from enum import Enum
 from types import TracebackType
@@ -23,7 +25,11 @@ from sqlalchemy import (
     select,
     update,
 )
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Row, make_url
+from sqlalchemy.exc import InterfaceError, OperationalError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
@@ -33,6 +39,7 @@ from sqlalchemy.pool import NullPool
 from src.commons.model_base import Base, PrimaryKeyUUID
 from src.commons.project_utils import handle_error
 from src.config import settings
+from src.services.query_stats import QueryStats, begin_query_stats, end_query_stats
 
 ModelType = TypeVar("ModelType", bound=Base)
 
@@ -41,6 +48,43 @@ class NotCreatedSessionError(NotImplementedError):
     """Raised when trying to use a session that hasn't been created."""
 
 
+class ReadOnlyUnitOfWorkError(RuntimeError):
+    """Raised when a read-only unit of work is asked to write."""
+
+
+_engines: dict[str, AsyncEngine] = {}
+
+
+def engine_options(url: str) -> dict[str, Any]:
+    """
+    Keyword arguments of ``create_async_engine`` for ``url``.
+
+    ``DB_POOL_SIZE`` 0 keeps ``NullPool``, a connection per unit of work, which is
+    what an external pooler such as PgBouncer expects. A positive size keeps a
+    pool per process, and with it the asyncpg prepared statement cache of each
+    connection (``DB_STATEMENT_CACHE_SIZE`` statements, 0 disables it).
+    """
+    options: dict[str, Any] = {"echo": settings.ECHO}
+    if settings.DB_POOL_SIZE > 0:
+        options |= {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_pre_ping": True,
+        }
+    else:
+        options["poolclass"] = NullPool
+    if make_url(url).get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return options
+
+
+async def dispose_engines() -> None:
+    """Close the connections of every engine, on shutdown."""
+    for engine in _engines.values():
+        await engine.dispose()
+    _engines.clear()
+
+
 class DatabaseConfig:
     """Database configuration and connection management."""
 
@@ -53,13 +97,17 @@ class DatabaseConfig:
         self.db_url_postgresql = db_url_postgresql
 
     @property
-    def engine(self):
-        """Create and return SQLAlchemy async engine instance."""
-        return create_async_engine(
-            self.db_url_postgresql,
-            echo=settings.ECHO,
-            poolclass=NullPool,
-        )
+    def engine(self) -> AsyncEngine:
+        """Return the SQLAlchemy async engine of the URL, created once per process.
+
+        Sharing it keeps the compiled statement cache and the connection pool
+        across units of work.
+        """
+        engine = _engines.get(self.db_url_postgresql)
+        if engine is None:
+            engine = create_async_engine(self.db_url_postgresql, **engine_options(self.db_url_postgresql))
+            _engines[self.db_url_postgresql] = engine
+        return engine
 
     @property
     def async_session_maker(self):
@@ -71,6 +119,35 @@ class DatabaseConfig:
         )
 
 
+class ReplicaRouter:
+    """
+    Decides whether read-only units of work go to the replica.
+
+    After a connection error on the replica, reads go to the primary for
+    ``retry_seconds`` before the replica is tried again.
+    """
+
+    def __init__(
+        self, replica_url: str | None, retry_seconds: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.replica_url = replica_url
+        self.retry_seconds = retry_seconds
+        self._clock = clock
+        self._unavailable_until = 0.0
+
+    @property
+    def use_replica(self) -> bool:
+        """Whether a replica is configured and currently considered available."""
+        return self.replica_url is not None and self._clock() >= self._unavailable_until
+
+    def mark_unavailable(self) -> None:
+        """Send reads to the primary for the retry period."""
+        self._unavailable_until = self._clock() + self.retry_seconds
+
+
+replica_router = ReplicaRouter(settings.PG_REPLICA_URL, settings.PG_REPLICA_RETRY_SECONDS)
+
+
 class IUnitOfWorkBase(ABC):
     """Base interface for Unit of Work pattern implementation."""
 
@@ -97,21 +174,56 @@ class IUnitOfWorkBase(ABC):
 
 
 class PgUnitOfWork(IUnitOfWorkBase):
-    """PostgreSQL Unit of Work implementation."""
+    """PostgreSQL Unit of Work implementation.
+
+    A ``read_only`` unit of work is routed to the replica at ``PG_REPLICA_URL`` when
+    one is configured, and falls back to the primary when the replica cannot be
+    reached. It refuses writes, so the ingestion path never runs on the replica.
+    """
 
-    def __init__(self) -> None:
-        """Initialize PostgreSQL Unit of Work."""
-        self._session_factory = DatabaseConfig(settings.db_url_postgresql).async_session_maker
+    def __init__(self, read_only: bool = False) -> None:
+        """Initialize PostgreSQL Unit of Work.
+
+        Args:
+            read_only: Route to the replica and refuse writes
+        """
+        self.read_only = read_only
+        self._primary_factory = DatabaseConfig(settings.db_url_postgresql).async_session_maker
+        self._session_factory = self._primary_factory
+        self._replica_factory = None
+        self.on_replica = False
         self._async_session = None
+        self._depth = 0
+        self._stats_token = None
+        self._stats = None
 
     def activate(self) -> None:
         """Activate the session if not already active."""
         if not isinstance(self._async_session, AsyncSession):
             self._async_session = self._session_factory()
 
+    def _route(self) -> None:
+        """Open the session of a read-only unit of work on the replica or the primary."""
+        self.on_replica = replica_router.use_replica
+        if self.on_replica:
+            if self._replica_factory is None:
+                self._replica_factory = DatabaseConfig(replica_router.replica_url).async_session_maker  # pyright: ignore[reportArgumentType]
+            self._session_factory = self._replica_factory
+        else:
+            self._session_factory = self._primary_factory
+        self._async_session = self._session_factory()
+
     async def __aenter__(self):
-        """Enter the context manager and activate the session."""
+        """Enter the context manager and activate the session.
+
+        Statements executed until the outermost exit are accounted in ``self.stats``.
+        """
+        if self.read_only and self._depth == 0:
+            self._route()
         self.activate()
+        if self._depth == 0:
+            self._stats, self._stats_token = begin_query_stats()
+        self._depth += 1
         return self
 
     async def __aexit__(
@@ -133,11 +245,26 @@ class PgUnitOfWork(IUnitOfWorkBase):
             await self.commit()
 
         await self.close()
+        self._depth -= 1
+        if self._depth == 0 and self._stats_token is not None:
+            end_query_stats(self._stats_token)
+            self._stats_token = None
+            self._stats.report(type(self).__name__)
         if isinstance(exc_val, HTTPException):
             raise exc_val
         else:
             handle_error(exc_type, exc_val, exc_tb)
 
+    @property
+    def dialect_name(self) -> str:
+        """Name of the database dialect, e.g. ``postgresql`` or ``sqlite``."""
+        return self._session_factory.kw["bind"].dialect.name
+
+    @property
+    def stats(self) -> QueryStats | None:
+        """Statement statistics of the current or last finished unit of work."""
+        return self._stats
+
     async def rollback(self) -> None:
         """Rollback the current transaction."""
         if self._async_session is None:
@@ -185,7 +312,20 @@ class PgUnitOfWork(IUnitOfWorkBase):
         """
         if self._async_session is None:
             raise NotCreatedSessionError
-        return await self._async_session.execute(statement, *args)
+        if self.read_only and isinstance(statement, (Insert, Update, Delete)):
+            raise ReadOnlyUnitOfWorkError(f"{type(statement).__name__} in a read-only unit of work")
+        try:
+            return await self._async_session.execute(statement, *args)
+        except (OperationalError, InterfaceError, OSError) as exc:
+            if not self.on_replica:
+                raise
+            logger.warning(f"Replica unavailable, reading from the primary: {exc!s}")
+            replica_router.mark_unavailable()
+            await self._async_session.close()
+            self.on_replica = False
+            self._session_factory = self._primary_factory
+            self._async_session = self._session_factory()
+            return await self._async_session.execute(statement, *args)
 
     def add(self, instance: object) -> None:
         """Add an instance to the session.
@@ -195,6 +335,8 @@ class PgUnitOfWork(IUnitOfWorkBase):
         """
         if self._async_session is None:
             raise NotCreatedSessionError
+        if self.read_only:
+            raise ReadOnlyUnitOfWorkError("add in a read-only unit of work")
         self._async_session.add(instance)
 
 
@@ -268,7 +410,7 @@ class Query(Generic[ModelType]):
         Args:
             conditions: The conditions to apply
         """
-        logger.info(f"Making conditions {self.model!r} {conditions=}")
+        logger.debug("Making conditions {!r} {!r}", self.model, conditions)
         # Clear existing conditions
         self.conditions = []
         for key, value in conditions.model_dump().items():
@@ -321,6 +463,39 @@ class Crud(Generic[ModelType], Query[ModelType]):
         response = result_query.scalar_one()
         return type_cast("ModelType", response)
 
+    async def upsert_entity(self, payload: dict | BaseModel, index_elements: list[str]) -> None:
+        """
+        Insert an entity, or update it if a row with the same ``index_elements`` exists.
+        Uses ``INSERT ... ON CONFLICT DO UPDATE`` of the active dialect.
+        """
+        if isinstance(payload, BaseModel):
+            body = payload.model_dump()
+        else:
+            body = payload
+        dialect_insert = sqlite.insert if self.uow.dialect_name == "sqlite" else postgresql.insert
+
+        stmt = dialect_insert(self.model).values(**body)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={key: stmt.excluded[key] for key in body if key not in index_elements},
+        )
+        await self.uow.execute(stmt)
+
+    async def upsert_entities(self, payloads: list[dict], index_elements: list[str]) -> None:
+        """
+        Insert or update several entities with the same keys in one statement, see ``upsert_entity``.
+        """
+        if not payloads:
+            return
+        dialect_insert = sqlite.insert if self.uow.dialect_name == "sqlite" else postgresql.insert
+
+        stmt = dialect_insert(self.model).values(payloads)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={key: stmt.excluded[key] for key in payloads[0] if key not in index_elements},
+        )
+        await self.uow.execute(stmt)
+
     async def delete_entity(self, conditions: BaseModel) -> None:
         """
         Delete an entity.
@@ -387,7 +562,23 @@ class CrudEntity(Crud[ModelType]):
         response = result_query.scalars().fetchall()
         return type_cast("list[ModelType]", response)
 
-    async def get_by_query(self, query: Executable) -> list[ModelType]:
-        result_query = await self.uow.execute(query)
+    async def get_by_query(self, query: Executable, params: dict[str, Any] | None = None) -> list[ModelType]:
+        result_query = await self.uow.execute(query, params)
         response = result_query.scalars().fetchall()
         return type_cast("list[ModelType]", response)
+
+    async def get_rows[R](
+        self,
+        query: Executable,
+        params: dict[str, Any] | None = None,
+        row_type: Callable[..., R] | None = None,
+    ) -> list[R] | list[Row[Any]]:
+        """Read-only fast path that skips ORM hydration.
+
+        Meant for column selects: rows are returned as plain ``Row`` tuples, or
+        built with ``row_type`` (e.g. a slotted dataclass) from the selected columns.
+        """
+        result_query = await self.uow.execute(query, params)
+        if row_type is None:
+            return list(result_query.all())
+        return [row_type(*row) for row in result_query]
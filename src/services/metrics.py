@@ -0,0 +1,273 @@
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Coroutine
+from functools import wraps
+from typing import Any
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped, strict=True))
+
+
+def _sample(name: str, labels: str, value: str) -> str:
+    return f"{name}{{{labels}}} {value}" if labels else f"{name} {value}"
+
+
+class Counter:
+    """Monotonic counter."""
+
+    __slots__ = ("documentation", "labels", "name", "value")
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: str = "") -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increase the counter by ``amount``."""
+        self.value += amount
+
+    def samples(self) -> list[str]:
+        return [_sample(self.name, self.labels, _format_value(self.value))]
+
+
+class Gauge:
+    """Value that can go up and down, or be read from a callback at render time."""
+
+    __slots__ = ("_function", "documentation", "labels", "name", "value")
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: str = "") -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.value = 0.0
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from ``function`` whenever the metrics are rendered."""
+        self._function = function
+
+    def samples(self) -> list[str]:
+        value = self._function() if self._function is not None else self.value
+        return [_sample(self.name, self.labels, _format_value(value))]
+
+
+class Histogram:
+    """Histogram with buckets preallocated at creation time.
+
+    ``observe`` only bumps a slot in a fixed list, cumulative counts are
+    computed when the metrics are rendered.
+    """
+
+    __slots__ = ("buckets", "count", "counts", "documentation", "labels", "name", "sum")
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        labels: str = "",
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # The last slot is the implicit +Inf bucket.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Record a single observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self) -> list[str]:
+        prefix = f"{self.labels}," if self.labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts, strict=False):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{{prefix}le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        lines.append(_sample(f"{self.name}_sum", self.labels, _format_value(self.sum)))
+        lines.append(_sample(f"{self.name}_count", self.labels, str(self.count)))
+        return lines
+
+
+type Metric = Counter | Gauge | Histogram
+
+
+class MetricFamily[M: (Counter, Gauge, Histogram)]:
+    """Metric split by label values.
+
+    Children are created on first use and cached, so the hot path is a
+    single dict lookup and the label string is formatted only once.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...],
+        factory: Callable[[str], M],
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.type_name = factory("").type_name
+        self._factory = factory
+        self._children: dict[tuple[str, ...], M] = {}
+
+    def labels(self, *values: str) -> M:
+        """Return the child for ``values``, creating it on first use."""
+        child = self._children.get(values)
+        if child is None:
+            child = self._factory(_format_labels(self.label_names, values))
+            self._children[values] = child
+        return child
+
+    def samples(self) -> list[str]:
+        lines: list[str] = []
+        for child in list(self._children.values()):
+            lines.extend(child.samples())
+        return lines
+
+
+class MetricsRegistry:
+    """Registry of process-local metrics rendered in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric | MetricFamily] = {}
+
+    def _register[T: (Counter, Gauge, Histogram, MetricFamily)](self, name: str, metric: T) -> T:
+        existing = self._metrics.setdefault(name, metric)
+        if type(existing) is not type(metric) or existing.type_name != metric.type_name:
+            raise TypeError(f"Metric {name} is already registered as a different type")
+        return existing  # pyright: ignore[reportReturnType]
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        """Register a counter, or return the one already registered under ``name``."""
+        return self._register(name, Counter(name, documentation))
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        """Register a gauge, or return the one already registered under ``name``."""
+        return self._register(name, Gauge(name, documentation))
+
+    def histogram(self, name: str, documentation: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Register a histogram, or return the one already registered under ``name``."""
+        return self._register(name, Histogram(name, documentation, buckets))
+
+    def counter_family(self, name: str, documentation: str, labels: tuple[str, ...]) -> MetricFamily[Counter]:
+        """Register a counter split by ``labels``."""
+        return self._register(
+            name,
+            MetricFamily(name, documentation, labels, lambda label_str: Counter(name, documentation, label_str)),
+        )
+
+    def gauge_family(self, name: str, documentation: str, labels: tuple[str, ...]) -> MetricFamily[Gauge]:
+        """Register a gauge split by ``labels``."""
+        return self._register(
+            name,
+            MetricFamily(name, documentation, labels, lambda label_str: Gauge(name, documentation, label_str)),
+        )
+
+    def histogram_family(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...],
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> MetricFamily[Histogram]:
+        """Register a histogram split by ``labels``."""
+        return self._register(
+            name,
+            MetricFamily(
+                name,
+                documentation,
+                labels,
+                lambda label_str: Histogram(name, documentation, buckets, label_str),
+            ),
+        )
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: list[str] = []
+        for name, metric in list(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def timed[**P, R](
+    histogram: Histogram,
+) -> Callable[[Callable[P, Coroutine[Any, Any, R]]], Callable[P, Coroutine[Any, Any, R]]]:
+    """Decorator that observes the duration of a coroutine function in ``histogram``."""
+
+    def decorator(func: Callable[P, Coroutine[Any, Any, R]]) -> Callable[P, Coroutine[Any, Any, R]]:
+        @wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+registry = MetricsRegistry()
+
+http_request_seconds = registry.histogram_family(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    labels=("method", "route"),
+)
+kafka_handler_seconds = registry.histogram_family(
+    "kafka_handler_duration_seconds",
+    "Kafka message handler latency by topic",
+    labels=("topic",),
+)
+analyze_traffic_seconds = registry.histogram(
+    "analyze_traffic_duration_seconds",
+    "Duration of TrafficAnalysisService.analyze_traffic",
+)
+traffic_anomalies_total = registry.counter_family(
+    "traffic_anomalies_total",
+    "Detected traffic anomalies by kind",
+    labels=("kind",),
+)
+cache_requests_total = registry.counter_family(
+    "cache_requests_total",
+    "Cache lookups by cache, level (l1/l2) and result (hit/miss)",
+    labels=("cache", "layer", "result"),
+)
+websocket_clients = registry.gauge_family(
+    "websocket_clients",
+    "Connected WebSocket clients by endpoint",
+    labels=("endpoint",),
+)
@@ -0,0 +1,106 @@
+import asyncio
+import contextlib
+from collections.abc import Callable
+from typing import Any
+
+import asyncpg
+from loguru import logger
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.engine import make_url
+
+# Postgres drops notifications with a payload of 8000 bytes or more.
+MAX_PAYLOAD_BYTES = 7999
+RECONNECT_DELAY_SECONDS = (0.5, 1, 2, 5, 10)
+
+
+class ChangeFeed[T: BaseModel]:
+    """
+    Cross-process change feed over Postgres ``LISTEN/NOTIFY``.
+
+    Every process listens on ``channel`` with a dedicated connection, so an event
+    published by one worker is delivered to ``on_event`` in all of them, including
+    the publisher. Until the feed is started, or when the database is not Postgres,
+    events are delivered in-process only.
+    """
+
+    def __init__(self, channel: str, model: type[T], on_event: Callable[[T], None]) -> None:
+        self.channel = channel
+        self.model = model
+        self.on_event = on_event
+        self._connection: asyncpg.Connection | None = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def listening(self) -> bool:
+        """Whether events currently go through Postgres."""
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def start(self, url: str) -> None:
+        """Start listening in the background, reconnecting when the connection drops."""
+        database_url = make_url(url)
+        if database_url.get_backend_name() != "postgresql":
+            logger.info(f"Change feed {self.channel} is process local on {database_url.get_backend_name()}")
+            return
+        dsn = database_url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self._task = asyncio.create_task(self._listen(dsn), name=f"change-feed-{self.channel}")
+
+    async def stop(self) -> None:
+        """Stop listening and close the connection."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def publish(self, event: T) -> None:
+        """Send ``event`` to every process, or deliver it locally when not listening."""
+        payload = event.model_dump_json()
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            raise ValueError(f"Change feed payload of {self.channel} exceeds {MAX_PAYLOAD_BYTES} bytes")
+
+        if self.listening:
+            try:
+                async with self._lock:
+                    await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)  # pyright: ignore[reportOptionalMemberAccess]
+            except (asyncpg.PostgresError, OSError) as exc:
+                logger.warning(f"Change feed {self.channel} publish failed, delivering locally: {exc!s}")
+            else:
+                return
+        self._deliver(event)
+
+    async def _listen(self, dsn: str) -> None:
+        attempt = 0
+        while True:
+            closed = asyncio.Event()
+            try:
+                self._connection = await asyncpg.connect(dsn)
+                self._connection.add_termination_listener(lambda _connection, event=closed: event.set())
+                await self._connection.add_listener(self.channel, self._on_notification)
+                logger.info(f"Listening on change feed {self.channel}")
+                attempt = 0
+                await closed.wait()
+                logger.warning(f"Change feed {self.channel} connection lost, reconnecting")
+            except asyncio.CancelledError:
+                if self.listening:
+                    await self._connection.close()  # pyright: ignore[reportOptionalMemberAccess]
+                raise
+            except (asyncpg.PostgresError, OSError) as exc:
+                logger.error(f"Change feed {self.channel} cannot connect: {exc!s}")
+            self._connection = None
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS[min(attempt, len(RECONNECT_DELAY_SECONDS) - 1)])
+            attempt += 1
+
+    def _on_notification(self, _connection: Any, _pid: int, _channel: str, payload: str) -> None:
+        try:
+            event = self.model.model_validate_json(payload)
+        except ValidationError as exc:
+            logger.error(f"Invalid change feed {self.channel} payload: {exc!s}")
+            return
+        self._deliver(event)
+
+    def _deliver(self, event: T) -> None:
+        try:
+            self.on_event(event)
+        except Exception:  # noqa: BLE001 - a failing handler must not break the listener connection
+            logger.exception(f"Error handling change feed {self.channel} event")
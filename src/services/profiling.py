@@ -0,0 +1,198 @@
+import asyncio
+import cProfile
+import random
+import re
+import time
+from collections.abc import Callable, Coroutine
+from datetime import UTC, datetime
+from functools import wraps
+from pathlib import Path
+from typing import Any, Protocol
+
+from fastapi.requests import Request
+from loguru import logger
+
+from src.commons.schemas import ProfileInfo
+from src.config import settings
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # pragma: no cover - optional dependency
+    PyinstrumentProfiler = None
+
+
+class ActiveProfile(Protocol):
+    suffix: str
+
+    def start(self) -> None: ...
+
+    def stop(self) -> None: ...
+
+    def write(self, path: Path) -> None: ...
+
+
+class CProfileProfile:
+    """cProfile based profile, written as a ``pstats`` file.
+
+    cProfile traces the whole thread, so coroutines of other tasks that run
+    while the profiled one awaits show up in the stats as well.
+    """
+
+    suffix = ".pstats"
+
+    def __init__(self) -> None:
+        self._profiler = cProfile.Profile()
+
+    def start(self) -> None:
+        self._profiler.enable()
+
+    def stop(self) -> None:
+        self._profiler.disable()
+
+    def write(self, path: Path) -> None:
+        self._profiler.dump_stats(path)
+
+
+class PyinstrumentProfile:
+    """pyinstrument based profile, written as an HTML flamegraph.
+
+    Only the awaited task is attributed, other tasks are excluded.
+    """
+
+    suffix = ".html"
+
+    def __init__(self) -> None:
+        self._profiler = PyinstrumentProfiler(async_mode="enabled")  # pyright: ignore[reportOptionalCall]
+
+    def start(self) -> None:
+        self._profiler.start()
+
+    def stop(self) -> None:
+        self._profiler.stop()
+
+    def write(self, path: Path) -> None:
+        path.write_text(self._profiler.output_html())
+
+
+class ProfileStore:
+    """Directory of finished profiles, keeping only the newest ones."""
+
+    def __init__(self, directory: str, keep: int) -> None:
+        self.directory = Path(directory)
+        self.keep = keep
+
+    def save(self, kind: str, label: str, profile: ActiveProfile) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_-]+", "_", label).strip("_")[:80] or "root"
+        path = self.directory / f"{time.time_ns()}-{kind}-{slug}{profile.suffix}"
+        profile.write(path)
+        self._prune()
+        return path
+
+    def _files(self) -> list[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            (path for path in self.directory.iterdir() if path.suffix in {".pstats", ".html"}),
+            key=lambda path: path.name,
+            reverse=True,
+        )
+
+    def _prune(self) -> None:
+        for path in self._files()[self.keep :]:
+            path.unlink(missing_ok=True)
+
+    def list(self) -> list[ProfileInfo]:
+        profiles = []
+        for path in self._files():
+            try:
+                timestamp, kind, label = path.stem.split("-", 2)
+                created_at = datetime.fromtimestamp(int(timestamp) / 1e9, UTC)
+                size = path.stat().st_size
+            except (ValueError, FileNotFoundError):
+                # Not written by this store, or pruned meanwhile.
+                continue
+            profiles.append(ProfileInfo(name=path.name, kind=kind, label=label, created_at=created_at, size=size))
+        return profiles
+
+    def get(self, name: str) -> Path | None:
+        """Return the path of a stored profile, only for names produced by this store."""
+        for path in self._files():
+            if path.name == name:
+                return path
+        return None
+
+
+profile_store = ProfileStore(settings.PROFILES_DIR, settings.PROFILES_KEPT)
+
+# Only one cProfile/sys.monitoring profiler may be active per interpreter,
+# overlapping candidates are simply not profiled.
+_profile_running = False
+
+
+def _new_profile() -> ActiveProfile:
+    if settings.PROFILER == "pyinstrument" and PyinstrumentProfiler is not None:
+        return PyinstrumentProfile()
+    return CProfileProfile()
+
+
+def _sampled() -> bool:
+    return settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE  # noqa: S311
+
+
+async def _run_profiled[R](kind: str, label: str, call: Callable[[], Coroutine[Any, Any, R]]) -> R:
+    global _profile_running
+    if _profile_running:
+        return await call()
+
+    _profile_running = True
+    profile = _new_profile()
+    profile.start()
+    try:
+        return await call()
+    finally:
+        profile.stop()
+        _profile_running = False
+        # Written off the event loop, and a failed write must not replace the handler's result or error.
+        try:
+            path = await asyncio.to_thread(profile_store.save, kind, label, profile)
+        except Exception:  # noqa: BLE001 - profiles are best effort
+            logger.exception(f"Storing {kind} profile failed")
+        else:
+            logger.info("Stored {} profile {}", kind, path.name)
+
+
+async def profiling_middleware(request: Request, call_next: Any):
+    """
+    Profile a request when asked for by header, query parameter or sampling.
+    Only installed when ``PROFILING_ENABLED`` is set.
+    """
+    requested = request.headers.get(settings.PROFILING_HEADER) or request.query_params.get(
+        settings.PROFILING_QUERY_PARAM
+    )
+    if not (requested or _sampled()):
+        return await call_next(request)
+    return await _run_profiled("http", f"{request.method} {request.url.path}", lambda: call_next(request))
+
+
+def profiled[**P, R](
+    label: str,
+) -> Callable[[Callable[P, Coroutine[Any, Any, R]]], Callable[P, Coroutine[Any, Any, R]]]:
+    """
+    Decorator that profiles a sampled share of handler invocations.
+    Returns the handler unchanged when profiling is disabled.
+    """
+
+    def decorator(func: Callable[P, Coroutine[Any, Any, R]]) -> Callable[P, Coroutine[Any, Any, R]]:
+        if not settings.PROFILING_ENABLED:
+            return func
+
+        @wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if not _sampled():
+                return await func(*args, **kwargs)
+            return await _run_profiled("kafka", label, lambda: func(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,191 @@
+import heapq
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+from src.config import settings
+from src.services.metrics import registry
+
+SLOWEST_KEPT = 5
+
+statements_total = registry.counter("db_statements_total", "SQL statements executed")
+statement_seconds = registry.histogram("db_statement_duration_seconds", "SQL statement execution time")
+uow_statements = registry.histogram(
+    "db_uow_statements",
+    "SQL statements executed per unit of work",
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+uow_seconds = registry.histogram("db_uow_duration_seconds", "Total DB time per unit of work")
+slow_statements_total = registry.counter("db_slow_statements_total", "SQL statements slower than SLOW_QUERY_MS")
+pool_connections_opened = registry.counter("db_pool_connections_opened_total", "DBAPI connections opened")
+pool_checkouts = registry.counter("db_pool_checkouts_total", "Connections checked out of the pool")
+pool_checked_out = registry.gauge("db_pool_checked_out_connections", "Connections currently checked out")
+
+
+class QueryBudgetExceededError(AssertionError):
+    """Raised when a code path runs more SQL statements than its budget allows."""
+
+
+@dataclass(order=True, slots=True)
+class SlowStatement:
+    """A recorded statement with its parameters redacted."""
+
+    duration: float
+    statement: str = field(compare=False)
+    parameters: str = field(compare=False)
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """Statements executed inside one unit of work."""
+
+    statements: int = 0
+    total_time: float = 0.0
+    slowest: list[SlowStatement] = field(default_factory=list)
+
+    def record(self, statement: str, parameters: Any, duration: float) -> None:
+        """Account a finished statement, keeping only the slowest few."""
+        self.statements += 1
+        self.total_time += duration
+        if len(self.slowest) < SLOWEST_KEPT:
+            heapq.heappush(self.slowest, SlowStatement(duration, statement, _redact(parameters)))
+        elif duration > self.slowest[0].duration:
+            heapq.heapreplace(self.slowest, SlowStatement(duration, statement, _redact(parameters)))
+
+    def report(self, label: str) -> None:
+        """Log the summary and feed the per unit of work histograms."""
+        uow_statements.observe(self.statements)
+        uow_seconds.observe(self.total_time)
+        logger.debug(
+            "{} executed {} statements in {:.2f} ms",
+            label,
+            self.statements,
+            self.total_time * 1000,
+        )
+        threshold = settings.SLOW_QUERY_MS / 1000
+        for slow in sorted(self.slowest, reverse=True):
+            if slow.duration < threshold:
+                break
+            logger.warning(
+                "Slow statement in {} took {:.2f} ms: {} {}",
+                label,
+                slow.duration * 1000,
+                slow.statement,
+                slow.parameters,
+            )
+
+
+@dataclass(slots=True)
+class QueryBudget:
+    """Upper bound on statements for a code path."""
+
+    limit: int
+    label: str
+    used: int = 0
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+_current_budget: ContextVar[QueryBudget | None] = ContextVar("current_query_budget", default=None)
+
+
+def _redact(parameters: Any) -> str:
+    """Describe statement parameters without exposing their values."""
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}=?" for key in parameters) + "}"
+    if isinstance(parameters, list | tuple):
+        return f"[{len(parameters)} redacted]"
+    return "[redacted]"
+
+
+def begin_query_stats() -> tuple[QueryStats, Token]:
+    """Start collecting statements of the current context into a fresh ``QueryStats``."""
+    stats = QueryStats()
+    return stats, _current_stats.set(stats)
+
+
+def end_query_stats(token: Token) -> None:
+    """Stop collecting and restore the stats of the enclosing context."""
+    _current_stats.reset(token)
+
+
+@contextmanager
+def collect_query_stats() -> Iterator[QueryStats]:
+    """Collect statements executed inside the block."""
+    stats, token = begin_query_stats()
+    try:
+        yield stats
+    finally:
+        end_query_stats(token)
+
+
+@contextmanager
+def query_budget(limit: int, label: str = "code path") -> Iterator[QueryBudget]:
+    """Fail when the wrapped code executes more than ``limit`` statements.
+
+    Intended for tests::
+
+        with query_budget(6, "process_sensor_data"):
+            await CarService().process_sensor_data(payload)
+    """
+    budget = QueryBudget(limit=limit, label=label)
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+    if budget.used > budget.limit:
+        raise QueryBudgetExceededError(f"{budget.label} executed {budget.used} statements, budget is {budget.limit}")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    duration = time.perf_counter() - conn.info["query_started_at"].pop()
+
+    statements_total.inc()
+    statement_seconds.observe(duration)
+    if duration * 1000 >= settings.SLOW_QUERY_MS:
+        slow_statements_total.inc()
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, parameters, duration)
+
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.used += 1
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context) -> None:  # noqa: ANN001
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started_at"):
+        connection.info["query_started_at"].pop()
+
+
+@event.listens_for(Pool, "connect")
+def _pool_connect(dbapi_connection, connection_record) -> None:  # noqa: ANN001
+    pool_connections_opened.inc()
+
+
+@event.listens_for(Pool, "checkout")
+def _pool_checkout(dbapi_connection, connection_record, connection_proxy) -> None:  # noqa: ANN001
+    pool_checkouts.inc()
+    pool_checked_out.inc()
+
+
+@event.listens_for(Pool, "checkin")
+def _pool_checkin(dbapi_connection, connection_record) -> None:  # noqa: ANN001
+    pool_checked_out.dec()
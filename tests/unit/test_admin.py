@@ -0,0 +1,145 @@
+"""Unit tests for the admin list views."""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pytest
+from fastapi import HTTPException
+from sqladmin.pagination import Pagination
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from starlette.datastructures import URL
+from starlette.requests import Request
+
+from src.admin.views import CarAdmin, RoadAdmin, SeekPagination
+from src.analytics.routing import road_network
+from src.analytics.spatial import GridIndex, road_locator
+from src.commons.model_base import Base
+from src.commons.models import Car, Road
+
+LIST_URL = URL("http://testserver/admin/car/list")
+START = datetime(2025, 3, 3, 8)
+
+
+def request(query: str) -> Request:
+    return Request(
+        {"type": "http", "method": "GET", "path": LIST_URL.path, "query_string": query.encode(), "headers": []}
+    )
+
+
+async def follow(view: CarAdmin, pagination: Pagination, next_page: bool) -> Pagination:
+    """Open the next or the previous page link of a list page."""
+    pagination.add_pagination_urls(LIST_URL)
+    control = pagination.next_page if next_page else pagination.previous_page
+    return await view.list(request(urlsplit(control.url).query))
+
+
+@pytest.fixture
+async def engine(tmp_path: Path) -> AsyncEngine:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'admin.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        road_id = (
+            await conn.execute(
+                insert(Road).values(name="R", start="A", end="B", length=1, city="City", street="S").returning(Road.id)
+            )
+        ).scalar_one()
+        await conn.execute(
+            insert(Car),
+            [
+                # Pairs of cars share a creation time, the primary key orders them.
+                {
+                    "plate_number": f"AB{i:03d}" if i % 3 else f"XY{i:03d}",
+                    "model": "Model",
+                    "average_speed": i % 7,
+                    "road_id": road_id,
+                    "created_at": START + timedelta(minutes=i // 2),
+                }
+                for i in range(25)
+            ],
+        )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def view(engine: AsyncEngine) -> CarAdmin:
+    view = CarAdmin()
+    view.session_maker = async_sessionmaker(bind=engine)
+    view.is_async = True
+    return view
+
+
+class TestCarAdmin:
+    """Test cases for the car admin list."""
+
+    @pytest.mark.asyncio
+    async def test_seek_paging(self, view: CarAdmin) -> None:
+        """Test that next and previous links walk every car once, newest first."""
+        pages = [await view.list(request("pageSize=10"))]
+        while pages[-1].has_next:
+            pages.append(await follow(view, pages[-1], next_page=True))
+        assert all(isinstance(page, SeekPagination) for page in pages)
+        assert [page.page for page in pages] == [1, 2, 3]
+        assert pages[-1].count == 25
+
+        cars = [car for page in pages for car in page.rows]
+        assert len(cars) == len({car.id for car in cars}) == 25
+        assert [(car.created_at, car.id) for car in cars] == sorted(
+            ((car.created_at, car.id) for car in cars), reverse=True
+        )
+
+        previous = await follow(view, pages[2], next_page=False)
+        assert previous.page == 2
+        assert [car.id for car in previous.rows] == [car.id for car in pages[1].rows]
+
+    @pytest.mark.asyncio
+    async def test_page_number_and_other_sort(self, view: CarAdmin) -> None:
+        """Test that a page opened by number skips rows and another sort order pages with OFFSET."""
+        second = await follow(view, await view.list(request("pageSize=10")), next_page=True)
+        third = await follow(view, second, next_page=True)
+        by_number = await view.list(request("pageSize=10&page=3"))
+        assert [car.id for car in by_number.rows] == [car.id for car in third.rows]
+
+        by_speed = await view.list(request("pageSize=10&sortBy=average_speed&sort=desc"))
+        assert type(by_speed) is Pagination
+        assert [car.average_speed for car in by_speed.rows] == sorted(
+            (car.average_speed for car in by_speed.rows), reverse=True
+        )
+
+    @pytest.mark.asyncio
+    async def test_search(self, view: CarAdmin) -> None:
+        """Test that the search matches plate numbers, with the count of matches."""
+        pagination = await view.list(request("pageSize=10&search=xy"))
+        assert pagination.count == 9
+        assert all(car.plate_number.startswith("XY") for car in pagination.rows)
+        assert (await view.list(request("search=B0"))).count == 0
+        # Longer terms match anywhere in the plate number.
+        rows = (await view.list(request("search=b02"))).rows
+        assert sorted(car.plate_number for car in rows) == ["AB020", "AB022", "AB023"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor(self, view: CarAdmin) -> None:
+        with pytest.raises(HTTPException):
+            await view.list(request("after=yesterday"))
+
+
+@pytest.mark.asyncio
+async def test_road_admin_invalidates_road_indexes() -> None:
+    """Test that roads changed in the admin panel rebuild the road graph and spatial index."""
+    view, road = RoadAdmin(), Road(name="R", start="A", end="B", length=1)
+
+    async def no_edges() -> list:
+        return []
+
+    for hook in (
+        lambda: view.after_model_change({}, road, is_created=False, request=request("")),
+        lambda: view.after_model_delete(road, request("")),
+    ):
+        road_locator.index = GridIndex([])
+        await road_network.get(no_edges)
+        assert road_network.fresh
+        await hook()
+        assert road_locator.index is None
+        assert not road_network.fresh
@@ -4,8 +4,10 @@ from datetime import UTC, datetime, timedelta
 from uuid import UUID, uuid4
 
 import pytest
+from fastapi import HTTPException
 
 from commons.state import State
+from src.analytics.forecasting import traffic_forecaster
 from src.analytics.services import (
     CarService,
     RoadConditionService,
@@ -21,6 +23,7 @@ from src.commons.schemas import (
     RoadConditionCreate,
     RoadCreate,
 )
+from src.services.query_stats import query_budget
 
 
 class TestCarService:
@@ -46,6 +49,21 @@ class TestCarService:
         assert result.average_speed == car_sensor_data.average_speed
         assert result.road_id == car_sensor_data.road_id
 
+    @pytest.mark.asyncio
+    async def test_process_sensor_data_query_budget(
+        self,
+        service: CarService,
+        car_sensor_data: CarCreate,
+    ) -> None:
+        """Test that one sensor event stays within its SQL statement budget."""
+        car_sensor_data.plate_number = f"TEST-{uuid4().hex[:8]}"
+        # One of them appends the sighting to the trajectory log.
+        with query_budget(9, "new car"):
+            await service.process_sensor_data(car_sensor_data)
+
+        with query_budget(9, "existing car"):
+            await CarService().process_sensor_data(car_sensor_data)
+
     @pytest.mark.asyncio
     async def test_get_cars_by_road(
         self,
@@ -77,6 +95,10 @@ class TestCarService:
             car.updated_at >= datetime.now(UTC) - timedelta(minutes=5) for car in cars if car.updated_at is not None
         )
 
+        on_road = await service.get_recent_cars(minutes=5, road_id=create_car.road_id)
+        assert create_car.id in {car.id for car in on_road}
+        assert all(car.road_id == create_car.road_id for car in on_road)
+
     @pytest.mark.asyncio
     async def test_delete_car(
         self,
@@ -277,3 +299,41 @@ class TestTrafficAnalysisService:
         assert result.congestion_level >= 0
         assert result.state in [State("LOW"), State("MEDIUM"), State("HIGH")]
         assert result.trend in ["INCREASING", "DECREASING", "STABLE"]
+
+    @pytest.mark.asyncio
+    async def test_get_traffic_snapshot(
+        self,
+        service: TrafficAnalysisService,
+        create_car: Car,
+        create_road: Road,
+    ) -> None:
+        """Test that the snapshot falls back to a live analysis and is refreshed on ingestion."""
+        result = await service.get_traffic_snapshot(create_road.id)
+        assert result.updated_at is not None
+
+        await service.update_traffic_measurement(create_road.id, [create_car])
+        async with service.uow:
+            snapshot = await service.snapshot_crud.get_snapshot(create_road.id)
+        assert snapshot is not None
+
+        result = await service.get_traffic_snapshot(create_road.id)
+        assert result.updated_at == snapshot.updated_at
+        assert result.density == snapshot.density
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_measurement_leaves_forecaster(
+        self,
+        service: TrafficAnalysisService,
+        create_car: Car,
+        create_road: Road,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test that a measurement is only folded into the forecaster once it is committed."""
+
+        async def fail(road_id: UUID, timestamp: datetime) -> None:
+            raise ValueError("snapshot upsert failed")
+
+        monkeypatch.setattr(service, "_refresh_snapshot", fail)
+        with pytest.raises(HTTPException):
+            await service.update_traffic_measurement(create_road.id, [create_car])
+        assert create_road.id not in traffic_forecaster
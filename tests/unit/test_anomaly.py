@@ -0,0 +1,99 @@
+"""Unit tests for traffic anomaly detection."""
+
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+from src.analytics.anomaly import AnomalyDetector
+from src.analytics.handlers import EventHub
+
+START = datetime(2025, 3, 3, tzinfo=UTC)
+
+
+class TestAnomalyDetector:
+    """Test cases for AnomalyDetector."""
+
+    @pytest.fixture
+    def detector(self) -> AnomalyDetector:
+        """Create AnomalyDetector instance with a short warm-up."""
+        return AnomalyDetector(warm_up=10, cooldown_seconds=60, capacity=2)
+
+    def feed_normal(self, detector: AnomalyDetector, road_id, minutes: int = 30) -> None:
+        for minute in range(minutes):
+            assert not detector.update(
+                road_id,
+                START + timedelta(minutes=minute),
+                speed=60 + (minute % 3),
+                density=20 + (minute % 2),
+            )
+
+    def test_speed_drop(self, detector: AnomalyDetector) -> None:
+        """Test that a sudden speed drop is flagged."""
+        road_id = uuid4()
+        self.feed_normal(detector, road_id)
+
+        anomalies = detector.update(road_id, START + timedelta(minutes=30), speed=15, density=21)
+        assert [anomaly.kind for anomaly in anomalies] == ["SPEED_DROP"]
+        assert anomalies[0].road_id == road_id
+        assert anomalies[0].z_score < -3
+
+    def test_density_spike(self, detector: AnomalyDetector) -> None:
+        """Test that a sudden density spike is flagged."""
+        road_id = uuid4()
+        self.feed_normal(detector, road_id)
+
+        anomalies = detector.update(road_id, START + timedelta(minutes=30), speed=60, density=80)
+        assert [anomaly.kind for anomaly in anomalies] == ["DENSITY_SPIKE"]
+
+    def test_speed_increase_is_not_an_incident(self, detector: AnomalyDetector) -> None:
+        """Test that a jump in speed is not reported."""
+        road_id = uuid4()
+        self.feed_normal(detector, road_id)
+
+        assert not detector.update(road_id, START + timedelta(minutes=30), speed=140, density=20)
+
+    def test_warm_up_and_cooldown(self, detector: AnomalyDetector) -> None:
+        """Test that new roads stay quiet and repeated alerts are suppressed."""
+        road_id = uuid4()
+        detector.update(road_id, START, speed=60, density=20)
+        assert not detector.update(road_id, START + timedelta(seconds=1), speed=5, density=20)
+
+        self.feed_normal(detector, road_id)
+        incident = START + timedelta(minutes=30)
+        assert detector.update(road_id, incident, speed=10, density=20)
+        assert not detector.update(road_id, incident + timedelta(seconds=10), speed=10, density=20)
+
+    def test_roads_are_independent(self, detector: AnomalyDetector) -> None:
+        """Test that baselines are kept per road after the arrays grow."""
+        roads = [uuid4() for _ in range(3)]
+        for road_id in roads:
+            self.feed_normal(detector, road_id)
+
+        assert len(detector) == 3
+        assert not detector.update(roads[2], START + timedelta(minutes=30), speed=61, density=20)
+
+
+class TestEventHub:
+    """Test cases for EventHub."""
+
+    def test_publish_to_subscribers(self) -> None:
+        """Test that every subscriber receives published events."""
+        hub: EventHub[int] = EventHub()
+        first, second = hub.subscribe(), hub.subscribe()
+        hub.publish(1)
+        assert first.get_nowait() == 1
+        assert second.get_nowait() == 1
+
+        hub.unsubscribe(first)
+        hub.publish(2)
+        assert first.empty()
+        assert len(hub) == 1
+
+    def test_slow_subscriber_drops_oldest(self) -> None:
+        """Test that a full queue drops its oldest event instead of blocking."""
+        hub: EventHub[int] = EventHub(maxsize=2)
+        queue = hub.subscribe()
+        for event in range(3):
+            hub.publish(event)
+        assert [queue.get_nowait(), queue.get_nowait()] == [1, 2]
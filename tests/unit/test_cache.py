@@ -0,0 +1,126 @@
+"""Unit tests for the two level cache."""
+
+from uuid import uuid4
+
+import pytest
+
+from src.commons.schemas import RoadInfo
+from src.services.cache import Cache, LocalCache, MemoryBackend
+from src.services.metrics import cache_requests_total
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def road(name: str = "ROAD") -> RoadInfo:
+    """Build cached road metadata."""
+    return RoadInfo(id=uuid4(), name=name, city="City", street="Street", length=1200)
+
+
+def counter(name: str, layer: str, result: str) -> float:
+    """Read a cache request counter."""
+    return cache_requests_total.labels(name, layer, result).value
+
+
+class TestLocalCache:
+    """Test cases for LocalCache."""
+
+    def test_lru_eviction(self) -> None:
+        """Test that the least recently used key is evicted first."""
+        local = LocalCache[int](maxsize=2, ttl=60)
+        local.set("a", 1)
+        local.set("b", 2)
+        assert local.get("a") == 1
+        local.set("c", 3)
+        assert local.get("b") is None
+        assert local.get("a") == 1
+        assert len(local) == 2
+
+    def test_ttl(self) -> None:
+        """Test that expired values are dropped."""
+        clock = FakeClock()
+        local = LocalCache[int](maxsize=10, ttl=5, clock=clock)
+        local.set("a", 1)
+        clock.now = 5
+        assert local.get("a") is None
+
+
+class TestCache:
+    """Test cases for Cache."""
+
+    @pytest.fixture
+    def clock(self) -> FakeClock:
+        """Create a fake clock."""
+        return FakeClock()
+
+    @pytest.fixture
+    def backend(self, clock: FakeClock) -> MemoryBackend:
+        """Create the shared in-memory backend."""
+        return MemoryBackend(clock)
+
+    def make_cache(self, backend: MemoryBackend | None, clock: FakeClock) -> Cache[RoadInfo]:
+        """Create a cache as one worker would."""
+        return Cache("test-road", RoadInfo, backend, ttl=60, local_ttl=1, clock=clock)
+
+    @pytest.mark.asyncio
+    async def test_l2_shared_between_workers(self, backend: MemoryBackend, clock: FakeClock) -> None:
+        """Test that a value written by one worker is read by another from L2 and kept in its L1."""
+        first, second = self.make_cache(backend, clock), self.make_cache(backend, clock)
+        value = road()
+        await first.set("a", value)
+
+        l2_hits = counter("test-road", "l2", "hit")
+        assert await second.get("a") == value
+        assert counter("test-road", "l2", "hit") == l2_hits + 1
+
+        await backend.delete_many(["test-road:a"])
+        assert await second.get("a") == value
+        clock.now = 1
+        assert await second.get("a") is None
+
+    @pytest.mark.asyncio
+    async def test_get_many(self, backend: MemoryBackend, clock: FakeClock) -> None:
+        """Test that a multi-get combines L1 hits, L2 hits and misses."""
+        cache = self.make_cache(backend, clock)
+        local_road, shared_road = road("LOCAL"), road("SHARED")
+        await cache.set_many({"local": local_road, "shared": shared_road})
+        cache.local.delete("shared")
+
+        found = await cache.get_many(["local", "shared", "missing", "local"])
+        assert found == {"local": local_road, "shared": shared_road}
+
+    @pytest.mark.asyncio
+    async def test_get_or_load(self, clock: FakeClock) -> None:
+        """Test that the loader runs once and None is not cached."""
+        cache = self.make_cache(None, clock)
+        calls: list[str] = []
+        value = road()
+
+        async def load() -> RoadInfo:
+            calls.append("load")
+            return value
+
+        async def load_none() -> None:
+            calls.append("load_none")
+
+        assert await cache.get_or_load("a", load) == value
+        assert await cache.get_or_load("a", load) == value
+        assert await cache.get_or_load("b", load_none) is None
+        assert await cache.get_or_load("b", load_none) is None
+        assert calls == ["load", "load_none", "load_none"]
+
+    @pytest.mark.asyncio
+    async def test_delete(self, backend: MemoryBackend, clock: FakeClock) -> None:
+        """Test that a delete drops both levels."""
+        cache = self.make_cache(backend, clock)
+        await cache.set("a", road())
+        await cache.delete("a")
+        assert await cache.get("a") is None
+        assert await backend.get_many(["test-road:a"]) == [None]
@@ -0,0 +1,48 @@
+"""Unit tests for the plate number search."""
+
+from pathlib import Path
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.analytics.services import CarService
+from src.commons.model_base import Base
+from src.commons.models import Car, Road
+from src.config import settings
+from src.services.db import dispose_engines
+
+PLATES = ["A123BC", "a124bc", "XA12YZ", "XY1234", "AB_100", "ABX100"]
+
+
+@pytest.mark.asyncio
+async def test_search_cars(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that prefix matches come first, then plates containing longer terms, up to the limit."""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'search.db'}"
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        road_id = (
+            await conn.execute(
+                insert(Road).values(name="R", start="A", end="B", length=1, city="City", street="S").returning(Road.id)
+            )
+        ).scalar_one()
+        await conn.execute(
+            insert(Car),
+            [{"plate_number": plate, "model": "Model", "average_speed": 50, "road_id": road_id} for plate in PLATES],
+        )
+    await engine.dispose()
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+
+    async def search(term: str, limit: int = 10) -> list[str]:
+        return [car.plate_number for car in await CarService(read_only=True).search_cars(term, limit)]
+
+    # Short terms match the start of plate numbers only.
+    assert await search("A1") == ["A123BC", "a124bc"]
+    assert await search("A12") == ["A123BC", "a124bc", "XA12YZ"]
+    assert await search("A12", limit=2) == ["A123BC", "a124bc"]
+    assert await search("123") == ["A123BC", "XY1234"]
+    # LIKE wildcards in the term are matched literally.
+    assert await search("AB_") == ["AB_100"]
+    assert await search("%") == []
+    await dispose_engines()
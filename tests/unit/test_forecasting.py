@@ -0,0 +1,122 @@
+"""Unit tests for the traffic forecaster."""
+
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.analytics import services
+from src.analytics.forecasting import TrafficForecaster
+from src.analytics.services import TrafficAnalysisService
+from src.commons.model_base import Base
+from src.commons.models import TrafficMeasurement
+from src.config import settings
+from src.services.db import PgUnitOfWork, dispose_engines
+
+START = datetime(2025, 3, 3, tzinfo=UTC)
+
+
+class TestTrafficForecaster:
+    """Test cases for TrafficForecaster."""
+
+    @pytest.fixture
+    def forecaster(self) -> TrafficForecaster:
+        """Create TrafficForecaster instance."""
+        return TrafficForecaster(slot_minutes=60, capacity=2)
+
+    def test_unknown_road(self, forecaster: TrafficForecaster) -> None:
+        """Test that roads without measurements have no forecast."""
+        assert forecaster.forecast(uuid4()) is None
+
+    def test_constant_series(self, forecaster: TrafficForecaster) -> None:
+        """Test that a flat series is forecast flat."""
+        road_id = uuid4()
+        for minute in range(0, 120, 5):
+            forecaster.update(road_id, START + timedelta(minutes=minute), speed=60, density=20)
+
+        forecast = forecaster.forecast(road_id, now=START + timedelta(minutes=120))
+        assert forecast is not None
+        assert [point.horizon_minutes for point in forecast.points] == [5, 15, 30]
+        for point in forecast.points:
+            assert point.speed == pytest.approx(60, abs=0.5)
+            assert point.density == pytest.approx(20, abs=0.5)
+
+    def test_falling_speed_trend(self, forecaster: TrafficForecaster) -> None:
+        """Test that a steady speed drop is extrapolated."""
+        road_id = uuid4()
+        for minute in range(60):
+            forecaster.update(road_id, START + timedelta(minutes=minute), speed=90 - minute, density=10)
+
+        forecast = forecaster.forecast(road_id, now=START + timedelta(minutes=59))
+        assert forecast is not None
+        speeds = [point.speed for point in forecast.points]
+        assert speeds == sorted(speeds, reverse=True)
+        assert speeds[0] < 35
+
+    def test_time_of_day_season(self, forecaster: TrafficForecaster) -> None:
+        """Test that a daily rush hour is learned by the seasonal profile."""
+        road_id = uuid4()
+        for day in range(14):
+            for hour in range(24):
+                density = 80 if hour == 8 else 10
+                forecaster.update(road_id, START + timedelta(days=day, hours=hour), speed=50, density=density)
+
+        forecast = forecaster.forecast(road_id, (60,), now=START + timedelta(days=14, hours=7))
+        quiet = forecaster.forecast(road_id, (60,), now=START + timedelta(days=14, hours=2))
+        assert forecast is not None
+        assert quiet is not None
+        assert forecast.points[0].density > quiet.points[0].density + 20
+
+    def test_growth_keeps_roads_separate(self, forecaster: TrafficForecaster) -> None:
+        """Test that growing the state arrays leaves new roads zeroed."""
+        roads = [uuid4() for _ in range(5)]
+        for index, road_id in enumerate(roads):
+            forecaster.update(road_id, START, speed=10 * (index + 1), density=index)
+
+        assert len(forecaster) == 5
+        for index, road_id in enumerate(roads):
+            forecast = forecaster.forecast(road_id, (5,), now=START)
+            assert forecast is not None
+            assert forecast.points[0].speed == pytest.approx(10 * (index + 1))
+
+
+@pytest.mark.asyncio
+async def test_follow_measurements(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that an API process folds stored measurements into its forecaster once each, in batches."""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'forecasts.db'}"
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    monkeypatch.setattr(settings, "FORECAST_FOLLOW_LAG_SECONDS", 60)
+    forecaster = TrafficForecaster(slot_minutes=60, capacity=2)
+    monkeypatch.setattr(services, "traffic_forecaster", forecaster)
+
+    now = datetime.now(UTC)
+    roads = [uuid4(), uuid4()]
+
+    async def store(*minutes_ago: int) -> None:
+        async with PgUnitOfWork() as uow:
+            for minute in minutes_ago:
+                for road_id in roads:
+                    timestamp = now - timedelta(minutes=minute)
+                    uow.add(
+                        TrafficMeasurement(
+                            road_id=road_id, timestamp=timestamp, average_speed=50, flow_rate=1, density=10
+                        )
+                    )
+
+    # The measurement of the last minute is still inside the lag.
+    await store(30, 20, 10, 0)
+    service = TrafficAnalysisService()
+    after = await service.follow_measurements((now - timedelta(minutes=25), UUID(int=0)), batch_size=3)
+    assert [forecaster.forecast(road_id).observations for road_id in roads] == [2, 2]  # pyright: ignore[reportOptionalMemberAccess]
+
+    await store(5)
+    after = await service.follow_measurements(after, batch_size=3)
+    assert [forecaster.forecast(road_id).observations for road_id in roads] == [3, 3]  # pyright: ignore[reportOptionalMemberAccess]
+    assert after[0].replace(tzinfo=UTC) == now - timedelta(minutes=5)
+    await dispose_engines()
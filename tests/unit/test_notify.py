@@ -0,0 +1,82 @@
+"""Unit tests for the traffic state change feed."""
+
+from datetime import UTC, datetime
+
+import pytest
+
+from src.analytics.handlers import EventHub, TrafficStateManager
+from src.commons.schemas import TrafficState
+from src.commons.state import State
+from src.services.notify import ChangeFeed
+
+CHANGED_AT = datetime(2025, 3, 3, 12, tzinfo=UTC)
+
+
+class TestChangeFeed:
+    """Test cases for ChangeFeed."""
+
+    @pytest.fixture
+    def received(self) -> list[TrafficState]:
+        """Collect delivered events."""
+        return []
+
+    @pytest.fixture
+    def feed(self, received: list[TrafficState]) -> ChangeFeed[TrafficState]:
+        """Create a ChangeFeed that is not listening."""
+        return ChangeFeed("traffic_state", TrafficState, received.append)
+
+    @pytest.mark.asyncio
+    async def test_publish_is_local_until_started(
+        self, feed: ChangeFeed[TrafficState], received: list[TrafficState]
+    ) -> None:
+        """Test that events are delivered in-process without a Postgres connection."""
+        message = TrafficState(state="HIGH", congestion_level=0.9, last_change=CHANGED_AT)
+        await feed.publish(message)
+        assert not feed.listening
+        assert received == [message]
+
+    @pytest.mark.asyncio
+    async def test_start_is_local_on_sqlite(self, feed: ChangeFeed[TrafficState]) -> None:
+        """Test that non Postgres databases do not start a listener."""
+        await feed.start("sqlite+aiosqlite:///:memory:")
+        assert feed._task is None
+        await feed.stop()
+
+    def test_notification_payload(self, feed: ChangeFeed[TrafficState], received: list[TrafficState]) -> None:
+        """Test that notifications are parsed and invalid payloads are skipped."""
+        message = TrafficState(state="LOW", congestion_level=0.1, last_change=CHANGED_AT)
+        feed._on_notification(None, 1, "traffic_state", message.model_dump_json())
+        feed._on_notification(None, 1, "traffic_state", "{not json")
+        assert received == [message]
+
+    @pytest.mark.asyncio
+    async def test_oversized_payload(self) -> None:
+        """Test that payloads Postgres would drop are rejected."""
+        feed = ChangeFeed("traffic_state", TrafficState, lambda _message: None)
+        with pytest.raises(ValueError, match="exceeds"):
+            await feed.publish(TrafficState(state="x" * 8000, congestion_level=0))
+
+
+class TestTrafficStateManager:
+    """Test cases for sharing TrafficStateManager state."""
+
+    def test_apply_remote_change(self) -> None:
+        """Test that a change from another worker is taken over despite the local cooldown."""
+        manager = TrafficStateManager()
+        assert manager.update_state(State("MEDIUM"))
+
+        manager.apply(TrafficState(state="HIGH", congestion_level=0.85, last_change=CHANGED_AT))
+        assert manager.get_state == "HIGH"
+        assert manager.last_state_change == CHANGED_AT
+
+        message = manager.to_message()
+        assert message.state == "HIGH"
+        assert message.congestion_level == 0.85
+        assert message.cooldown_until is not None
+
+    def test_hub_fan_out(self) -> None:
+        """Test that every WebSocket subscriber receives the change."""
+        hub: EventHub[TrafficState] = EventHub()
+        queues = [hub.subscribe(), hub.subscribe()]
+        hub.publish(TrafficState(state="LOW", congestion_level=0))
+        assert all(queue.qsize() == 1 for queue in queues)
@@ -0,0 +1,155 @@
+"""Unit tests for the origin-destination matrix job."""
+
+from datetime import UTC, datetime, timedelta
+from itertools import pairwise
+from pathlib import Path
+from uuid import UUID, uuid4
+
+import numpy as np
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.analytics.od_matrix import (
+    PairCounter,
+    SliceTask,
+    _lookup_zones,
+    _share_snapshot,
+    compute_od_matrix,
+    time_slices,
+)
+from src.analytics.services import OdMatrixService, TrajectoryService
+from src.analytics.trajectories import to_road_keys
+from src.commons.enums import JobStatus, OdLevel
+from src.commons.model_base import Base
+from src.commons.models import Car, CarSighting, Road
+from src.config import settings
+from src.services.db import dispose_engines, engine_options
+
+START = datetime(2025, 3, 3, 6, tzinfo=UTC)
+
+
+def test_pair_counter() -> None:
+    """Test that buffered and merged counts match counting every pair."""
+    rng = np.random.default_rng(3)
+    origins, destinations = rng.integers(0, 20, 5000), rng.integers(0, 20, 5000)
+    counter = PairCounter(zones=20, buffer_size=700)
+    for offset in range(0, 4000, 100):
+        counter.add(origins[offset : offset + 100], destinations[offset : offset + 100])
+    other = PairCounter(zones=20)
+    other.add(origins[4000:], destinations[4000:])
+    counter.merge(*other.result())
+
+    keys, counts = counter.result()
+    expected = np.zeros((20, 20), dtype=np.int64)
+    np.add.at(expected, (origins, destinations), 1)
+    assert counts.sum() == 5000
+    assert dict(zip(keys.tolist(), counts.tolist(), strict=True)) == {
+        int(key): int(count) for key, count in enumerate(expected.ravel()) if count
+    }
+
+
+def test_time_slices() -> None:
+    """Test that slices cover the range without overlap, the last one shorter."""
+    slices = list(time_slices(START, START + timedelta(hours=5), timedelta(hours=2)))
+    assert [(end - start).total_seconds() / 3600 for start, end in slices] == [2, 2, 1]
+    assert all(previous[1] == current[0] for previous, current in pairwise(slices))
+
+
+def test_lookup_zones() -> None:
+    """Test that roads missing from the road table, or all of them, map to no zone."""
+    known, deleted = np.sort(to_road_keys([uuid4(), uuid4()])), to_road_keys([uuid4()])
+    task = SliceTask("", START, START, known, np.array([4, 7]), 8, 0, timedelta(), 1)
+    keys = np.concatenate([deleted, known[::-1]])
+    assert _lookup_zones(task, keys).tolist() == [-1, 7, 4]
+    empty = SliceTask("", START, START, known[:0], np.empty(0, dtype=np.int64), 0, 0, timedelta(), 1)
+    assert _lookup_zones(empty, keys).tolist() == [-1, -1, -1]
+
+
+@pytest.mark.asyncio
+async def test_share_snapshot(create_car: Car) -> None:
+    """Test that both slice connections miss a sighting committed after the snapshot was taken."""
+    url = settings.db_url_postgresql
+    engine = create_async_engine(url, **engine_options(url))
+    plate = f"SNAP{uuid4().hex[:8]}"
+    count = select(func.count()).select_from(CarSighting).where(CarSighting.plate_number == plate)
+    try:
+        async with engine.connect() as first, engine.connect() as second:
+            await _share_snapshot(first, second)
+            async with engine.begin() as other:
+                await other.execute(
+                    insert(CarSighting).values(
+                        plate_number=plate, road_id=create_car.road_id, timestamp=START, speed=50
+                    )
+                )
+            assert (await first.execute(count)).scalar_one() == 0
+            assert (await second.execute(count)).scalar_one() == 0
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_compute_od_matrix(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that trips crossing slice ends are counted once, by origin and destination zone."""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'od.db'}"
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        roads: list[UUID] = [
+            (
+                await conn.execute(
+                    insert(Road)
+                    .values(name=f"R{i}", start="A", end="B", length=1, city="City", street=f"Street {i // 2}")
+                    .returning(Road.id)
+                )
+            ).scalar_one()
+            for i in range(4)
+        ]
+
+        def trip(plate: str, path: list[int], start: datetime) -> list[dict]:
+            return [
+                {
+                    "plate_number": plate,
+                    "road_id": roads[road],
+                    "timestamp": start + i * timedelta(minutes=5),
+                    "speed": 40,
+                }
+                for i, road in enumerate(path)
+            ]
+
+        await conn.execute(
+            insert(CarSighting),
+            # Two trips of one car 2 hours apart, the second across the end of the first slice.
+            trip("A1", [0, 1, 2], START)
+            + trip("A1", [3, 2, 1, 0], START + timedelta(hours=2, minutes=50))
+            # A car that drives through the start of the range is not counted.
+            + trip("B2", [1, 1, 3], START - timedelta(minutes=10))
+            + trip("C3", [0, 1, 2], START + timedelta(minutes=30))
+            + trip("D4", [2, 2], START + timedelta(hours=7)),
+        )
+    await engine.dispose()
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    monkeypatch.setattr(settings, "OD_SLICE_HOURS", 3)
+    # Part of the sightings are read from compacted chunks.
+    await TrajectoryService().compact_all(START + timedelta(hours=1))
+
+    job_id = await compute_od_matrix(START, START + timedelta(hours=6), OdLevel.ROAD, workers=0)
+    matrix = await OdMatrixService().get_matrix(job_id, limit=10)
+    assert matrix.job.status == JobStatus.DONE
+    assert matrix.job.trips == 3
+    counts = {
+        (roads.index(UUID(origin)), roads.index(UUID(destination))): trips
+        for origin, destination, trips in zip(matrix.origin, matrix.destination, matrix.trips, strict=True)
+    }
+    assert counts == {(0, 2): 2, (3, 0): 1}
+
+    job_id = await compute_od_matrix(START, START + timedelta(hours=6), OdLevel.STREET, workers=2)
+    matrix = await OdMatrixService().get_matrix(job_id, limit=10, origin="City/Street 0")
+    assert list(zip(matrix.origin, matrix.destination, matrix.trips, strict=True)) == [
+        ("City/Street 0", "City/Street 1", 2)
+    ]
+    assert [job.level for job in await OdMatrixService().get_jobs(limit=5)] == [OdLevel.STREET, OdLevel.ROAD]
+
+    with pytest.raises(ValueError, match="not found"):
+        await OdMatrixService().get_matrix(roads[0], limit=10)
+    await dispose_engines()
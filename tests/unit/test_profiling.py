@@ -0,0 +1,44 @@
+"""Unit tests for request and message profiling."""
+
+from pathlib import Path
+
+import pytest
+
+from src.services import profiling
+from src.services.profiling import CProfileProfile, ProfileStore
+
+
+class TestProfileStore:
+    """Test cases for ProfileStore."""
+
+    def test_list_skips_foreign_files(self, tmp_path: Path) -> None:
+        """Test that files not written by the store are left out of the listing."""
+        store = ProfileStore(str(tmp_path), keep=5)
+        profile = CProfileProfile()
+        profile.start()
+        profile.stop()
+        saved = store.save("http", "GET /traffic", profile)
+        (tmp_path / "notes.html").write_text("")
+        (tmp_path / "x-y-z.pstats").write_text("")
+
+        assert [info.name for info in store.list()] == [saved.name]
+        assert store.list()[0].label == "GET_traffic"
+
+
+@pytest.mark.asyncio
+async def test_failed_save_keeps_error(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a profile that cannot be stored neither replaces the handler's error nor its result."""
+    # A file where the directory should be makes every save fail.
+    blocked = tmp_path / "profiles"
+    blocked.write_text("")
+    monkeypatch.setattr(profiling, "profile_store", ProfileStore(str(blocked), keep=5))
+
+    async def fail() -> None:
+        raise LookupError("handler")
+
+    async def succeed() -> int:
+        return 7
+
+    with pytest.raises(LookupError, match="handler"):
+        await profiling._run_profiled("kafka", "car", fail)
+    assert await profiling._run_profiled("kafka", "car", succeed) == 7
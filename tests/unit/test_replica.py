@@ -0,0 +1,94 @@
+"""Unit tests for read replica routing with two database URLs."""
+
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.commons.model_base import Base
+from src.commons.models import Road
+from src.config import settings
+from src.services.db import PgUnitOfWork, ReadOnlyUnitOfWorkError, ReplicaRouter, replica_router
+
+
+async def create_database(url: str, road_name: str) -> None:
+    """Create the schema and a single road named after the database."""
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Road).values(name=road_name, start="A", end="B", length=1000, city="City", street="Street")
+        )
+    await engine.dispose()
+
+
+async def road_names(uow: PgUnitOfWork) -> list[str]:
+    """Read the road names through a unit of work."""
+    async with uow:
+        result = await uow.execute(select(Road.name))
+        return list(result.scalars())
+
+
+class TestReplicaRouting:
+    """Test cases for read-only units of work."""
+
+    @pytest_asyncio.fixture
+    async def databases(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> tuple[str, str]:
+        """Create a primary and a replica database and point the settings at them."""
+        primary = f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}"
+        replica = f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"
+        await create_database(primary, "PRIMARY")
+        await create_database(replica, "REPLICA")
+        monkeypatch.setattr(settings, "DATABASE_URL", primary)
+        monkeypatch.setattr(replica_router, "replica_url", replica)
+        monkeypatch.setattr(replica_router, "_unavailable_until", 0.0)
+        return primary, replica
+
+    @pytest.mark.asyncio
+    async def test_reads_are_routed(self, databases: tuple[str, str]) -> None:
+        """Test that only read-only units of work go to the replica."""
+        assert await road_names(PgUnitOfWork(read_only=True)) == ["REPLICA"]
+        assert await road_names(PgUnitOfWork()) == ["PRIMARY"]
+
+    @pytest.mark.asyncio
+    async def test_without_replica(self, databases: tuple[str, str], monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that read-only units of work use the primary when no replica is configured."""
+        monkeypatch.setattr(replica_router, "replica_url", None)
+        assert await road_names(PgUnitOfWork(read_only=True)) == ["PRIMARY"]
+
+    @pytest.mark.asyncio
+    async def test_fallback_to_primary(
+        self, databases: tuple[str, str], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that an unreachable replica falls back to the primary and is skipped afterwards."""
+        monkeypatch.setattr(replica_router, "replica_url", f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'db'}")
+        uow = PgUnitOfWork(read_only=True)
+        assert await road_names(uow) == ["PRIMARY"]
+        assert not uow.on_replica
+        assert not replica_router.use_replica
+
+    @pytest.mark.asyncio
+    async def test_writes_are_refused(self, databases: tuple[str, str]) -> None:
+        """Test that a read-only unit of work cannot write, surfaced as a 400 like other database errors."""
+        uow = PgUnitOfWork(read_only=True)
+        with pytest.raises(HTTPException, match="read-only"):
+            async with uow:
+                await uow.execute(insert(Road).values(name="X", start="A", end="B", length=1, city="C", street="S"))
+
+        with pytest.raises(ReadOnlyUnitOfWorkError):
+            uow.add(Road())
+
+
+def test_router_retry_period() -> None:
+    """Test that the replica is used again once the retry period is over."""
+    now = [0.0]
+    router = ReplicaRouter("postgresql+asyncpg://replica/db", retry_seconds=30, clock=lambda: now[0])
+    assert router.use_replica
+    router.mark_unavailable()
+    now[0] = 29
+    assert not router.use_replica
+    now[0] = 30
+    assert router.use_replica
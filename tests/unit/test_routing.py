@@ -0,0 +1,129 @@
+"""Unit tests for road network routing."""
+
+from uuid import UUID, uuid4
+
+import pytest
+
+from src.analytics.routing import RoadEdge, RoadGraph, RoadNetwork
+
+SPEED = 60.0  # km/h, one minute per km
+
+
+def edge(start: str, end: str, length: float) -> RoadEdge:
+    """Build a road driven at SPEED."""
+    return RoadEdge(road_id=uuid4(), start=start, end=end, length=length, free_speed=SPEED)
+
+
+class TestRoadGraph:
+    """Test cases for RoadGraph."""
+
+    @pytest.fixture
+    def roads(self) -> dict[str, RoadEdge]:
+        """A square A-B-D / A-C-D with a slightly longer lower side and an isolated road."""
+        return {
+            "AB": edge("A", "B", 1),
+            "BD": edge("B", "D", 1),
+            "AC": edge("A", "C", 1),
+            "CD": edge("C", "D", 1.5),
+            "XY": edge("X", "Y", 1),
+        }
+
+    @pytest.fixture
+    def graph(self, roads: dict[str, RoadEdge]) -> RoadGraph:
+        """Build the graph of the roads."""
+        return RoadGraph(roads.values(), threshold=0.2)
+
+    @staticmethod
+    def road_names(roads: dict[str, RoadEdge], road_ids: list[UUID]) -> list[str]:
+        names = {road.road_id: name for name, road in roads.items()}
+        return [names[road_id] for road_id in road_ids]
+
+    def test_csr_layout(self, graph: RoadGraph) -> None:
+        """Test that every road is an arc in both directions, grouped by source node."""
+        assert len(graph) == 5
+        assert graph.indptr[-1] == len(graph.indices) == 10
+        a, b, c = graph.nodes["A"], graph.nodes["B"], graph.nodes["C"]
+        assert sorted(graph.indices[graph.indptr[a] : graph.indptr[a + 1]].tolist()) == sorted([b, c])
+
+    def test_fastest_route(self, graph: RoadGraph, roads: dict[str, RoadEdge]) -> None:
+        """Test the path, length and ETA of the fastest route, in both directions."""
+        route = graph.route("A", "D")
+        assert route is not None
+        assert self.road_names(roads, route.road_ids) == ["AB", "BD"]
+        assert route.length == pytest.approx(2)
+        assert route.travel_time_seconds == pytest.approx(120)
+        assert not route.cached
+
+        back = graph.route("D", "A")
+        assert back is not None
+        assert self.road_names(roads, back.road_ids) == ["BD", "AB"]
+
+    def test_unknown_and_unreachable(self, graph: RoadGraph) -> None:
+        """Test that unknown nodes and disconnected parts have no route."""
+        assert graph.route("A", "Z") is None
+        assert graph.route("A", "X") is None
+        route = graph.route("A", "A")
+        assert route is not None
+        assert route.road_ids == []
+
+    def test_cached_route_keeps_live_eta(self, graph: RoadGraph, roads: dict[str, RoadEdge]) -> None:
+        """Test that small speed changes keep the cached path but update its ETA."""
+        graph.route("A", "D")
+        assert not graph.update_speed(roads["AB"].road_id, 55)
+        route = graph.route("A", "D")
+        assert route is not None
+        assert route.cached
+        assert route.travel_time_seconds == pytest.approx(60 * 60 / 55 + 60)
+
+    def test_slowdown_drops_routes_through_road(self, graph: RoadGraph, roads: dict[str, RoadEdge]) -> None:
+        """Test that a road slowing down past the threshold reroutes the paths using it only."""
+        graph.route("A", "D")
+        graph.route("X", "Y")
+        assert graph.update_speed(roads["AB"].road_id, 20)
+
+        route = graph.route("A", "D")
+        assert route is not None
+        assert not route.cached
+        assert self.road_names(roads, route.road_ids) == ["AC", "CD"]
+        other = graph.route("X", "Y")
+        assert other is not None
+        assert other.cached
+
+    def test_speedup_clears_cache(self, graph: RoadGraph, roads: dict[str, RoadEdge]) -> None:
+        """Test that a road getting faster past the threshold can reroute any path."""
+        graph.route("A", "D")
+        assert graph.update_speed(roads["CD"].road_id, 120)
+
+        route = graph.route("A", "D")
+        assert route is not None
+        assert not route.cached
+        assert self.road_names(roads, route.road_ids) == ["AC", "CD"]
+
+    def test_zero_speed_is_free_flow(self, graph: RoadGraph, roads: dict[str, RoadEdge]) -> None:
+        """Test that a road without traffic is weighted at its free flow speed."""
+        graph.update_speed(roads["AB"].road_id, 20)
+        graph.update_speed(roads["AB"].road_id, 0)
+        assert graph.weights[graph.road_ids.index(roads["AB"].road_id)] == pytest.approx(60)
+
+
+class TestRoadNetwork:
+    """Test cases for RoadNetwork."""
+
+    @pytest.mark.asyncio
+    async def test_rebuild(self) -> None:
+        """Test that the graph is built once, then again when invalidated or too old."""
+        now = [0.0]
+        network = RoadNetwork(max_age=60, clock=lambda: now[0])
+        loads: list[int] = []
+
+        async def load() -> list[RoadEdge]:
+            loads.append(1)
+            return [edge("A", "B", 1)]
+
+        graph = await network.get(load)
+        assert await network.get(load) is graph
+        network.invalidate()
+        assert await network.get(load) is not graph
+        now[0] = 60
+        await network.get(load)
+        assert len(loads) == 3
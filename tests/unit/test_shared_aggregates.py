@@ -0,0 +1,134 @@
+"""Unit tests for the shared memory road aggregates."""
+
+import multiprocessing
+from datetime import UTC, datetime, timedelta
+from multiprocessing.shared_memory import SharedMemory
+from uuid import UUID, uuid4
+
+import numpy as np
+import pytest
+
+from src.analytics import shared_aggregates as module
+from src.analytics.shared_aggregates import HEADER, MAGIC, Segment, SharedAggregates
+
+START = datetime(2025, 3, 3, 8, tzinfo=UTC)
+ROAD = UUID(int=7)
+
+
+@pytest.fixture
+def name() -> str:
+    """Unique segment names, released by the aggregates of each test."""
+    return f"dip-test-{uuid4().hex[:12]}"
+
+
+def hammer(name: str, updates: int) -> None:
+    """Publish measurements whose speed always equals their density."""
+    writer = SharedAggregates(name, writers=1, capacity=16)
+    writer.open_writer()
+    try:
+        for i in range(updates):
+            writer.add(ROAD, START + timedelta(seconds=i), float(i), float(i))
+    finally:
+        writer.close()
+
+
+class TestSharedAggregates:
+    """Test cases for SharedAggregates."""
+
+    def test_totals_over_writers(self, name: str, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that a reader adds up the totals of every writer and keeps the latest measurement."""
+        monkeypatch.setattr(module, "REFRESH_SECONDS", 0)
+        first, second, reader = (SharedAggregates(name, writers=2, capacity=4) for _ in range(3))
+        try:
+            assert first.open_writer()
+            assert second.open_writer()
+            assert not SharedAggregates(name, writers=2, capacity=4).open_writer()
+
+            roads = [ROAD, *(uuid4() for _ in range(3))]
+            for road_id in roads:
+                first.add(road_id, START, 40, 10)
+            second.add(ROAD, START + timedelta(minutes=1), 20, 30)
+            # The slot table is full, a fifth road is not published.
+            first.add(uuid4(), START, 50, 5)
+
+            aggregates = reader.read([*roads, uuid4()])
+            assert set(aggregates) == set(roads)
+            live = aggregates[ROAD]
+            assert (live.count, live.average_speed, live.average_density) == (2, 30, 20)
+            assert (live.speed, live.density, live.updated_at) == (20, 30, START + timedelta(minutes=1))
+
+            second.close()
+            assert reader.read([ROAD])[ROAD].count == 1
+        finally:
+            for aggregates in (first, second, reader):
+                aggregates.close()
+
+    def test_stale_segment(self, name: str, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that readers skip the segment of a killed writer and a new writer takes it over."""
+        monkeypatch.setattr(module, "REFRESH_SECONDS", 0)
+        # What a killed writer leaves behind: a complete segment that nobody beats or releases.
+        shm = SharedMemory(name=f"{name}-0", create=True, size=Segment.size(4), track=False)
+        header = np.ndarray((), dtype=HEADER, buffer=shm.buf)
+        header["capacity"], header["token"], header["pid"], header["magic"] = 4, 1, 4321, MAGIC
+        header["heartbeat_ms"] = module.now_ms() - 60_000
+        del header
+        dead = Segment(shm)
+        dead.add(dead.find(ROAD, claim=True), START, 90, 90)
+        dead.close()
+
+        writer, reader = (SharedAggregates(name, writers=1, capacity=4) for _ in range(2))
+        try:
+            assert reader.read([ROAD]) == {}
+            assert writer.open_writer()
+            writer.add(ROAD, START, 40, 10)
+            live = reader.read([ROAD])[ROAD]
+            assert (live.count, live.speed) == (1, 40)
+        finally:
+            for aggregates in (writer, reader):
+                aggregates.close()
+
+    def test_taken_over_writer(self, name: str, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that a writer whose segment was taken over while it stalled claims another one."""
+        monkeypatch.setattr(module, "REFRESH_SECONDS", 0)
+        stalled, other, reader = (SharedAggregates(name, writers=2, capacity=4) for _ in range(3))
+        try:
+            assert stalled.open_writer()
+            # The stalled writer missed its heartbeats, so the other one takes its segment.
+            monkeypatch.setattr(module, "STALE_SECONDS", -1)
+            assert other.open_writer()
+            monkeypatch.setattr(module, "STALE_SECONDS", 10)
+
+            assert stalled.beat()
+            stalled.add(ROAD, START, 40, 10)
+            other.add(ROAD, START, 20, 30)
+            assert reader.read([ROAD])[ROAD].count == 2
+
+            # Releasing the second segment leaves the one taken over alone.
+            stalled.close()
+            assert reader.read([ROAD])[ROAD].speed == 20
+            assert not SharedAggregates(name, writers=1, capacity=4).open_writer()
+        finally:
+            for aggregates in (stalled, other, reader):
+                aggregates.close()
+
+    def test_reads_are_consistent(self, name: str, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that a reader in another process never sees a half written slot."""
+        monkeypatch.setattr(module, "REFRESH_SECONDS", 0)
+        writer = multiprocessing.get_context("fork").Process(target=hammer, args=(name, 50_000))
+        reader = SharedAggregates(name, writers=1, capacity=16)
+        writer.start()
+        reads = 0
+        try:
+            while writer.is_alive():
+                live = reader.read([ROAD]).get(ROAD)
+                if live is None:
+                    continue
+                reads += 1
+                assert live.speed == live.density
+                assert live.average_speed == live.average_density
+                assert live.average_speed == pytest.approx((live.count - 1) / 2)
+        finally:
+            writer.join()
+            reader.close()
+        assert writer.exitcode == 0
+        assert reads > 0
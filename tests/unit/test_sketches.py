@@ -0,0 +1,172 @@
+"""Unit tests for speed quantile sketches."""
+
+import json
+import random
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+import numpy as np
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.analytics import services
+from src.analytics.services import TrafficAnalysisService
+from src.analytics.sketches import DDSketch, SpeedSketchStore
+from src.commons.model_base import Base
+from src.commons.models import Road, RoadCapacity
+from src.config import settings
+from src.services.db import PgUnitOfWork, dispose_engines
+
+NOW = datetime(2025, 3, 3, 12, tzinfo=UTC)
+
+
+class TestDDSketch:
+    """Test cases for DDSketch."""
+
+    def test_relative_accuracy(self) -> None:
+        """Test that quantiles stay within the relative accuracy of exact ones."""
+        rng = random.Random(7)
+        speeds = [rng.lognormvariate(4, 0.3) for _ in range(10_000)]
+        sketch = DDSketch(relative_accuracy=0.01)
+        for speed in speeds:
+            sketch.add(speed)
+
+        for q in (0.15, 0.5, 0.85, 0.99):
+            exact = float(np.quantile(speeds, q, method="lower"))
+            assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+
+    def test_empty_and_zero(self) -> None:
+        """Test the empty sketch and the zero bucket."""
+        sketch = DDSketch()
+        assert sketch.quantile(0.5) is None
+        sketch.add(0)
+        sketch.add(0)
+        sketch.add(50)
+        assert sketch.quantile(0.5) == 0
+        assert sketch.quantile(1) == pytest.approx(50, rel=0.01)
+
+    def test_merge_matches_single_sketch(self) -> None:
+        """Test that merging two halves equals sketching everything at once."""
+        whole, first, second = DDSketch(), DDSketch(), DDSketch()
+        for speed in range(1, 200):
+            whole.add(speed)
+            (first if speed % 2 else second).add(speed)
+        first.merge(second)
+
+        assert first.count == whole.count
+        for q in (0.15, 0.5, 0.85):
+            assert first.quantile(q) == whole.quantile(q)
+
+    def test_merge_rejects_different_accuracy(self) -> None:
+        """Test that sketches with different accuracy are not merged."""
+        with pytest.raises(ValueError, match="relative accuracy"):
+            DDSketch(0.01).merge(DDSketch(0.02))
+
+    def test_serialization_round_trip(self) -> None:
+        """Test that a sketch survives a JSON round trip."""
+        sketch = DDSketch()
+        for speed in (0, 12.5, 60, 61, 130):
+            sketch.add(speed)
+
+        restored = DDSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+        assert restored.count == sketch.count
+        assert restored.quantile(0.85) == sketch.quantile(0.85)
+
+    def test_collapse_keeps_high_quantiles(self) -> None:
+        """Test that collapsing low buckets keeps the count and the upper quantiles."""
+        sketch = DDSketch(max_bins=10)
+        for speed in range(1, 101):
+            sketch.add(speed)
+        assert sketch.count == 100
+        assert sketch.quantile(1) == pytest.approx(100, rel=0.01)
+
+
+class TestSpeedSketchStore:
+    """Test cases for SpeedSketchStore."""
+
+    @pytest.fixture
+    def store(self) -> SpeedSketchStore:
+        """Create SpeedSketchStore instance."""
+        return SpeedSketchStore(bucket_minutes=5, retention_minutes=60)
+
+    def test_window(self, store: SpeedSketchStore) -> None:
+        """Test that only buckets inside the window are merged."""
+        road_id = uuid4()
+        store.add(road_id, 100, NOW - timedelta(minutes=30))
+        for speed in (40, 50, 60):
+            store.add(road_id, speed, NOW)
+
+        assert store.window(road_id, 10, now=NOW).count == 3
+        assert store.window(road_id, 60, now=NOW).count == 4
+        assert store.window(uuid4(), 60, now=NOW).count == 0
+
+    def test_retention(self, store: SpeedSketchStore) -> None:
+        """Test that buckets older than the retention are dropped."""
+        road_id = uuid4()
+        store.add(road_id, 50, NOW - timedelta(hours=2))
+        store.add(road_id, 50, NOW)
+        assert len(store.export(road_id)) == 1
+
+    def test_merge_from_other_worker(self, store: SpeedSketchStore) -> None:
+        """Test that exported buckets merge into another store."""
+        road_id = uuid4()
+        other = SpeedSketchStore(bucket_minutes=5, retention_minutes=60)
+        store.add(road_id, 40, NOW)
+        other.add(road_id, 80, NOW)
+
+        store.merge(road_id, json.loads(json.dumps(other.export(road_id))))
+        merged = store.window(road_id, 5, now=NOW)
+        assert merged.count == 2
+        assert merged.quantile(1) == pytest.approx(80, rel=0.01)
+
+    def test_changes(self, store: SpeedSketchStore) -> None:
+        """Test that only the buckets counted into since the last call are exported."""
+        road_id = uuid4()
+        store.add(road_id, 40, NOW - timedelta(minutes=10))
+        store.add(road_id, 50, NOW)
+        assert store.changes() == {road_id: store.export(road_id)}
+        assert store.changes() == {}
+
+        store.add(road_id, 60, NOW)
+        changes = store.changes()
+        assert list(changes[road_id]) == [store.buckets(5, NOW).start]
+        store.mark_changed(changes)
+        assert store.changes() == changes
+
+
+@pytest.mark.asyncio
+async def test_percentiles_merge_workers(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that percentiles merge the sketches flushed by two ingestion processes, counting each once."""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'sketches.db'}"
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+
+    road = Road(name="A1", start="A", end="B", length=1.0, city="City", street="Street")
+    async with PgUnitOfWork() as uow:
+        uow.add(road)
+        await uow.flush()
+        uow.add(RoadCapacity(road_id=road.id, name="A1", lanes=2, speed_limit=60, max_capacity=2000))
+
+    now = datetime.now(UTC)
+    first, second, api = (SpeedSketchStore(bucket_minutes=5, retention_minutes=60) for _ in range(3))
+    for speed in range(1, 51):
+        first.add(road.id, speed, now)
+        second.add(road.id, speed + 50, now - timedelta(minutes=5))
+    for store in (first, second):
+        monkeypatch.setattr(services, "speed_sketches", store)
+        assert await TrafficAnalysisService().flush_speed_sketches() == 1
+        assert await TrafficAnalysisService().flush_speed_sketches() == 0
+
+    # An API process without sketches of its own and an ingestion process see the same counts.
+    for store in (api, first):
+        monkeypatch.setattr(services, "speed_sketches", store)
+        percentiles = await TrafficAnalysisService().speed_percentiles(road.id, minutes=60)
+        assert percentiles.count == 100
+        assert percentiles.p50 == pytest.approx(50, rel=0.01)
+        assert percentiles.p85 == pytest.approx(85, rel=0.01)
+        assert percentiles.p85_over_limit
+    await dispose_engines()
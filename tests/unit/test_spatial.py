@@ -0,0 +1,187 @@
+"""Unit tests for the road spatial index."""
+
+import random
+from datetime import UTC, datetime, timedelta
+from uuid import UUID, uuid4
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from src.analytics.spatial import KM_PER_DEGREE, GridIndex, RoadLocation, RoadLocator
+from src.commons.project_utils import haversine
+from src.commons.schemas import CarCreate
+
+# Around Moscow, where a degree of longitude is about 56 km.
+LATITUDE, LONGITUDE = 55.75, 37.62
+
+
+def location(north_km: float, east_km: float) -> RoadLocation:
+    """A road reference point at an offset from the center, in km."""
+    return RoadLocation(
+        road_id=uuid4(),
+        latitude=LATITUDE + north_km / KM_PER_DEGREE,
+        longitude=LONGITUDE + east_km / (KM_PER_DEGREE * np.cos(np.radians(LATITUDE))),
+    )
+
+
+def test_haversine() -> None:
+    """Test distances of scalars and arrays."""
+    assert haversine(0, 0, 0, 1) == pytest.approx(KM_PER_DEGREE)
+    assert haversine(55.7558, 37.6173, 59.9343, 30.3351) == pytest.approx(634, rel=0.01)
+    distances = haversine(LATITUDE, LONGITUDE, np.array([LATITUDE, LATITUDE + 1]), np.array([LONGITUDE, LONGITUDE]))
+    assert distances.tolist() == pytest.approx([0, KM_PER_DEGREE])
+
+
+class TestGridIndex:
+    """Test cases for GridIndex."""
+
+    def test_within(self) -> None:
+        """Test that roads within the radius are returned nearest first."""
+        near, middle, far = location(0.2, 0), location(0, -0.9), location(3, 3)
+        index = GridIndex([far, middle, near], cell_km=0.5)
+
+        found = index.within(LATITUDE, LONGITUDE, 1)
+        assert [road.road_id for road in found] == [near.road_id, middle.road_id]
+        assert found[0].distance_km == pytest.approx(0.2, rel=0.01)
+        assert index.within(LATITUDE, LONGITUDE, 0.1) == []
+
+    def test_nearest(self) -> None:
+        """Test the nearest road search and its maximum distance."""
+        target = location(2.5, -1)
+        index = GridIndex([location(6, 6), target], cell_km=0.5)
+
+        nearest = index.nearest(LATITUDE, LONGITUDE, 5)
+        assert nearest is not None
+        assert nearest.road_id == target.road_id
+        assert index.nearest(LATITUDE, LONGITUDE, 2) is None
+        assert GridIndex([]).nearest(LATITUDE, LONGITUDE, 5) is None
+
+    def test_matches_brute_force(self) -> None:
+        """Test that the grid finds the same roads as checking every road."""
+        rng = random.Random(7)
+        locations = [location(rng.uniform(-20, 20), rng.uniform(-20, 20)) for _ in range(2000)]
+        index = GridIndex(locations, cell_km=1)
+        latitudes = np.array([road.latitude for road in locations])
+        longitudes = np.array([road.longitude for road in locations])
+
+        for _ in range(20):
+            point = location(rng.uniform(-20, 20), rng.uniform(-20, 20))
+            distances = haversine(point.latitude, point.longitude, latitudes, longitudes)
+            expected = {locations[i].road_id for i in np.flatnonzero(distances <= 1.5)}
+            assert {road.road_id for road in index.within(point.latitude, point.longitude, 1.5)} == expected
+            nearest = index.nearest(point.latitude, point.longitude, 50)
+            assert nearest is not None
+            assert nearest.road_id == locations[int(np.argmin(distances))].road_id
+
+
+class TestBbox:
+    """Test cases for viewport queries."""
+
+    @pytest.fixture
+    def index(self) -> GridIndex:
+        """Three roads close together in the center and one far east."""
+        locations = [location(0, 0), location(0.1, 0.1), location(-0.1, 0.05), location(0, 30)]
+        index = GridIndex(locations, cell_km=1)
+        index.set_state(locations[0].road_id, 20, 0.9, "HIGH")
+        index.set_state(locations[1].road_id, 50, 0.3, "LOW")
+        return index
+
+    def test_roads(self, index: GridIndex) -> None:
+        """Test that zoomed in viewports return every road inside the box as columns."""
+        result = index.bbox(LATITUDE - 0.01, LONGITUDE - 0.01, LATITUDE + 0.01, LONGITUDE + 0.01, 15, 14, 100)
+        assert result.total == 3
+        assert result.clusters is None
+        assert result.roads is not None
+        states = dict(zip(result.roads.road_id, result.roads.state, strict=True))
+        assert sorted(states.values(), key=str) == ["HIGH", "LOW", None]
+        assert sorted(result.roads.congestion_level, key=lambda level: level or 0) == [None, 0.3, 0.9]
+
+    def test_clusters(self, index: GridIndex) -> None:
+        """Test that zoomed out viewports, or too many roads, are clustered."""
+        result = index.bbox(LATITUDE - 1, LONGITUDE - 1, LATITUDE + 1, LONGITUDE + 1, 10, 14, 100)
+        assert result.total == 4
+        assert result.roads is None
+        assert result.clusters is not None
+        assert sorted(result.clusters.count) == [1, 3]
+        center = result.clusters.count.index(3)
+        assert result.clusters.congestion_level[center] == pytest.approx(0.6)
+        assert result.clusters.max_congestion_level[center] == pytest.approx(0.9)
+        assert None in result.clusters.congestion_level
+
+        crowded = index.bbox(LATITUDE - 1, LONGITUDE - 1, LATITUDE + 1, LONGITUDE + 1, 16, 14, 2)
+        assert crowded.clusters is not None
+
+    @pytest.mark.asyncio
+    async def test_refresh_states(self, index: GridIndex) -> None:
+        """Test that states are loaded in full first, then incrementally and at most once per period."""
+        now = [0.0]
+        locator = RoadLocator(cell_km=1, state_max_age=2, roads_max_age=10, clock=lambda: now[0])
+        road_id = index.road_ids[2]
+        updated_at = datetime(2025, 3, 3, 12, tzinfo=UTC)
+        calls: list[datetime | None] = []
+
+        async def load_changes(since: datetime | None) -> list[tuple[UUID, float, float, str, datetime]]:
+            calls.append(since)
+            return [(road_id, 10.0, 0.5, "MEDIUM", updated_at)]
+
+        await locator.refresh_states(index, load_changes)  # pyright: ignore[reportArgumentType]
+        await locator.refresh_states(index, load_changes)  # pyright: ignore[reportArgumentType]
+        now[0] = 2
+        await locator.refresh_states(index, load_changes)  # pyright: ignore[reportArgumentType]
+
+        assert calls[0] is None
+        assert calls[1] is not None
+        assert calls[1] < updated_at < calls[1] + timedelta(seconds=10)
+        assert len(calls) == 2
+        assert index.states[2] == 1
+        assert index.congestion[2] == 0.5
+
+
+class TestRoadLocator:
+    """Test cases for RoadLocator."""
+
+    @pytest.mark.asyncio
+    async def test_rebuilds_after_roads_changed_elsewhere(self) -> None:
+        """Test that the index is rebuilt once the road table version changes, checked once per period."""
+        now = [0.0]
+        locator = RoadLocator(cell_km=1, state_max_age=2, roads_max_age=10, clock=lambda: now[0])
+        roads = [location(0, 0)]
+        version = [(1, None, None)]
+        loads: list[int] = []
+        checks: list[int] = []
+
+        async def load() -> list[RoadLocation]:
+            loads.append(len(roads))
+            return list(roads)
+
+        async def load_version() -> tuple:
+            checks.append(len(roads))
+            return version[0]
+
+        first = await locator.get(load, load_version)
+        roads.append(location(1, 1))
+        version[0] = (2, None, None)
+        assert await locator.get(load, load_version) is first
+
+        now[0] = 10
+        second = await locator.get(load, load_version)
+        assert second is not first
+        assert len(second.road_ids) == 2
+
+        now[0] = 20
+        assert await locator.get(load, load_version) is second
+        assert loads == [1, 2]
+        assert len(checks) == 3
+
+        locator.invalidate()
+        assert await locator.get(load, load_version) is not second
+
+
+def test_sensor_location_required() -> None:
+    """Test that sensor data needs a road or both coordinates."""
+    CarCreate(plate_number="A1", model="m", average_speed=50, latitude=LATITUDE, longitude=LONGITUDE)
+    with pytest.raises(ValidationError, match="road_id"):
+        CarCreate(plate_number="A1", model="m", average_speed=50)
+    with pytest.raises(ValidationError, match="together"):
+        CarCreate(plate_number="A1", model="m", average_speed=50, road_id=uuid4(), latitude=LATITUDE)
@@ -0,0 +1,71 @@
+"""Unit tests for the application startup."""
+
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.admin import mount_admin
+from src.analytics.kafka_handler import broker
+from src.config import settings
+from src.main import lifespan
+
+ROOT = Path(__file__).parents[2]
+# Cumulative import time of src.main under -X importtime, which adds some overhead.
+# About 0.9 s on one core, the budget leaves room for slower CI machines.
+IMPORT_BUDGET_SECONDS = 2.5
+LAZY_MODULES = ("sqladmin", "wtforms", "faststream", "aiokafka")
+
+
+def test_import_time() -> None:
+    """Test that importing the application stays within budget and leaves optional subsystems unloaded."""
+    code = f"import sys, src.main; print([name for name in {LAZY_MODULES!r} if name in sys.modules])"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+    cumulative = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| src\.main$", result.stderr, re.MULTILINE)
+    assert cumulative is not None
+    assert int(cumulative.group(1)) / 1e6 < IMPORT_BUDGET_SECONDS
+
+
+def test_lazy_admin(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the admin panel is set up on its first request and builds its URLs."""
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'admin.db'}")
+    app = FastAPI()
+    mount_admin(app)
+    with TestClient(app) as client:
+        response = client.get("/admin/login")
+        assert response.status_code == 200
+        assert "/admin/statics/" in response.text
+        assert client.get("/admin/car/list", follow_redirects=False).headers["location"].endswith("/admin/login")
+    assert app.url_path_for("admin:login") == "/admin/login"
+
+
+@pytest.mark.parametrize(("run_mode", "consumes"), [("all", True), ("api", False)])
+@pytest.mark.asyncio
+async def test_run_mode(run_mode: str, consumes: bool, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the API consumes the Kafka topics only when it also runs the ingestion."""
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'startup.db'}")
+    monkeypatch.setattr(settings, "RUN_MODE", run_mode)
+    monkeypatch.setattr(settings, "CACHE_WARM_TIMEOUT_SECONDS", 0)
+    monkeypatch.setattr(settings, "TRAJECTORY_COMPACT_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(settings, "SPEED_SKETCH_FLUSH_SECONDS", 0)
+    monkeypatch.setattr(settings, "FORECAST_FOLLOW_SECONDS", 0)
+    calls: list[str] = []
+
+    async def start() -> None:
+        calls.append("start")
+
+    async def close() -> None:
+        calls.append("close")
+
+    monkeypatch.setattr(broker, "start", start)
+    monkeypatch.setattr(broker, "close", close, raising=False)
+    async with lifespan(FastAPI()):
+        pass
+    assert calls == (["start", "close"] if consumes else [])
@@ -0,0 +1,100 @@
+"""Unit tests for the car trajectory encoding and compaction."""
+
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from uuid import UUID, uuid4
+
+import numpy as np
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.analytics.cruds import CarSightingCrud
+from src.analytics.services import TrajectoryService
+from src.analytics.trajectories import CHUNK_MAX_POINTS, Trajectory, decode, encode
+from src.commons.model_base import Base
+from src.commons.models import CarSighting, CarTrajectoryChunk
+from src.config import settings
+from src.services.db import PgUnitOfWork, dispose_engines
+
+START = datetime(2025, 3, 3, 8, tzinfo=UTC)
+# The last road ends in zero bytes, which numpy drops from single byte string items.
+ROADS = [uuid4(), uuid4(), UUID(bytes=bytes(range(1, 13)) + bytes(4))]
+
+
+def sightings(count: int, step: timedelta = timedelta(seconds=1.5)) -> list[tuple]:
+    """``(road_id, timestamp, speed)`` rows driving over the roads in turn."""
+    return [(ROADS[i % len(ROADS)], START + i * step, 40 + i % 7 + 0.25) for i in range(count)]
+
+
+class TestTrajectory:
+    """Test cases for Trajectory and its chunk encoding."""
+
+    def test_encode_roundtrip(self) -> None:
+        """Test that a chunk decodes to the same sightings, speeds rounded to 0.1 km/h."""
+        trajectory = Trajectory.from_rows(reversed(sightings(100)))
+        columns = encode(trajectory)
+        assert columns["points"] == 100
+        assert len(columns["roads"]) == 3 * 16
+        assert len(columns["time_deltas"]) + len(columns["road_codes"]) + len(columns["speeds"]) == 100 * 8
+
+        chunk = CarTrajectoryChunk(plate_number="A1", **columns)
+        decoded = decode(chunk)  # pyright: ignore[reportArgumentType]
+        assert decoded.timestamp.tolist() == trajectory.timestamp.tolist()
+        assert [decoded.road_ids[road] for road in decoded.road] == [row[0] for row in sightings(100)]
+        assert np.allclose(decoded.speed, trajectory.speed, atol=0.05)
+
+    def test_concat_merges_dictionaries(self) -> None:
+        """Test that merged parts share one road dictionary and come out in time order."""
+        rows = sightings(10)
+        merged = Trajectory.concat([Trajectory.from_rows(rows[5:]), Trajectory.from_rows(rows[:5])])
+        assert len(merged.road_ids) == 3
+        assert [merged.road_ids[road] for road in merged.road] == [row[0] for row in rows]
+        assert merged.between(rows[2][1], rows[4][1]).timestamp.tolist() == merged.timestamp[2:5].tolist()
+
+    def test_chunks(self) -> None:
+        """Test that pieces hold at most a chunk and split at gaps too long for a time delta."""
+        rows = sightings(CHUNK_MAX_POINTS + 10)
+        rows.append((ROADS[0], START + timedelta(days=60), 10.0))
+        assert [len(piece) for piece in Trajectory.from_rows(rows).chunks()] == [CHUNK_MAX_POINTS, 10, 1]
+        with pytest.raises(ValueError, match="49 days"):
+            encode(Trajectory.from_rows(rows[-2:]))
+
+    def test_trips(self) -> None:
+        """Test that long gaps between sightings split the trajectory into trips."""
+        rows = [*sightings(4, timedelta(minutes=1)), (ROADS[2], START + timedelta(hours=2), 30.0)]
+        trajectory = Trajectory.from_rows(rows)
+        origins, destinations = trajectory.trips(gap_ms=30 * 60 * 1000)
+        assert [trajectory.road_ids[road] for road in origins] == [ROADS[0], ROADS[2]]
+        assert [trajectory.road_ids[road] for road in destinations] == [ROADS[0], ROADS[2]]
+
+
+@pytest.mark.asyncio
+async def test_compaction(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that old sightings move into chunks and read back together with the recent ones."""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'trajectories.db'}"
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+
+    rows = sightings(30, timedelta(minutes=1))
+    async with PgUnitOfWork() as uow:
+        crud = CarSightingCrud(uow)
+        for road_id, timestamp, speed in rows:
+            crud.add_sighting("A1", road_id, speed, timestamp)
+        crud.add_sighting("B2", ROADS[0], 50, START)
+
+    service = TrajectoryService()
+    # Three batches of 8, 8 and 5 sightings append to the same open chunk.
+    assert await service.compact_all(START + timedelta(minutes=20), batch_size=8) == 21
+    async with PgUnitOfWork() as uow:
+        chunks = (await uow.execute(select(CarTrajectoryChunk).order_by(CarTrajectoryChunk.plate_number))).scalars()
+        assert [(chunk.plate_number, chunk.points) for chunk in chunks] == [("A1", 20), ("B2", 1)]
+        assert (await uow.execute(select(func.count()).select_from(CarSighting))).scalar_one() == 10
+
+    trajectory = await service.get_trajectory("A1", START + timedelta(minutes=15), START + timedelta(hours=1))
+    assert len(trajectory) == 15
+    assert [trajectory.road_ids[road] for road in trajectory.road] == [row[0] for row in rows[15:]]
+    await dispose_engines()
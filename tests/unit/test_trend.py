@@ -0,0 +1,100 @@
+"""Unit tests for trend estimation."""
+
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from src.analytics.trend import SlopeFit, TrendTracker, fit_slope_arrays
+
+START = datetime(2025, 3, 3, tzinfo=UTC)
+
+
+def fit(densities: list[float], speeds: list[float] | None = None) -> tuple[SlopeFit, SlopeFit]:
+    """Fit one measurement per minute, newest first like the measurement window holds them."""
+    speeds = speeds or [50.0] * len(densities)
+    minutes = np.array([(START + timedelta(minutes=minute)).timestamp() / 60 for minute in range(len(densities))])
+    return fit_slope_arrays(minutes[::-1], np.array(densities[::-1]), np.array(speeds[::-1]))
+
+
+class TestFitSlopeArrays:
+    """Test cases for fit_slope_arrays."""
+
+    def test_empty(self) -> None:
+        """Test that an empty window gives flat fits."""
+        density, speed = fit([])
+        assert density.points == speed.points == 0
+        assert density.relative_change == 0
+
+    def test_linear_series(self) -> None:
+        """Test the slope, mean and confidence of exact lines."""
+        density, speed = fit([10, 12, 14, 16, 18], [60, 57, 54, 51, 48])
+        assert density.slope == pytest.approx(2)
+        assert speed.slope == pytest.approx(-3)
+        assert density.mean == pytest.approx(14)
+        assert density.r_squared == pytest.approx(1)
+        assert density.span_minutes == pytest.approx(4)
+        assert density.relative_change == pytest.approx(8 / 14)
+
+    def test_single_outlier_has_low_confidence(self) -> None:
+        """Test that one spike does not look like a confident trend."""
+        density, _ = fit([10, 10, 30, 10, 10])
+        assert density.slope == pytest.approx(0)
+        assert density.r_squared < 0.5
+
+
+class TestTrendTracker:
+    """Test cases for TrendTracker."""
+
+    @pytest.fixture
+    def tracker(self) -> TrendTracker:
+        """Create TrendTracker instance."""
+        return TrendTracker()
+
+    def test_enter_and_hysteresis(self, tracker: TrendTracker) -> None:
+        """Test that a trend starts at 10% and is kept until the change falls under 5%."""
+        road_id = uuid4()
+        density, _ = fit([10, 10.5, 11, 11.5, 12])
+        assert tracker.update(road_id, density) == "INCREASING"
+
+        # 7% across the window: not enough to start a trend, enough to keep one.
+        weaker, _ = fit([10, 10.2, 10.35, 10.5, 10.7])
+        assert tracker.update(road_id, weaker) == "INCREASING"
+        assert tracker.update(uuid4(), weaker) == "STABLE"
+
+        flat, _ = fit([10, 10, 10, 10, 10])
+        assert tracker.update(road_id, flat) == "STABLE"
+
+    def test_decreasing(self, tracker: TrendTracker) -> None:
+        """Test that a falling density is reported as DECREASING."""
+        density, _ = fit([20, 18, 16, 14, 12])
+        assert tracker.update(uuid4(), density) == "DECREASING"
+
+    def test_noisy_sample_does_not_flip(self, tracker: TrendTracker) -> None:
+        """Test that the latest noisy sample alone does not start a trend."""
+        density, _ = fit([10, 10, 10, 10, 14])
+        assert tracker.update(uuid4(), density) == "STABLE"
+
+    def test_too_few_points_keeps_previous(self, tracker: TrendTracker) -> None:
+        """Test that windows with fewer than three points keep the last trend."""
+        road_id = uuid4()
+        density, _ = fit([10, 12, 14, 16])
+        assert tracker.update(road_id, density) == "INCREASING"
+        short, _ = fit([16, 10])
+        assert tracker.update(road_id, short) == "INCREASING"
+
+    def test_classify_does_not_record(self, tracker: TrendTracker) -> None:
+        """Test that classifying a fit leaves the road's trend untouched."""
+        road_id = uuid4()
+        rising, _ = fit([10, 10.5, 11, 11.5, 12])
+        assert tracker.classify(road_id, rising) == "INCREASING"
+
+        # Without a recorded trend, a 7% change is not enough to report one.
+        weaker, _ = fit([10, 10.2, 10.35, 10.5, 10.7])
+        assert tracker.classify(road_id, weaker) == "STABLE"
+
+        tracker.update(road_id, rising)
+        flat, _ = fit([10, 10, 10, 10, 10])
+        assert tracker.classify(road_id, flat) == "STABLE"
+        assert tracker.classify(road_id, weaker) == "INCREASING"